@@ -1,267 +1,75 @@
-import os, requests
-from flask import Flask, request, redirect, jsonify, flash, session, g
-from flask.templating import render_template
-from flask_debugtoolbar import DebugToolbarExtension
-from sqlalchemy.exc import IntegrityError
-from werkzeug.exceptions import HTTPException
-from models import Bookmark, Drink, DrinkIngredient, db, connect_db, User, Category, Ingredient
-from forms import LoginForm, RegisterForm, SearchForm
+"""Application factory.
 
-USER_KEY = "curr_user"
+create_app(config) builds the app with a profile from config.py. The module
+level app, used by "from app import app" and "gunicorn app:app", is built on
+first access with the APP_CONFIG environment variable's profile, by default
+development."""
 
-app = Flask(__name__)
+import os
+from flask import Flask
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.middleware.proxy_fix import ProxyFix
+from models import db, connect_db
+import cache, metrics, passwords, ratelimit
+from catalog import warm_all
+from config import load_config
+from users import AppGlobals
+from views import main
 
-DATABASE_URL = os.environ.get("DATABASE_URL", "postgresql:///mixology")
+DEFAULT_CONFIG = "development"
 
-app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL if DATABASE_URL in ["postgresql:///mixology-test", "postgresql:///mixology"] else DATABASE_URL.replace("://", "ql://", 1)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ECHO"] = True
 
-connect_db(app)
+def create_app(config=None):
+    """Returns new app configured with profile config, or APP_CONFIG's if None."""
 
-app.config["SECRET_KEY"] = "s3cr1t059"
+    app = Flask(__name__)
+    app.app_ctx_globals_class = AppGlobals
 
-debug = DebugToolbarExtension(app)
+    load_config(app, config or os.environ.get("APP_CONFIG", DEFAULT_CONFIG))
+    connect_db(app)
+    passwords.init_app(app)
+    metrics.init_app(app)
+    cache.init_app(app)
+    ratelimit.init_app(app)
 
+    app.register_blueprint(main)
 
-# ------------------------------------------------------------- #
-# ---------------------- User Routes -------------------------- #
-# ------------------------------------------------------------- #
+    if app.config["TRUSTED_PROXIES"]:
+        proxies = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
-@app.before_request
-def add_user_to_g():
-    """Add user to flask's global g variable."""
-
-    if USER_KEY in session:
-        g.user = User.query.get(session[USER_KEY])
-
-    else:
-        g.user = None
-
-@app.route("/", methods=["GET", "POST"])
-def root():
-
-    form = SearchForm()
-
-    ingredients = [(ingr.id, ingr.name.title()) for ingr in Ingredient.query.order_by(Ingredient.name).all()]
-    categories = [(cat.id, cat.name.title()) for cat in Category.query.order_by(Category.name).all()]
-
-    form.ingredient.choices.extend(ingredients)
-    form.category.choices.extend(categories)
-
-    return render_template("drinks.html",
-                           title="MyMixology",
-                           form=form)
-
-@app.route("/login", methods=["GET", "POST"])
-def login():
-    """User login route"""
-
-    if USER_KEY in session:
-        flash("You must be logged out to view this.", "danger")
-        return redirect("/")
-
-    form = LoginForm()
-
-    if form.validate_on_submit():
-        username = form.username.data
-        password = form.password.data
-
-        user = User.authenticate(username, password)
-
-        if user:
-            flash("Successfully logged in.", "success")
-            session[USER_KEY] = user.id
-            return redirect("/")
+    if app.config["DEBUG_TOOLBAR"]:
+        try:
+            from flask_debugtoolbar import DebugToolbarExtension
+        except ImportError:
+            app.logger.info("Flask-DebugToolbar is not installed, see requirements-dev.txt")
         else:
-            flash("Invalid login credentials.", "danger")
-            
-    return render_template(
-        "form.html",
-        title="Login",
-        form=form,
-        path="/login",
-        btn_name="Enter"
-    )
+            DebugToolbarExtension(app)
 
-@app.route("/logout", methods=["GET"])
-def logout():
-    """User logout route"""
+    if app.config["WARM_ON_START"]:
+        warm(app)
 
-    if USER_KEY in session:
-        del session[USER_KEY]
-        flash("You are now logged out.", "success")
-        return redirect("/")
-    else:
-        flash("You must be logged in to do this.", "danger")
-        return redirect("/login")
+    return app
 
-@app.route("/register", methods=["GET", "POST"])
-def register():
-    """User registration route"""
 
-    if USER_KEY in session:
-        flash("You must log out to register.", "danger")
-        return redirect("/")
+def warm(app):
+    """Builds the catalog derived data of app, then closes the connections used,
+    so processes forked afterwards share the data and open their own connections."""
 
-    form = RegisterForm()
-
-    if form.validate_on_submit():
-        username = form.username.data
-        password = form.password.data
-        lang_pref = form.lang_pref.data
-
-        if form.confirm_password.data != password:
-            flash("Passwords must match.", "danger")
-            return redirect("/register")
-        
+    with app.app_context():
         try:
-            User.register(username, password, lang_pref)
-        except IntegrityError as e:
-            flash("Username already exists.", "danger")
-            return redirect("/register")
-
-        flash("Successfully created account. Please log in with your credentials.", "success")
-
-        return redirect("/login")
-
-    else:
-        return render_template(
-            "form.html",
-            title="Register",
-            form=form,
-            path="/register",
-            btn_name="Create"
-        )
-
-@app.route("/profile", methods=["GET"])
-def profile():
-    """Renders logged in user's profile"""
-
-    if USER_KEY not in session:
-        flash("You must be logged in to view this", "danger")
-        return redirect("/login")
-    
-    user = User.query.get(int(session[USER_KEY]))
-
-    return render_template("user.html",
-                           title="Profile",
-                           user=user)
-
-@app.route("/user", methods=["PUT", "PATCH"])
-def update_user():
-
-    if USER_KEY not in session:
-        return jsonify({"STATUS": "FAIL"})
-    
-    user = User.query.filter_by(id=session[USER_KEY]).update(request.json())
-    db.session.add(user)
-    db.session.commit()
-
-    return jsonify(user.serialize())
-
-@app.route("/user", methods=["DELETE"])
-def delete_user():
-    """Delete user account"""
-
-    if USER_KEY not in session:
-        flash("You must be logged in to do this.", "danger")
-        return jsonify({"STATUS": "FAIL"})
-    
-    User.query.filter_by(id=session[USER_KEY]).delete()
-    db.session.commit()
-
-    del session[USER_KEY]
-    flash("Account successfully deleted.", "success")
-
-    return jsonify({"STATUS": "OK"})
-
-# ------------------------------------------------------------- #
-# ------------------ Drink Resource Routes -------------------- #
-# ------------------------------------------------------------- #
-
-def filter_drinks_by(name, category_id, ingredient_id):
-    """Helper function, returns drink query for drinks with arguments as filters.
-    Returns query for all drinks if no filters are needed."""
-
-    drinks = Drink.query
-
-    if name != "":
-        drinks = drinks.filter(Drink.name.ilike(f"%{name}%"))
-        
-    if category_id != "0":
-        drinks = drinks.filter(Drink.category_id == category_id)
-    
-    if ingredient_id != "0":
-        drink_ids = [pair.drink_id for pair in DrinkIngredient.query.filter_by(ingredient_id=ingredient_id).all()]
-        drinks = drinks.filter(Drink.id.in_(drink_ids))
-    
-    return drinks
-
-@app.route("/drinks", methods=["GET", "POST"])
-def get_drinks():
-    """Renders list of drinks, optionally with filters."""
-
-    page = request.json.get("page", 1)
-    name = request.json.get("name", "")
-    ingredient_id = request.json.get("ingredient", "0")
-    category_id = request.json.get("category", "0")
-
-    drinks = filter_drinks_by(name, category_id, ingredient_id).paginate(page, 10)
-
-    return jsonify({
-        "drinks": [drink.serialize() for drink in drinks.items],
-        "next": drinks.has_next,
-        "prev": drinks.has_prev
-    })
-
-@app.route("/drinks/<int:id>", methods=["GET"])
-def get_drink(id):
-    """Get drink of id."""
-
-    drink = Drink.query.get_or_404(id)
-
-    return render_template("drink.html",
-                           title=drink.name.title(),
-                           drink=drink)
-
-@app.route("/bookmark", methods = ["POST", "DELETE"])
-def bookmark_drink():
-    """Create / Deletes bookmark for drink of id for logged in user."""
-
-    if USER_KEY not in session:
-        return jsonify({"STATUS": "NO_USER_FOUND"})
-    
-    id = int(request.json["id"])
-
-    if request.method == "POST":
-
-        bookmark = Bookmark(drink_id=id, user_id=g.user.id)
-        db.session.add(bookmark)
-        db.session.commit()
+            warm_all()
+        except SQLAlchemyError:
+            app.logger.warning("Could not warm catalog data", exc_info=True)
 
-        return jsonify({
-            "STATUS": "OK",
-            "CLASS": "bi bi-bookmark-fill fs-2"
-        })
+        db.engine.dispose()
 
-    else:
-        Bookmark.query.filter_by(drink_id=id, user_id=g.user.id).delete()
-        db.session.commit()
-        return jsonify({
-            "STATUS": "OK",
-            "CLASS": "bi bi-bookmark fs-2"
-        })
 
-# ------------------------------------------------------------- #
-# ----------------------- Error Route ------------------------- #
-# ------------------------------------------------------------- #
+def __getattr__(name):
+    """Builds the module level app on first access."""
 
-@app.errorhandler(HTTPException)
-def handle_exception(e):
-    """Renders error page if URL not found, or if there is a server error."""
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
 
-    if isinstance(e, HTTPException):
-        return render_template("error.html", error=e, title="Something went wrong.")
-    else:
-        return render_template("error.html", error=e, title="Something went wrong."), 500
\ No newline at end of file
+    raise AttributeError(f"module {__name__} has no attribute {name}")
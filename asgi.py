@@ -0,0 +1,355 @@
+"""ASGI entry point serving the JSON API on an async database driver.
+
+Usage: uvicorn asgi:app
+
+/drinks, /drinks/makeable, /bookmark, /bookmarks and DELETE /user run as
+async views. Their statements are built by the same queries.py and models.py
+code as the Flask views, then run on an asyncpg engine with its own pool, so
+a slow query suspends one coroutine instead of pinning a worker. Every other
+request (pages, forms, login) is passed to the Flask app, and both read and
+write the same signed session cookie.
+
+Catalog derived data (catalog version, search index, reference data) is
+still read through the Flask app's engine on the thread pool, which happens
+at most once per catalog.VERSION_CHECK_INTERVAL."""
+
+import contextlib
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags
+from app import create_app
+from cache import listing_key, lookup, store
+from cards import cards_statement
+from conditional import cache_control, etag_of
+from models import Bookmark, User
+from pantry import ingredient_index, makeable_listing, makeable_params
+from queries import InvalidCursor, InvalidParameter, as_id_list, listing_params, listing_query
+from reference import reference_data
+from users import USER_KEY, bookmark_cache, bookmark_key, bookmarks_changed, invalidate_user
+
+
+def async_database_url(url):
+    """Returns asyncpg URL of PostgreSQL URL url. Raises ValueError for other databases."""
+
+    if not url.startswith("postgresql://"):
+        raise ValueError(f"The async API needs PostgreSQL, not {url.split(':')[0]}")
+
+    return "postgresql+asyncpg://" + url[len("postgresql://"):]
+
+
+class CookieSession:
+    """Reads and writes the Flask app's signed session cookie."""
+
+    def __init__(self, flask_app):
+
+        interface = flask_app.session_interface
+
+        self.serializer = interface.get_signing_serializer(flask_app)
+        self.name = interface.get_cookie_name(flask_app)
+        self.max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        self.options = {
+            "path": interface.get_cookie_path(flask_app),
+            "domain": interface.get_cookie_domain(flask_app),
+            "secure": interface.get_cookie_secure(flask_app),
+            "httponly": interface.get_cookie_httponly(flask_app),
+            "samesite": interface.get_cookie_samesite(flask_app)
+        }
+
+    def load(self, request):
+        """Returns session data of request, empty if it has no valid session cookie."""
+
+        cookie = request.cookies.get(self.name)
+
+        if not cookie:
+            return {}
+
+        try:
+            return dict(self.serializer.loads(cookie, max_age=self.max_age))
+        except BadSignature:
+            return {}
+
+    def save(self, response, data):
+        """Sets the session cookie of response to data."""
+
+        response.set_cookie(self.name, self.serializer.dumps(data), **self.options)
+
+
+def in_app_context(flask_app, fn, *args):
+    """Returns awaitable of fn(*args), run on the thread pool in an app context of flask_app,
+    for code reading through the Flask-SQLAlchemy session."""
+
+    def run():
+        with flask_app.app_context():
+            return fn(*args)
+
+    return run_in_threadpool(run)
+
+
+async def request_params(request):
+    """Returns request parameters from the JSON body, or else from the query string,
+    where repeated parameters become lists. Raises InvalidParameter for a malformed body."""
+
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            return await request.json()
+        except ValueError:
+            raise InvalidParameter("INVALID_PARAMETER") from None
+
+    params = {}
+
+    for (key, value) in request.query_params.multi_items():
+        params.setdefault(key, []).append(value)
+
+    return {key: values if len(values) > 1 else values[0] for (key, values) in params.items()}
+
+
+async def user_bookmarks(session, user_id, data):
+    """Returns frozenset of drink ids bookmarked by user_id, cached like users.bookmark_ids."""
+
+    key = bookmark_key(user_id, data)
+    ids = bookmark_cache.get(key)
+
+    if ids is None:
+        ids = frozenset((await session.execute(Bookmark.drink_ids_statement(user_id))).scalars())
+        bookmark_cache.set(key, ids)
+
+    return ids
+
+
+def prepare_listing(key, listing):
+    """Returns (catalog version, cached page or None, statement of the page, function building
+    the page from its rows). Raises InvalidCursor for a bad cursor."""
+
+    [version, page] = lookup(key)
+
+    if page is not None:
+        return [version, page, None, None]
+
+    [query, build] = listing_query(**listing)
+
+    return [version, None, query.statement, build]
+
+
+async def get_drinks(request):
+    """Drink listing, answering like views.get_drinks."""
+
+    state = request.app.state
+    data = state.cookies.load(request)
+
+    try:
+        listing = listing_params(await request_params(request))
+    except InvalidParameter as e:
+        return JSONResponse({"STATUS": e.args[0]}, status_code=400)
+
+    key = listing_key(**listing)
+    user_id = data.get(USER_KEY)
+
+    async with state.sessions() as session:
+        bookmarks = await user_bookmarks(session, user_id, data) if user_id else frozenset()
+
+        try:
+            [version, page, statement, build] = await in_app_context(state.flask, prepare_listing, key, listing)
+        except InvalidCursor:
+            return JSONResponse({"STATUS": "INVALID_CURSOR"}, status_code=400)
+
+        etag = etag_of(version, key, user_id, sorted(bookmarks))
+
+        with state.flask.app_context():
+            policy = cache_control("main.get_drinks", private=user_id is not None)
+
+        if "_flashes" not in data and request.method in ("GET", "HEAD") and parse_etags(request.headers.get("if-none-match")).contains(etag):
+            response = Response(status_code=304)
+        else:
+            if page is None:
+                page = build((await session.execute(statement)).all())
+                await run_in_threadpool(store, key, version, page)
+
+            response = JSONResponse({
+                **page,
+                "drinks": [{**drink, "bookmarked": drink["id"] in bookmarks} for drink in page["drinks"]]
+            })
+
+    if "_flashes" in data:
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    response.headers["ETag"] = f'"{etag}"'
+
+    if policy:
+        response.headers["Cache-Control"] = policy
+
+    response.headers["Vary"] = "Cookie"
+
+    return response
+
+
+async def get_makeable_drinks(request):
+    """Drinks makeable from a list of ingredient ids, answering like views.get_makeable_drinks."""
+
+    state = request.app.state
+
+    try:
+        params = await request.json()
+    except ValueError:
+        params = None
+
+    def search():
+        return [ingredient_index.get().makeable(*makeable_params(params)), reference_data.get().ingredients]
+
+    try:
+        [results, ingredients] = await in_app_context(state.flask, search)
+    except InvalidParameter as e:
+        return JSONResponse({"STATUS": e.args[0]}, status_code=400)
+
+    if not results:
+        return JSONResponse({"drinks": []})
+
+    async with state.sessions() as session:
+        cards = (await session.execute(cards_statement([result["drink_id"] for result in results]))).scalars().all()
+
+        return JSONResponse({"drinks": makeable_listing(results, cards, ingredients)})
+
+
+async def change_bookmarks(request, user_id, data, add=(), remove=()):
+    """Removes, then adds, bookmarks of drink ids for user_id in one transaction,
+    and bumps the bookmark revision in session data."""
+
+    state = request.app.state
+
+    with state.flask.app_context():
+        statements = [Bookmark.remove_many_statement(user_id, remove), Bookmark.add_many_statement(user_id, add)]
+
+    async with state.sessions() as session:
+        for statement in statements:
+            if statement is not None:
+                await session.execute(statement)
+
+        await session.commit()
+
+    bookmarks_changed(user_id, data)
+
+
+async def bookmark_drink(request):
+    """Creates / deletes bookmark of drink of id for logged in user, answering like views.bookmark_drink."""
+
+    state = request.app.state
+    data = state.cookies.load(request)
+
+    if USER_KEY not in data:
+        return JSONResponse({"STATUS": "NO_USER_FOUND"})
+
+    ids = [int((await request.json())["id"])]
+
+    if request.method == "POST":
+        await change_bookmarks(request, data[USER_KEY], data, add=ids)
+        response = JSONResponse({"STATUS": "OK", "CLASS": "bi bi-bookmark-fill fs-2"})
+    else:
+        await change_bookmarks(request, data[USER_KEY], data, remove=ids)
+        response = JSONResponse({"STATUS": "OK", "CLASS": "bi bi-bookmark fs-2"})
+
+    state.cookies.save(response, data)
+
+    return response
+
+
+async def update_bookmarks(request):
+    """Adds and removes bookmarks of logged in user, answering like views.update_bookmarks."""
+
+    state = request.app.state
+    data = state.cookies.load(request)
+
+    if USER_KEY not in data:
+        return JSONResponse({"STATUS": "NO_USER_FOUND"})
+
+    params = await request.json()
+    user_id = data[USER_KEY]
+
+    try:
+        add = as_id_list(params.get("add", []))
+        remove = as_id_list(params.get("remove", []))
+    except InvalidParameter as e:
+        return JSONResponse({"STATUS": e.args[0]}, status_code=400)
+
+    await change_bookmarks(request, user_id, data, add=add, remove=remove)
+
+    async with state.sessions() as session:
+        bookmarks = await user_bookmarks(session, user_id, data)
+
+    response = JSONResponse({"STATUS": "OK", "bookmarks": sorted(bookmarks)})
+    state.cookies.save(response, data)
+
+    return response
+
+
+async def delete_user(request):
+    """Deletes logged in user's account, answering like views.delete_user."""
+
+    state = request.app.state
+    data = state.cookies.load(request)
+
+    if USER_KEY not in data:
+        return JSONResponse({"STATUS": "FAIL"})
+
+    user_id = data.pop(USER_KEY)
+
+    async with state.sessions() as session:
+        await session.execute(delete(User.__table__).where(User.id == user_id))
+        await session.commit()
+
+    invalidate_user(user_id)
+    data["_flashes"] = data.get("_flashes", []) + [("success", "Account successfully deleted.")]
+
+    response = JSONResponse({"STATUS": "OK"})
+    state.cookies.save(response, data)
+
+    return response
+
+
+def create_asgi_app(flask_app=None):
+    """Returns ASGI app serving the JSON API asynchronously and everything else with flask_app,
+    by default a new app from create_app."""
+
+    flask_app = flask_app or create_app()
+
+    engine = create_async_engine(
+        async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"]),
+        **flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(routes=[
+        Route("/drinks", get_drinks, methods=["GET", "POST"]),
+        Route("/drinks/makeable", get_makeable_drinks, methods=["POST"]),
+        Route("/bookmark", bookmark_drink, methods=["POST", "DELETE"]),
+        Route("/bookmarks", update_bookmarks, methods=["POST"]),
+        Route("/user", delete_user, methods=["DELETE"]),
+        Mount("/", app=WSGIMiddleware(flask_app))
+    ], lifespan=lifespan)
+
+    app.state.flask = flask_app
+    app.state.engine = engine
+    app.state.sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    app.state.cookies = CookieSession(flask_app)
+
+    return app
+
+
+def __getattr__(name):
+    """Builds the module level app on first access."""
+
+    if name == "app":
+        globals()["app"] = create_asgi_app()
+        return globals()["app"]
+
+    raise AttributeError(f"module {__name__} has no attribute {name}")
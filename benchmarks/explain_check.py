@@ -0,0 +1,81 @@
+"""Query plan check of the core routes against a large synthetic catalog.
+
+Usage: python benchmarks/explain_check.py [--drinks N] [--samples N] [--routes NAME ...]
+                                          [--skip-seed] [--seed N]
+
+Seeds DATABASE_URL (default postgresql:///mixology-bench, whose tables are
+dropped) with a synthetic catalog of --drinks drinks like load_test.py,
+sends --samples requests to each of its routes, and runs EXPLAIN on every
+statement they issue (see explain.py). Prints the statements PostgreSQL
+would answer by a selective sequential scan, one keeping few of a table's
+rows, other than of the small reference tables, and exits 1 if there are any.
+
+The response cache is off, so every request reaches the database."""
+
+import argparse, os, random, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["CACHE_URL"] = "none://"
+
+from load_test import ROUTES, Fixtures, log_in, seed_catalog
+from app import app
+from catalog import warm_all
+from explain import route_seq_scans
+from models import db
+from ratelimit import login_limiter
+from search import has_trigram
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="EXPLAIN the queries of the core routes on a synthetic catalog.")
+    parser.add_argument("--drinks", type=int, default=100000, help="synthetic catalog size")
+    parser.add_argument("--samples", type=int, default=3, help="requests per route")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog already in the database")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the catalog and requests")
+    args = parser.parse_args()
+
+    login_limiter.policies = {prefix: (10 ** 9, 10 ** 9) for prefix in login_limiter.policies}
+
+    with app.app_context():
+        if not args.skip_seed:
+            print(f"Seeding {args.drinks} drinks: {seed_catalog(args.drinks, args.seed, 1)}", file=sys.stderr)
+
+        # Plan on a settled catalog, as autovacuum leaves it, not on one bloated by the seed
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("VACUUM ANALYZE")
+
+        if not has_trigram():
+            print("pg_trgm is not installed, so substring and fuzzy name searches have no index to use", file=sys.stderr)
+
+        warm_all()
+        fixtures = Fixtures(random.Random(args.seed))
+        fixtures.cursor = app.test_client().get("/drinks").json["next"] or None
+
+        found = {}
+
+        for name in args.routes:
+            [send, _, logged_in] = ROUTES[name]
+            client = app.test_client()
+            rng = random.Random(f"{args.seed}:{name}")
+
+            if logged_in:
+                log_in(client, next(iter(fixtures.users.values())))
+
+            samples = {f"{name} #{i + 1}": lambda client: send(client, fixtures, rng, 0) for i in range(args.samples)}
+            found.update(route_seq_scans(db.engine, client, samples))
+
+    for (name, scans) in found.items():
+        for (table, statement) in scans:
+            print(f"{name}: sequential scan of {table}\n  {' '.join(statement.split())}\n")
+
+    print(f"{len(found)} of {len(args.routes) * args.samples} requests scan a table sequentially", file=sys.stderr)
+
+    sys.exit(1 if found else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Import and boot time benchmark.
+
+Usage: python benchmarks/import_time.py [--runs N] [--import-budget MS] [--boot-budget MS] [--warm]
+
+Each run starts a fresh interpreter, the way a gunicorn master does, and
+times "import app" and then create_app("production"). With --warm the app
+also builds its catalog derived data, which needs a database. Prints the
+median of each, the slowest modules by -X importtime, and exits 1 if a
+median is over its budget."""
+
+import argparse, os, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 1000
+BOOT_BUDGET_MS = 1500
+
+TIMED_BOOT = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app("production")
+print((imported - start) * 1000, (time.perf_counter() - start) * 1000)
+"""
+
+
+def run_boot(warm):
+    """Returns (import ms, boot ms) of one fresh interpreter."""
+
+    env = {**os.environ, "WARM_ON_START": "1" if warm else "0"}
+    output = subprocess.run([sys.executable, "-c", TIMED_BOOT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    [import_ms, boot_ms] = output.split()[-2:]
+
+    return (float(import_ms), float(boot_ms))
+
+
+def slowest_imports(count=15):
+    """Returns [(cumulative ms, module)] of the slowest top level imports of "import app"."""
+
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+
+    for line in stderr.splitlines():
+        parts = line.split("|")
+
+        # "import time: self | cumulative | name", where name is indented by nesting depth
+        if len(parts) == 3 and parts[1].strip().isdigit() and len(parts[2]) - len(parts[2].lstrip()) <= 3:
+            modules.append((int(parts[1]) / 1000, parts[2].strip()))
+
+    return sorted(modules, reverse=True)[:count]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Measure app import and boot time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, help="milliseconds")
+    parser.add_argument("--boot-budget", type=float, default=BOOT_BUDGET_MS, help="milliseconds")
+    parser.add_argument("--warm", action="store_true", help="also build catalog derived data")
+    args = parser.parse_args()
+
+    runs = [run_boot(args.warm) for _ in range(args.runs)]
+    import_ms = statistics.median(run[0] for run in runs)
+    boot_ms = statistics.median(run[1] for run in runs)
+
+    print("Slowest imports (cumulative ms):")
+    for (ms, module) in slowest_imports():
+        print(f"  {ms:8.1f}  {module}")
+
+    print(f"import app:   {import_ms:8.1f} ms (budget {args.import_budget:.0f})")
+    print(f"create_app(): {boot_ms:8.1f} ms (budget {args.boot_budget:.0f})")
+
+    if import_ms > args.import_budget or boot_ms > args.boot_budget:
+        print("Over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Load test of the core routes against a synthetic catalog.
+
+Usage: python benchmarks/load_test.py [--drinks N] [--concurrency N] [--requests N] [--warmup N]
+                                      [--routes NAME ...] [--skip-seed] [--seed N]
+                                      [--output FILE] [--baseline FILE]
+
+Seeds DATABASE_URL (default postgresql:///mixology-bench, whose tables are
+dropped) with a synthetic catalog of --drinks drinks, then sends --requests
+requests to each route from --concurrency threads, each with its own client,
+through the app's WSGI interface. Prints a JSON report of latency
+percentiles, throughput, status codes and SQL statements per request for
+each route, and with --baseline the change from an earlier report.
+
+The app runs with the production profile. Login rate limiting is lifted so
+the login route measures password checking; run with CACHE_URL=none:// to
+measure listings and pages without the response cache."""
+
+import argparse, json, os, platform, random, statistics, subprocess, sys, threading, time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DATABASE_URL", "postgresql:///mixology-bench")
+os.environ["APP_CONFIG"] = "production"
+os.environ["WARM_ON_START"] = "0"
+
+from sqlalchemy import event
+from app import app
+from catalog import warm_all
+from loader import BulkLoader, LoadStats
+from models import db, Category, CatalogState, Drink, DrinkIngredient, Ingredient, User
+from passwords import hash_password
+from ratelimit import login_limiter
+from seed import create_tables
+from synthetic import SyntheticCatalog
+from users import USER_KEY
+
+BATCH_SIZE = 5000
+PASSWORD = "benchmark"
+
+app.config["WTF_CSRF_ENABLED"] = False
+
+
+def seed_catalog(drinks, seed, users):
+    """Recreates the tables with a synthetic catalog of drinks drinks and users bench users.
+    Returns LoadStats."""
+
+    synthetic = SyntheticCatalog(drinks, seed=seed)
+    create_tables(synthetic.lookups())
+
+    stats = LoadStats()
+    loader = BulkLoader(batch_size=BATCH_SIZE)
+    batch = []
+
+    for payload in synthetic.payloads():
+        batch.append(payload)
+
+        if len(batch) == BATCH_SIZE:
+            loader.load(batch, stats)
+            batch = []
+
+    if batch:
+        loader.load(batch, stats)
+
+    hashed = hash_password(PASSWORD)
+    db.session.add_all([User(username=f"bench{i}", password=hashed, language_pref_id=1) for i in range(users)])
+    db.session.commit()
+
+    CatalogState.bump()
+
+    return stats.finish()
+
+
+class Fixtures:
+    """Ids and parameters the routes draw their requests from."""
+
+    def __init__(self, rng):
+
+        self.max_drink_id = db.session.query(db.func.max(Drink.id)).scalar()
+        self.categories = [id for (id,) in db.session.query(Category.id)]
+        self.users = {username: id for (id, username) in db.session.query(User.id, User.username)}
+
+        # The most used ingredients, as in most searches
+        popular = (db.session.query(Ingredient.id, Ingredient.name)
+                   .join(DrinkIngredient, DrinkIngredient.ingredient_id == Ingredient.id)
+                   .group_by(Ingredient.id)
+                   .order_by(db.func.count().desc())
+                   .limit(40)
+                   .all())
+        self.ingredients = [id for (id, _) in popular]
+        self.words = [name.split()[0] for (_, name) in popular]
+
+        self.rng = rng
+        self.cursor = None
+
+    def drink_id(self):
+        return self.rng.randint(1, self.max_drink_id)
+
+    def ingredient(self):
+        return self.rng.choice(self.ingredients[:20])
+
+    def word(self):
+        return self.rng.choice(self.words[:20])
+
+
+def typo(word, rng):
+    """Returns word with two adjacent letters swapped."""
+
+    if len(word) < 4:
+        return word
+
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def log_in(client, user_id):
+    """Sets a session of user_id on client."""
+
+    with client.session_transaction() as session:
+        session[USER_KEY] = user_id
+
+
+def post_login(client, fixtures, rng, worker):
+
+    resp = client.post("/login", data={"username": f"bench{worker}", "password": PASSWORD})
+    client.cookie_jar.clear()
+    return resp
+
+
+def toggle_bookmark(client, fixtures, rng, worker):
+
+    method = client.post if rng.random() < 0.5 else client.delete
+    return method("/bookmark", json={"id": fixtures.drink_id()})
+
+
+# name: (request function(client, fixtures, rng, worker), expected status codes, needs a logged in user)
+ROUTES = {
+    "home": (lambda c, f, r, w: c.get("/"), {200}, False),
+    "drinks": (lambda c, f, r, w: c.get("/drinks"), {200}, False),
+    "drinks_next_page": (lambda c, f, r, w: c.get("/drinks", query_string={"cursor": f.cursor}), {200}, False),
+    "drinks_name": (lambda c, f, r, w: c.get("/drinks", query_string={"name": f.word()}), {200}, False),
+    "drinks_category": (lambda c, f, r, w: c.get("/drinks", query_string={"category": r.choice(f.categories)}), {200}, False),
+    "drinks_ingredient": (lambda c, f, r, w: c.get("/drinks", query_string={"ingredient": f.ingredient()}), {200}, False),
+    "drinks_ingredients_all": (lambda c, f, r, w: c.get("/drinks", query_string=[
+        ("ingredient", f.ingredient()), ("ingredient", f.ingredient())]), {200}, False),
+    "drinks_ingredients_any": (lambda c, f, r, w: c.get("/drinks", query_string=[
+        ("ingredient", f.ingredient()), ("ingredient", f.ingredient()), ("match", "any")]), {200}, False),
+    "drinks_combined": (lambda c, f, r, w: c.get("/drinks", query_string={
+        "name": f.word()[:3], "category": r.choice(f.categories), "ingredient": f.ingredient()}), {200}, False),
+    "drinks_fulltext": (lambda c, f, r, w: c.get("/drinks", query_string={"mode": "fulltext", "name": f.word()}), {200}, False),
+    "drinks_fuzzy": (lambda c, f, r, w: c.get("/drinks", query_string={"mode": "fuzzy", "name": typo(f.word(), r)}), {200}, False),
+    "drinks_logged_in": (lambda c, f, r, w: c.get("/drinks", query_string={"ingredient": f.ingredient()}), {200}, True),
+    "drink_detail": (lambda c, f, r, w: c.get(f"/drinks/{f.drink_id()}"), {200}, False),
+    "login": (post_login, {302}, False),
+    "bookmark": (toggle_bookmark, {200}, True)
+}
+
+
+class QueryCounter:
+    """Counts SQL statements run by each thread."""
+
+    def __init__(self, engine):
+
+        self.local = threading.local()
+        event.listen(engine, "before_cursor_execute", self.record)
+
+    def record(self, *args):
+        self.local.count = getattr(self.local, "count", 0) + 1
+
+    def take(self):
+        """Returns statements run by this thread since the last take."""
+
+        count = getattr(self.local, "count", 0)
+        self.local.count = 0
+        return count
+
+
+def percentile(values, p):
+    """Returns the nearest rank p-th percentile of sorted values."""
+
+    return values[max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))]
+
+
+def run_route(name, concurrency, requests, warmup, fixtures, counter, seed):
+    """Sends requests requests to route name from concurrency threads, after warmup requests.
+    Returns its report."""
+
+    [send, expected, logged_in] = ROUTES[name]
+    results = []
+    lock = threading.Lock()
+    remaining = {"warmup": warmup, "measured": requests}
+    users = list(fixtures.users.values())
+
+    def worker(index):
+
+        rng = random.Random(f"{seed}:{name}:{index}")
+        client = app.test_client()
+        mine = []
+
+        if logged_in:
+            log_in(client, users[index % len(users)])
+
+        while True:
+            with lock:
+                phase = "warmup" if remaining["warmup"] > 0 else "measured"
+                if remaining[phase] <= 0:
+                    break
+                remaining[phase] -= 1
+
+            counter.take()
+            start = time.perf_counter()
+            resp = send(client, fixtures, rng, index % len(users))
+            elapsed = time.perf_counter() - start
+
+            if phase == "measured":
+                mine.append((elapsed, resp.status_code, counter.take()))
+
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(result[0] * 1000 for result in results)
+    statuses = {}
+
+    for (_, status, _) in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for (_, status, _) in results if status not in expected),
+        "statuses": statuses,
+        "throughput": round(len(results) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(statistics.mean(latencies), 2),
+            "max": round(latencies[-1], 2)
+        },
+        "queries_per_request": round(sum(result[2] for result in results) / len(results), 2)
+    }
+
+
+def current_commit():
+    """Returns the checked out git commit, or None."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Returns lines comparing p95 latency and throughput of report's routes with baseline's."""
+
+    lines = [f"Compared with {baseline.get('commit') or 'baseline'}:"]
+
+    for (name, route) in report["routes"].items():
+        before = baseline["routes"].get(name)
+
+        if before is None:
+            continue
+
+        [p95, old_p95] = [route["latency_ms"]["p95"], before["latency_ms"]["p95"]]
+        [rps, old_rps] = [route["throughput"], before["throughput"]]
+        change = (p95 - old_p95) / old_p95 * 100 if old_p95 else 0
+
+        lines.append(f"  {name:24} p95 {old_p95:8.2f} -> {p95:8.2f} ms ({change:+.0f}%)  "
+                     f"throughput {old_rps:8.1f} -> {rps:8.1f}/s  "
+                     f"queries {before['queries_per_request']} -> {route['queries_per_request']}")
+
+    return lines
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Load test the core routes on a synthetic catalog.")
+    parser.add_argument("--drinks", type=int, default=10000, help="synthetic catalog size")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per route")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the catalog already in the database")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the catalog and requests")
+    parser.add_argument("--output", help="file to write the JSON report to, else stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare with")
+    args = parser.parse_args()
+
+    login_limiter.policies = {prefix: (10 ** 9, 10 ** 9) for prefix in login_limiter.policies}
+
+    with app.app_context():
+        if not args.skip_seed:
+            print(f"Seeding {args.drinks} drinks: {seed_catalog(args.drinks, args.seed, args.concurrency)}", file=sys.stderr)
+
+        warm_all()
+        fixtures = Fixtures(random.Random(args.seed))
+        fixtures.cursor = app.test_client().get("/drinks").json["next"] or None
+        counter = QueryCounter(db.engine)
+
+    report = {
+        "commit": current_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "drinks": fixtures.max_drink_id,
+        "concurrency": args.concurrency,
+        "routes": {}
+    }
+
+    for name in args.routes:
+        report["routes"][name] = run_route(name, args.concurrency, args.requests, args.warmup, fixtures, counter, args.seed)
+        print(f"{name}: {report['routes'][name]['latency_ms']}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            print("\n".join(compare(report, json.load(file))), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
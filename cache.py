@@ -0,0 +1,247 @@
+"""Server-side cache for rendered drink pages and drink listings.
+
+The catalog only changes on a sync, so responses built from it are cached
+until then. Every entry is stamped with the catalog version it was built
+from and is ignored once the version moves on, so workers that did not run
+the sync stop serving stale entries within VERSION_CHECK_INTERVAL seconds.
+A sync in the same process, or an admin write calling invalidate_drinks,
+drops entries immediately.
+
+The backend is chosen by the app's CACHE_URL setting, bound by init_app:
+"memory://" (the default) for an in-process LRU, "redis://..." to share
+one cache between workers, or "none://" to disable caching."""
+
+import json, threading, time
+from collections import OrderedDict
+from catalog import catalog_version
+from models import catalog_changed
+from reference import reference_data
+
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 300
+
+
+class LRUCache:
+    """In-process least recently used cache with per-entry time to live."""
+
+    def __init__(self, maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL):
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """Returns value of key, or None if missing or expired."""
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full."""
+
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        """Removes key."""
+
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self, prefix=""):
+        """Removes every key starting with prefix."""
+
+        with self.lock:
+            if not prefix:
+                self.entries.clear()
+                return
+
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+
+class RedisCache:
+    """Cache shared between processes, storing JSON values in Redis with a time to live."""
+
+    def __init__(self, url, ttl=CACHE_TTL, namespace="mixology:"):
+
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def get(self, key):
+        """Returns value of key, or None if missing or expired."""
+
+        value = self.client.get(self.namespace + key)
+
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value):
+        """Stores value under key."""
+
+        self.client.set(self.namespace + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        """Removes key."""
+
+        self.client.delete(self.namespace + key)
+
+    def clear(self, prefix=""):
+        """Removes every key starting with prefix."""
+
+        keys = list(self.client.scan_iter(match=f"{self.namespace}{prefix}*"))
+
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCache:
+    """Cache that stores nothing."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self, prefix=""):
+        pass
+
+
+def make_cache(url=None):
+    """Returns cache backend for url, an in-process LRUCache if url is None."""
+
+    url = url or "memory://"
+
+    if url.startswith("memory://"):
+        return LRUCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    if url.startswith("none://"):
+        return NullCache()
+
+    raise ValueError(f"Unsupported CACHE_URL {url}")
+
+
+class ResponseCache:
+    """The app's cache, passing every call to the backend chosen by configure."""
+
+    def __init__(self, url=None):
+
+        self.configure(url)
+
+    def configure(self, url):
+        """Replaces the backend with a new one for url."""
+
+        self.backend = make_cache(url)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self, prefix=""):
+        self.backend.clear(prefix)
+
+
+response_cache = ResponseCache()
+
+
+def init_app(app):
+    """Binds the response cache to app's CACHE_URL backend."""
+
+    response_cache.configure(app.config["CACHE_URL"])
+
+
+def drink_key(drink_id, language="EN"):
+    """Returns cache key of the detail page of drink_id with instructions in language code."""
+
+    return f"drink:{drink_id}:{language}"
+
+
+def listing_key(**params):
+    """Returns cache key of a drink listing, from its normalized request parameters."""
+
+    return "drinks:" + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def lookup(key):
+    """Returns (current catalog version, value of key cached at that version or None)."""
+
+    version = catalog_version()
+    entry = response_cache.get(key)
+
+    return (version, entry["value"] if entry is not None and entry["version"] == version else None)
+
+
+def store(key, version, value):
+    """Caches value of key, built from catalog version."""
+
+    response_cache.set(key, {"version": version, "value": value})
+
+
+def cached(key, build):
+    """Returns the cached value of key if built from the current catalog version,
+    else calls build(), caches and returns its result. build may return None
+    to skip caching."""
+
+    [version, value] = lookup(key)
+
+    if value is not None:
+        return value
+
+    value = build()
+
+    if value is not None:
+        store(key, version, value)
+
+    return value
+
+
+def invalidate_drinks(drink_ids=None):
+    """Drops cached pages of drink_ids, and every cached listing.
+    Drops everything if drink_ids is None. Call after writing drinks outside a sync,
+    and after rebuilding their cards with cards.rebuild_cards."""
+
+    if drink_ids is None:
+        response_cache.clear()
+        return
+
+    languages = list(reference_data.get().languages.ids)
+
+    for drink_id in drink_ids:
+        for language in languages:
+            response_cache.delete(drink_key(drink_id, language))
+
+    response_cache.clear("drinks:")
+
+
+@catalog_changed.connect
+def invalidate_changed(version, drink_ids):
+    """Drops cached responses of drinks changed by a catalog sync."""
+
+    invalidate_drinks(drink_ids or None)
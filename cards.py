@@ -0,0 +1,70 @@
+"""Display ready drink cards, the read model of the drink listing.
+
+drink_cards holds one row per listed drink with everything a listing row
+shows, already formatted, plus its ingredient count and ingredient ids. A
+filtered, paginated listing is then one indexed statement on one table,
+with no joins to categories or drinks_ingredients and no per row
+formatting. Rows of changed drinks are rebuilt whenever the catalog
+changes, like the search documents."""
+
+from sqlalchemy import select
+from models import db, Category, Drink, DrinkCard, DrinkIngredient, catalog_changed
+
+BATCH_SIZE = 1000
+
+
+def rebuild_cards(drink_ids=None):
+    """Rebuilds drink_cards rows of drink_ids, or of every drink if drink_ids is None.
+    Soft-deleted drinks lose their rows. Commits."""
+
+    drinks = (db.session.query(Drink.id, Drink.name, Drink.image_url, Drink.image_attribution,
+                               Drink.alcoholic, Drink.optional_alc, Drink.category_id, Category.name)
+              .join(Category, Category.id == Drink.category_id)
+              .filter(Drink.deleted_at == None))
+    ingredients = db.session.query(DrinkIngredient.drink_id, DrinkIngredient.ingredient_id)
+    stale = DrinkCard.query
+
+    if drink_ids is not None:
+        drinks = drinks.filter(Drink.id.in_(drink_ids))
+        ingredients = ingredients.filter(DrinkIngredient.drink_id.in_(drink_ids))
+        stale = stale.filter(DrinkCard.drink_id.in_(drink_ids))
+
+    cards = {id: {
+        "drink_id": id,
+        "sort_name": name,
+        "name": name.title(),
+        "image_url": image_url,
+        "image_attribution": image_attribution,
+        "alcoholic": alcoholic,
+        "optional_alc": optional_alc,
+        "category_id": category_id,
+        "category": category.title(),
+        "ingredient_ids": set()
+    } for (id, name, image_url, image_attribution, alcoholic, optional_alc, category_id, category) in drinks}
+
+    for (drink_id, ingredient_id) in ingredients:
+        if drink_id in cards:
+            cards[drink_id]["ingredient_ids"].add(ingredient_id)
+
+    stale.delete(synchronize_session=False)
+
+    rows = [{**card, "ingredient_ids": sorted(card["ingredient_ids"]), "ingredient_count": len(card["ingredient_ids"])}
+            for card in cards.values()]
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(DrinkCard.__table__.insert(), rows[start:start + BATCH_SIZE])
+
+    db.session.commit()
+
+
+def cards_statement(drink_ids):
+    """Returns statement selecting the cards of drink_ids that are listed."""
+
+    return select(DrinkCard).where(DrinkCard.drink_id.in_(drink_ids))
+
+
+@catalog_changed.connect
+def refresh_cards(version, drink_ids):
+    """Rebuilds cards of changed drinks."""
+
+    rebuild_cards(drink_ids or None)
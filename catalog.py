@@ -0,0 +1,90 @@
+"""In-process data derived from the catalog, kept fresh by catalog version.
+
+Each worker process builds these values once and reuses them until the
+catalog changes. A sync in the same process invalidates them immediately
+through catalog_changed; other processes notice the bumped catalog version
+within VERSION_CHECK_INTERVAL seconds. All values share one version check,
+so a request reads the version at most once per interval however many
+derived values it uses."""
+
+import threading, time
+from models import CatalogState, catalog_changed
+
+VERSION_CHECK_INTERVAL = 5
+
+derived_values = []
+
+version_lock = threading.Lock()
+version_check = {"version": None, "updated_at": None, "checked_at": 0}
+
+
+def check_version(max_age):
+    """Returns the version_check snapshot, refreshed from the database if older than max_age seconds."""
+
+    with version_lock:
+        if version_check["version"] is None or time.monotonic() - version_check["checked_at"] >= max_age:
+            [version_check["version"], version_check["updated_at"]] = CatalogState.current()
+            version_check["checked_at"] = time.monotonic()
+
+        return dict(version_check)
+
+
+def catalog_version(max_age=VERSION_CHECK_INTERVAL):
+    """Returns catalog version, read from the database if the last read is older than max_age seconds."""
+
+    return check_version(max_age)["version"]
+
+
+def catalog_updated_at(max_age=VERSION_CHECK_INTERVAL):
+    """Returns UTC time of the last catalog change, or None, read like catalog_version."""
+
+    return check_version(max_age)["updated_at"]
+
+
+class CatalogDerived:
+    """Value built by build() from catalog data, rebuilt after the catalog version changes."""
+
+    def __init__(self, build, check_interval=VERSION_CHECK_INTERVAL):
+
+        self.build = build
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.value = None
+        self.version = None
+        derived_values.append(self)
+
+    def get(self):
+        """Returns the value, rebuilding it first if the catalog changed."""
+
+        version = catalog_version(self.check_interval)
+
+        with self.lock:
+            if version != self.version:
+                self.value = self.build()
+                self.version = version
+
+            return self.value
+
+    def invalidate(self):
+        """Forces a rebuild on next get()."""
+
+        with self.lock:
+            self.version = None
+
+
+def warm_all():
+    """Builds every derived value now rather than on first use. Needs an app context."""
+
+    for derived in derived_values:
+        derived.get()
+
+
+@catalog_changed.connect
+def invalidate_all(version, drink_ids):
+    """Invalidates every derived value when the catalog changes in this process."""
+
+    with version_lock:
+        version_check["version"] = None
+
+    for derived in derived_values:
+        derived.invalidate()
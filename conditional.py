@@ -0,0 +1,68 @@
+"""HTTP validators (ETag / Last-Modified) and Cache-Control for catalog responses.
+
+Views compute a strong ETag from catalog and content versions they already
+hold, so a matching conditional GET is answered 304 before anything is
+rendered. Cache-Control values come from the CACHE_CONTROL config, per
+endpoint, with a "public" policy for anonymous responses and a "private"
+one for responses that depend on the logged in user. Both vary by session
+cookie, since the navbar and preferences a page renders come from it."""
+
+import hashlib
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+CACHE_CONTROL = {
+    "main.get_drink": {"public": "public, max-age=60", "private": "private, no-cache"},
+    "main.get_drinks": {"public": "public, max-age=60", "private": "private, no-cache"}
+}
+
+
+def etag_of(*parts):
+    """Returns strong ETag value for the given version parts."""
+
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf8")).hexdigest()[:32]
+
+
+def cache_control(endpoint, private=False):
+    """Returns Cache-Control value configured for endpoint, or None."""
+
+    policies = current_app.config.get("CACHE_CONTROL", CACHE_CONTROL).get(endpoint, {})
+
+    return policies.get("private" if private else "public")
+
+
+def conditional(build, etag, last_modified=None, private=False):
+    """Returns 304 Not Modified if the request's validators match etag or
+    last_modified, else the response returned by build(). Either way the
+    response carries the validators and the endpoint's Cache-Control.
+
+    Responses vary by session cookie. Private ones send no Last-Modified, since
+    per-user state can change without the catalog changing. Pages showing
+    pending flash messages are never cached."""
+
+    if "_flashes" in session:
+        response = make_response(build())
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    if private:
+        last_modified = None
+
+    if request.method in ("GET", "HEAD") and not is_resource_modified(request.environ, etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(build())
+
+    response.set_etag(etag)
+
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+    policy = cache_control(request.endpoint, private)
+
+    if policy:
+        response.headers["Cache-Control"] = policy
+
+    response.vary.add("Cookie")
+
+    return response
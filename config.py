@@ -0,0 +1,134 @@
+"""Configuration profiles for create_app.
+
+A profile is picked by name, "development", "testing" or "production".
+Settings listed in ENV_SETTINGS can then be overridden by environment
+variables of the same name, e.g. DATABASE_URL or DB_POOL_SIZE."""
+
+import os
+from passwords import DEFAULT_LOG_ROUNDS, DEFAULT_QUEUE, DEFAULT_WORKERS
+
+
+class Config:
+    """Settings shared by every profile."""
+
+    DATABASE_URL = "postgresql:///mixology"
+    SECRET_KEY = "s3cr1t059"
+
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    # Connection pool of each worker process
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_PRE_PING = True
+
+    BCRYPT_LOG_ROUNDS = DEFAULT_LOG_ROUNDS
+    BCRYPT_WORKERS = DEFAULT_WORKERS
+    BCRYPT_QUEUE = DEFAULT_QUEUE
+
+    DEBUG_TOOLBAR = False
+
+    # Request timing per view, served by /metrics (see metrics.py)
+    METRICS = True
+    # Send each request's timings in a Server-Timing header
+    SERVER_TIMING = False
+    # Bearer token /metrics requires, if set
+    METRICS_TOKEN = ""
+    # Serve /metrics only when METRICS_TOKEN is set
+    METRICS_REQUIRE_TOKEN = False
+    SLOW_QUERY_MS = 100
+    SLOW_REQUEST_MS = 500
+
+    # Backends of the response cache and the login limiter, see cache.py and ratelimit.py
+    CACHE_URL = "memory://"
+    RATE_LIMIT_URL = "memory://"
+
+    # Build catalog derived data before serving, so preforked workers start warm
+    WARM_ON_START = False
+
+    # Proxies in front of the app whose X-Forwarded-For and X-Forwarded-Proto
+    # are trusted, so request.remote_addr is the client's address
+    TRUSTED_PROXIES = 0
+
+
+class DevelopmentConfig(Config):
+    """Local development: SQL echo, the debug toolbar, Server-Timing headers and cheaper password hashes."""
+
+    SQLALCHEMY_ECHO = True
+    DEBUG_TOOLBAR = True
+    SERVER_TIMING = True
+    BCRYPT_LOG_ROUNDS = 10
+
+
+class TestingConfig(Config):
+    """Test runs, against the test database."""
+
+    DATABASE_URL = "postgresql:///mixology-test"
+    TESTING = True
+    BCRYPT_LOG_ROUNDS = 4
+
+
+class ProductionConfig(Config):
+    """Deployment behind gunicorn and the Heroku router."""
+
+    WARM_ON_START = True
+    TRUSTED_PROXIES = 1
+    METRICS_REQUIRE_TOKEN = True
+
+
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig
+}
+
+ENV_SETTINGS = [
+    "DATABASE_URL", "SECRET_KEY",
+    "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_POOL_TIMEOUT", "DB_POOL_RECYCLE", "DB_POOL_PRE_PING",
+    "BCRYPT_LOG_ROUNDS", "BCRYPT_WORKERS", "BCRYPT_QUEUE",
+    "METRICS", "SERVER_TIMING", "METRICS_TOKEN", "METRICS_REQUIRE_TOKEN", "SLOW_QUERY_MS", "SLOW_REQUEST_MS",
+    "CACHE_URL", "RATE_LIMIT_URL",
+    "WARM_ON_START", "TRUSTED_PROXIES"
+]
+
+
+def database_url(url):
+    """Returns SQLAlchemy URL of url, rewriting the postgres:// scheme Heroku uses to postgresql://."""
+
+    return "postgresql://" + url[len("postgres://"):] if url.startswith("postgres://") else url
+
+
+def env_value(value, default):
+    """Returns environment string value parsed to the type of default."""
+
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+
+    return value
+
+
+def load_config(app, name):
+    """Configures app with profile name, then settings from the environment.
+    Raises ValueError for an unknown profile."""
+
+    if name not in CONFIGS:
+        raise ValueError(f"Unknown config {name}, expected one of {', '.join(CONFIGS)}")
+
+    app.config.from_object(CONFIGS[name])
+
+    for key in ENV_SETTINGS:
+        if key in os.environ:
+            app.config[key] = env_value(os.environ[key], app.config[key])
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url(app.config["DATABASE_URL"])
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": app.config["DB_POOL_SIZE"],
+        "max_overflow": app.config["DB_MAX_OVERFLOW"],
+        "pool_timeout": app.config["DB_POOL_TIMEOUT"],
+        "pool_recycle": app.config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": app.config["DB_POOL_PRE_PING"]
+    }
@@ -0,0 +1,109 @@
+"""Query plan checks: which statements would read a whole table.
+
+recorded_statements collects the statements a block of code runs, with
+their parameters, and seq_scans asks PostgreSQL for the plan of one of them
+without running it. route_seq_scans combines the two over a set of
+requests, so a route whose queries no index can serve is caught by the
+test suite (with prefer_indexes, on its small catalog) or by
+benchmarks/explain_check.py (with the planner's own choices, on a large
+synthetic one) before it is slow in production.
+
+On a large catalog, a sequential scan that keeps much of its table is the
+best plan for an unselective filter (a full text search for "lime"), so
+only scans keeping under SELECTIVE_FRACTION of the table's rows are
+reported there.
+
+Run with a warm process (catalog.warm_all): catalog derived values read
+whole tables by design, once per catalog version."""
+
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Tables read whole by design, or small enough that reading them whole is
+# the best plan at any catalog size
+SMALL_TABLES = {"languages", "categories", "glasses", "catalog_state"}
+
+# A sequential scan keeping less than this fraction of its table's rows
+# would have read far fewer through an index
+SELECTIVE_FRACTION = 0.05
+
+# Statements with a plan; transaction control and the like have none
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+@contextmanager
+def recorded_statements(engine):
+    """Context manager yielding a list that collects (statement, parameters)
+    of every explainable statement run on engine, batches excepted."""
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def plan_nodes(plan):
+    """Yields every node of a PostgreSQL JSON plan, depth first."""
+
+    yield plan
+
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def seq_scans(connection, statement, parameters, prefer_indexes=False):
+    """Returns (table, estimated rows kept) of each sequential scan PostgreSQL would run for statement.
+    With prefer_indexes, sequential scans are priced as a last resort, so on a small
+    catalog only statements that no index can serve still scan a table."""
+
+    cursor = connection.connection.cursor()
+
+    try:
+        cursor.execute(f"SET LOCAL enable_seqscan = {'off' if prefer_indexes else 'on'}")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        [[[explained]]] = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    return [(node["Relation Name"], node["Plan Rows"]) for node in plan_nodes(explained["Plan"])
+            if node["Node Type"] == "Seq Scan"]
+
+
+def table_rows(connection):
+    """Returns dict of the estimated row count of each table, as of its last ANALYZE."""
+
+    return dict(connection.exec_driver_sql("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'").all())
+
+
+def route_seq_scans(engine, client, requests, ignore=SMALL_TABLES, prefer_indexes=False):
+    """Sends requests, a dict of name: function(client), through client.
+    Returns dict of the names whose statements scan a table outside ignore and the
+    system catalogs sequentially, to lists of (table, statement). With prefer_indexes
+    every such scan counts, else only those keeping under SELECTIVE_FRACTION of the table."""
+
+    found = {}
+
+    with engine.connect() as connection:
+        rows = table_rows(connection)
+
+        for (name, send) in requests.items():
+            with recorded_statements(engine) as statements:
+                send(client)
+
+            with connection.begin():
+                for (statement, parameters) in statements:
+                    for (table, kept) in seq_scans(connection, statement, parameters, prefer_indexes):
+                        if table in ignore or table.startswith("pg_"):
+                            continue
+
+                        if prefer_indexes or kept < rows.get(table, 0) * SELECTIVE_FRACTION:
+                            found.setdefault(name, []).append((table, statement))
+
+    return found
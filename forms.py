@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SelectField, FieldList, BooleanField
+from wtforms import StringField, PasswordField, SelectField, SelectMultipleField, FieldList, BooleanField
 from wtforms.validators import InputRequired, EqualTo, Optional
+from reference import reference_data
 
 class LoginForm(FlaskForm):
     """User login form."""
@@ -31,18 +32,16 @@ class RegisterForm(FlaskForm):
     
     lang_pref = SelectField(
         "Language Preference",
-        choices=[
-            (1, "English"),
-            (2, "German"),
-            (3, "Spanish"),
-            (4, "French"),
-            (5, "Italian"),
-            (6, "Mandarin, Simplified"),
-            (7, "Mandarin, Traditional")
-        ],
+        choices=[],
         validators = [InputRequired()]
     )
 
+    def __init__(self, *args, **kwargs):
+        """Fills language choices from the reference data registry"""
+
+        super().__init__(*args, **kwargs)
+        self.lang_pref.choices = reference_data.get().language_choices()
+
 class SearchForm(FlaskForm):
     """Search form that queries database for drinks with any or several of the below filters"""
 
@@ -51,18 +50,45 @@ class SearchForm(FlaskForm):
         validators=[Optional()]
     )
 
+    mode = SelectField(
+        "Search Mode",
+        choices=[
+            ("name", "Name contains"),
+            ("fulltext", "Names, ingredients & instructions"),
+            ("fuzzy", "Fuzzy (typo tolerant)")
+        ],
+        default="name"
+    )
+
     category = SelectField(
         "Filter By Category",
         choices=[(0, "-")],
         validators=[InputRequired()]
     )
 
-    ingredient = SelectField(
-        "Filter By Ingredient",
-        choices=[(0, "-")],
-        validators=[InputRequired()]
+    ingredient = SelectMultipleField(
+        "Filter By Ingredients",
+        choices=[],
+        validators=[Optional()]
+    )
+
+    match = SelectField(
+        "Ingredient Match",
+        choices=[
+            ("all", "Contains all ingredients"),
+            ("any", "Contains any ingredient")
+        ],
+        default="all"
     )
 
+    def __init__(self, *args, **kwargs):
+        """Fills category and ingredient choices from the reference data registry"""
+
+        super().__init__(*args, **kwargs)
+        reference = reference_data.get()
+        self.category.choices = [(0, "-"), *reference.categories.choices()]
+        self.ingredient.choices = reference.ingredients.choices()
+
     def is_empty(self):
         """Returns True if fields are empty"""
 
@@ -72,7 +98,7 @@ class SearchForm(FlaskForm):
         if self.category.data is not None and self.category.data != '0':
             return False
         
-        if self.ingredient.data is not None and self.ingredient.data != '0':
+        if self.ingredient.data:
             return False
         
         return True
\ No newline at end of file
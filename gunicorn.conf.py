@@ -0,0 +1,15 @@
+"""Gunicorn settings: gunicorn --config gunicorn.conf.py app:app
+
+The app is loaded once in the master with the production profile, which
+builds the catalog derived data before workers are forked, so every worker
+starts warm and shares those pages copy-on-write. Workers open their own
+database connections after the fork."""
+
+import os
+
+os.environ.setdefault("APP_CONFIG", "production")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
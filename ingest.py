@@ -0,0 +1,247 @@
+"""Concurrent, resumable ingestion of thecocktaildb catalog.
+
+Responses are fetched with a bounded pool of worker threads, each reusing
+its own HTTP connection, and every response is recorded to a cache
+directory as gzipped JSON as soon as it arrives. An interrupted run pointed
+at the same directory only fetches what is still missing, and a finished
+directory can be replayed later without any network access.
+
+Sources answer get(endpoint, params) like the API: HTTPSource fetches it,
+DirectorySource replays a recorded directory, and synthetic.SyntheticCatalog
+generates a catalog of any size. The tests replay the recordings in
+fixtures/cocktaildb through fixture_fetcher."""
+
+import gzip, json, os, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from synthetic import SyntheticCatalog
+
+COCKTAILDB_URL = "https://www.thecocktaildb.com/api/json/v1/1"
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "cocktaildb")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Raised when an endpoint could not be fetched after all retries."""
+
+
+def record_path(root, endpoint, params):
+    """Returns path of the recorded response for endpoint and params under root.
+
+    e.g. lookup.php?i=11007 -> <root>/lookup/i=11007.json.gz"""
+
+    query = urlencode(sorted(params.items()))
+    return os.path.join(root, endpoint.replace(".php", ""), quote(query, safe="=") + ".json.gz")
+
+
+def read_record(path):
+    """Returns JSON recorded at path, or in its uncompressed .json form from
+    before recordings were gzipped. Raises FileNotFoundError if neither exists."""
+
+    try:
+        with gzip.open(path, "rt", encoding="utf8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        with open(path[:-len(".gz")], encoding="utf8") as f:
+            return json.load(f)
+
+
+def write_record(path, data):
+    """Records JSON data at path, atomically so concurrent readers never see a partial file."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+    # mtime=0 keeps recordings of the same response byte for byte identical
+    with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(json.dumps(data, sort_keys=True).encode("utf8"))
+
+    os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing out requests to each host."""
+
+    def __init__(self, rate):
+        """rate is the maximum number of requests per second per host.
+        A rate of 0 or None disables limiting."""
+
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        """Blocks until a request to host may be sent."""
+
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HTTPSource:
+    """Fetches endpoints over HTTP, with per-host rate limiting and retries.
+
+    base_url may point at thecocktaildb.com or at a local fixture server
+    that serves the same paths."""
+
+    def __init__(self, base_url=COCKTAILDB_URL, rate=5, retries=4, backoff=0.5, timeout=10):
+
+        self.base_url = base_url.rstrip("/")
+        self.host = urlparse(self.base_url).netloc
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def session(self):
+        """Returns the calling thread's session, so each worker keeps its connection alive."""
+
+        if not hasattr(self.local, "session"):
+            session = requests.Session()
+            session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.local.session = session
+
+        return self.local.session
+
+    def get(self, endpoint, params):
+        """Returns decoded JSON for endpoint, retrying with exponential backoff."""
+
+        url = f"{self.base_url}/{endpoint}"
+
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(self.host)
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+
+            try:
+                resp = self.session().get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return resp.json()
+
+                error = f"HTTP {resp.status_code}"
+                retry_after = resp.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+
+            if attempt < self.retries:
+                time.sleep(delay)
+
+        raise FetchError(f"{url} {params}: {error}")
+
+
+class DirectorySource:
+    """Reads responses recorded by a CatalogFetcher, without network access."""
+
+    def __init__(self, path):
+
+        self.path = path
+
+    def get(self, endpoint, params):
+        """Returns recorded JSON for endpoint, raising FetchError if it was never recorded."""
+
+        try:
+            return read_record(record_path(self.path, endpoint, params))
+        except FileNotFoundError:
+            raise FetchError(f"{endpoint} {params}: not recorded in {self.path}")
+
+
+def make_source(location, **options):
+    """Returns an HTTPSource for URLs, a SyntheticCatalog of N drinks for "synthetic:N",
+    or a DirectorySource for local paths."""
+
+    if location.startswith(("http://", "https://")):
+        return HTTPSource(location, **options)
+    if location.startswith("synthetic:"):
+        return SyntheticCatalog(int(location[len("synthetic:"):]))
+
+    return DirectorySource(location)
+
+
+class CatalogFetcher:
+    """Fetches the whole catalog from a source using a bounded worker pool.
+
+    When cache_dir is set, each response is written there before it is used,
+    and responses already present are never fetched again."""
+
+    def __init__(self, source, cache_dir=None, workers=8):
+
+        self.source = source
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.fetched = 0
+
+    def get(self, endpoint, **params):
+        """Returns JSON for a single endpoint, from the cache if it was already fetched."""
+
+        path = record_path(self.cache_dir, endpoint, params) if self.cache_dir else None
+
+        if path:
+            try:
+                return read_record(path)
+            except FileNotFoundError:
+                pass
+
+        data = self.source.get(endpoint, params)
+        self.fetched += 1
+
+        if path:
+            write_record(path, data)
+
+        return data
+
+    def get_many(self, endpoint, param_list):
+        """Fetches endpoint once per params dict concurrently.
+        Returns responses in the same order as param_list."""
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(lambda params: self.get(endpoint, **params), param_list))
+
+    def fetch_catalog(self):
+        """Fetches lookup lists and the full data of every drink.
+
+        Returns dict with "categories", "glasses" and "ingredients" name lists,
+        and "drinks", a list of raw drink payloads."""
+
+        [categories, glasses, ingredients] = self.get_many("list.php", [{"c": "list"}, {"g": "list"}, {"i": "list"}])
+
+        glass_names = [glass["strGlass"] for glass in glasses["drinks"]]
+
+        drink_ids = []
+        for resp_data in self.get_many("filter.php", [{"g": name.replace(" ", "_")} for name in glass_names]):
+            drink_ids.extend(drink["idDrink"] for drink in resp_data["drinks"] or [])
+
+        lookups = self.get_many("lookup.php", [{"i": id} for id in dict.fromkeys(drink_ids)])
+
+        return {
+            "categories": [cat["strCategory"] for cat in categories["drinks"]],
+            "glasses": glass_names,
+            "ingredients": [ingr["strIngredient1"] for ingr in ingredients["drinks"]],
+            "drinks": [resp_data["drinks"][0] for resp_data in lookups if resp_data["drinks"]]
+        }
+
+
+def fixture_fetcher(path=FIXTURES_DIR):
+    """Returns CatalogFetcher replaying the responses recorded under path.
+    With COCKTAILDB_RECORD set, responses missing there are fetched from
+    thecocktaildb.com and recorded instead."""
+
+    if os.environ.get("COCKTAILDB_RECORD"):
+        return CatalogFetcher(HTTPSource(), cache_dir=path)
+
+    return CatalogFetcher(DirectorySource(path))
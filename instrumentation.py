@@ -0,0 +1,72 @@
+"""Per-request SQL query counting and query budgets for views.
+
+Views declare how many statements a request may issue with @query_budget.
+Budgets cost nothing in production: they are only checked once
+enforce_query_budgets(app) is called, as the test suite does, so a view
+that starts lazy loading per row fails its tests instead of slowing down.
+
+Budgets describe a warm process: catalog derived values (see catalog.py)
+are built once per catalog version and are not counted against a view."""
+
+from contextlib import contextmanager
+from flask import g, has_app_context, request, request_finished, request_started
+from sqlalchemy import event
+from models import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a request issues more statements than its view's budget."""
+
+
+def query_budget(limit):
+    """Decorator declaring that a view issues at most limit SQL statements per request."""
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+@contextmanager
+def count_queries(engine):
+    """Context manager yielding a list that collects every statement run on engine."""
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def enforce_query_budgets(app):
+    """Makes every request to a view with a query budget raise
+    QueryBudgetExceeded if it runs more statements than the budget."""
+
+    def record(conn, cursor, statement, *args):
+        if has_app_context() and "query_log" in g:
+            g.query_log.append(statement)
+
+    def start(sender, **extra):
+        g.query_log = []
+
+    def check(sender, response, **extra):
+        view = app.view_functions.get(request.endpoint)
+        limit = getattr(view, "query_budget", None)
+
+        if limit is not None and len(g.query_log) > limit:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} ran {len(g.query_log)} queries, budget is {limit}:\n"
+                + "\n".join(g.query_log)
+            )
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+
+    request_started.connect(start, app, weak=False)
+    request_finished.connect(check, app, weak=False)
@@ -0,0 +1,151 @@
+"""Set-based bulk loading of thecocktaildb drink payloads.
+
+Drink.parse_drink_data resolves categories, glasses and ingredients with
+several queries per drink. BulkLoader reads each lookup table once, creates
+missing categories, glasses and ingredients with one INSERT ... ON CONFLICT
+DO NOTHING per table, and
+writes drinks, instructions and drinks_ingredients as batched executemany
+inserts (multi-row VALUES on psycopg2)."""
+
+import time
+from models import db, Category, Drink, DrinkIngredient, Glass, Ingredient, Instruction, Language, insert_or_ignore
+
+
+class LoadStats:
+    """Row counts and timing of a bulk load."""
+
+    def __init__(self):
+
+        self.rows = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0
+
+    def add(self, table, count):
+        """Records count rows written to table."""
+
+        self.rows[table] = self.rows.get(table, 0) + count
+
+    def finish(self):
+        """Stops the clock and returns self."""
+
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.elapsed if self.elapsed else 0
+
+    def __str__(self):
+        """Returns one line summary, e.g. "5200 rows in 1.30s (4000 rows/s): drinks=600 ..." """
+
+        tables = " ".join(f"{table}={count}" for (table, count) in self.rows.items())
+        return f"{self.total_rows} rows in {self.elapsed:.2f}s ({self.rows_per_second:.0f} rows/s): {tables}"
+
+
+class BulkLoader:
+    """Loads drink payloads with a fixed number of statements per batch."""
+
+    def __init__(self, batch_size=1000):
+
+        self.batch_size = batch_size
+        self.categories = {name: id for (id, name) in db.session.query(Category.id, Category.name)}
+        self.glasses = {name: id for (id, name) in db.session.query(Glass.id, Glass.name)}
+        self.languages = {code: id for (id, code) in db.session.query(Language.id, Language.code)}
+        self.ingredients = {name: id for (id, name) in db.session.query(Ingredient.id, Ingredient.name)}
+
+    def ensure_names(self, model, known, names):
+        """Creates rows of lookup model for any names not in known, in one statement,
+        and adds their ids to known. Returns number of rows created."""
+
+        missing = {name for name in names if name not in known}
+
+        if not missing:
+            return 0
+
+        db.session.execute(
+            insert_or_ignore(model.__table__, ["name"]),
+            [{"name": name} for name in sorted(missing)]
+        )
+
+        known.update(
+            (name, id) for (id, name) in
+            db.session.query(model.id, model.name).filter(model.name.in_(missing))
+        )
+
+        return len(missing)
+
+    def ensure_ingredients(self, names):
+        """Creates any ingredients in names not already known.
+        Returns number of ingredients created."""
+
+        return self.ensure_names(Ingredient, self.ingredients, names)
+
+    def rows_for(self, extracted):
+        """Splits extracted drink fields into rows for drinks, instructions and drinks_ingredients."""
+
+        drink = {key: val for (key, val) in extracted.items() if key not in ("category", "glass", "instructions", "ingredients")}
+        drink["category_id"] = self.categories[extracted["category"]]
+        drink["glass_id"] = self.glasses[extracted["glass"]]
+
+        instructions = [{
+            "drink_id": drink["id"],
+            "language_id": self.languages["EN" if lang_code == "" else lang_code],
+            "steps": Instruction.split_steps(text)
+        } for (lang_code, text) in extracted["instructions"]]
+
+        drink_ingredients = [{
+            "drink_id": drink["id"],
+            "ingredient_id": self.ingredients[name],
+            "quantity": quantity
+        } for (name, quantity) in extracted["ingredients"]]
+
+        return [drink, instructions, drink_ingredients]
+
+    def insert(self, table, rows, stats):
+        """Inserts rows into table in executemany batches of batch_size."""
+
+        for start in range(0, len(rows), self.batch_size):
+            db.session.execute(table.insert(), rows[start:start + self.batch_size])
+
+        stats.add(table.name, len(rows))
+
+    def prepare(self, payloads, stats):
+        """Creates missing categories, glasses and ingredients for payloads.
+        Returns rows for drinks, instructions and drinks_ingredients."""
+
+        extracted = [Drink.extract_drink_data(data) for data in payloads]
+
+        stats.add(Category.__tablename__, self.ensure_names(Category, self.categories, (fields["category"] for fields in extracted)))
+        stats.add(Glass.__tablename__, self.ensure_names(Glass, self.glasses, (fields["glass"] for fields in extracted)))
+        stats.add(Ingredient.__tablename__, self.ensure_ingredients(
+            name for fields in extracted for (name, _) in fields["ingredients"]
+        ))
+
+        [drinks, instructions, drink_ingredients] = [[], [], []]
+
+        for fields in extracted:
+            [drink, drink_instructions, drink_ingrs] = self.rows_for(fields)
+            drinks.append(drink)
+            instructions.extend(drink_instructions)
+            drink_ingredients.extend(drink_ingrs)
+
+        return [drinks, instructions, drink_ingredients]
+
+    def load(self, payloads, stats=None):
+        """Loads raw thecocktaildb drink payloads and commits.
+        Returns LoadStats for the load."""
+
+        stats = stats or LoadStats()
+        [drinks, instructions, drink_ingredients] = self.prepare(payloads, stats)
+
+        self.insert(Drink.__table__, drinks, stats)
+        self.insert(Instruction.__table__, instructions, stats)
+        self.insert(DrinkIngredient.__table__, drink_ingredients, stats)
+
+        db.session.commit()
+
+        return stats.finish()
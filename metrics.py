@@ -0,0 +1,296 @@
+"""Per-request timing of SQL, templates, JSON serialization and password hashing, per view.
+
+init_app(app) records for each request its view (the endpoint, e.g.
+main.get_drinks), status, total time, SQL statement count, and the time
+spent in each of PHASES. Totals are kept in the process's registry and
+exposed in the Prometheus text format by /metrics. With SERVER_TIMING the
+request's phases are also sent in a Server-Timing header, where browser
+dev tools show them. Statements slower than SLOW_QUERY_MS and requests
+slower than SLOW_REQUEST_MS are logged with their view.
+
+Metrics are per process: under gunicorn each worker counts the requests
+it served, so scrape every worker or sum what they report."""
+
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from flask import current_app, g, has_app_context, has_request_context, request, before_render_template, template_rendered
+from flask.json import JSONEncoder
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PHASES = ["db", "template", "serialize", "bcrypt"]
+
+# Upper bounds of request duration buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestTiming:
+    """Time spent by one request, in total and per phase, and its SQL statement count."""
+
+    def __init__(self):
+
+        self.start = perf_counter()
+        self.queries = 0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.marks = []
+
+    def elapsed(self):
+        """Returns seconds since the request started."""
+
+        return perf_counter() - self.start
+
+    def server_timing(self):
+        """Returns Server-Timing header value of the phases that took time, and the total."""
+
+        metrics = [f'db;dur={self.phases["db"] * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f"{phase};dur={seconds * 1000:.1f}" for (phase, seconds) in self.phases.items()
+                    if phase != "db" and seconds]
+
+        return ", ".join(metrics + [f"total;dur={self.elapsed() * 1000:.1f}"])
+
+
+def current_timing():
+    """Returns RequestTiming of the current request, or None outside an instrumented request."""
+
+    if has_request_context():
+        return g.get("request_timing")
+
+    return None
+
+
+def observe(phase, seconds):
+    """Adds seconds spent in phase to the current request, if any."""
+
+    timing = current_timing()
+
+    if timing is not None:
+        timing.phases[phase] += seconds
+
+
+@contextmanager
+def timed(phase):
+    """Context manager adding the time spent in its block to phase of the current request."""
+
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, perf_counter() - start)
+
+
+class TimedJSONEncoder(JSONEncoder):
+    """App JSON encoder counting its time as serialization."""
+
+    def encode(self, o):
+        with timed("serialize"):
+            return super().encode(o)
+
+
+class Registry:
+    """Request totals of this process, per view."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drops every recorded request."""
+
+        with self.lock:
+            self.views = {}
+            self.statuses = {}
+
+    def record(self, view, status, timing):
+        """Adds a request to view that answered status after timing."""
+
+        seconds = timing.elapsed()
+
+        with self.lock:
+            totals = self.views.get(view)
+
+            if totals is None:
+                totals = self.views[view] = {
+                    "requests": 0, "seconds": 0.0, "queries": 0,
+                    "buckets": [0] * len(self.buckets), "phases": dict.fromkeys(PHASES, 0.0)
+                }
+
+            totals["requests"] += 1
+            totals["seconds"] += seconds
+            totals["queries"] += timing.queries
+
+            for (i, bound) in enumerate(self.buckets):
+                if seconds <= bound:
+                    totals["buckets"][i] += 1
+
+            for (phase, spent) in timing.phases.items():
+                totals["phases"][phase] += spent
+
+            self.statuses[(view, status)] = self.statuses.get((view, status), 0) + 1
+
+    def snapshot(self):
+        """Returns (copy of per view totals, copy of request counts per (view, status))."""
+
+        with self.lock:
+            return (
+                {view: {**totals, "buckets": list(totals["buckets"]), "phases": dict(totals["phases"])}
+                 for (view, totals) in self.views.items()},
+                dict(self.statuses)
+            )
+
+
+registry = Registry()
+
+
+def view_name():
+    """Returns endpoint of the current request, or a placeholder when there is none."""
+
+    if not has_request_context():
+        return "no request"
+
+    return request.endpoint or "unmatched"
+
+
+# Listening on the Engine class rather than on db.engine covers engines made after
+# init_app, as Flask-SQLAlchemy does when SQLALCHEMY_ECHO or the URI changes
+@event.listens_for(Engine, "before_cursor_execute")
+def query_started(conn, cursor, statement, parameters, context, executemany):
+    """Marks the start of a statement on conn."""
+
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def query_finished(conn, cursor, statement, parameters, context, executemany):
+    """Adds a finished statement to the current request, and logs it if it was slow."""
+
+    seconds = perf_counter() - conn.info["query_start"].pop()
+    timing = current_timing()
+
+    if timing is not None:
+        timing.queries += 1
+        timing.phases["db"] += seconds
+
+    if has_app_context() and current_app.config.get("METRICS") and seconds * 1000 > current_app.config["SLOW_QUERY_MS"]:
+        current_app.logger.warning("Slow query in %s: %.1f ms\n%s", view_name(), seconds * 1000, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def query_failed(context):
+    """Drops the start mark of a failed statement."""
+
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+
+    if starts:
+        starts.pop()
+
+
+def labels(**values):
+    """Returns Prometheus label set of values."""
+
+    pairs = []
+
+    for (key, value) in values.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+def exposition(registry, hashing=None, login=None):
+    """Returns Prometheus text exposition of registry, plus hashing pool stats
+    (passwords.HashingPool.stats) and login limiter stats (ratelimit.RateLimiter.stats) if given."""
+
+    [views, statuses] = registry.snapshot()
+    lines = []
+
+    def family(name, kind, help):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("mixology_requests_total", "counter", "Requests served, per view and status.")
+    for ((view, status), count) in sorted(statuses.items()):
+        lines.append(f"mixology_requests_total{labels(view=view, status=status)} {count}")
+
+    family("mixology_request_duration_seconds", "histogram", "Request duration, per view.")
+    for (view, totals) in sorted(views.items()):
+        for (bound, count) in zip(registry.buckets, totals["buckets"]):
+            lines.append(f"mixology_request_duration_seconds_bucket{labels(view=view, le=bound)} {count}")
+        lines.append(f'mixology_request_duration_seconds_bucket{labels(view=view, le="+Inf")} {totals["requests"]}')
+        lines.append(f"mixology_request_duration_seconds_sum{labels(view=view)} {totals['seconds']:.6f}")
+        lines.append(f"mixology_request_duration_seconds_count{labels(view=view)} {totals['requests']}")
+
+    family("mixology_queries_total", "counter", "SQL statements run, per view.")
+    for (view, totals) in sorted(views.items()):
+        lines.append(f"mixology_queries_total{labels(view=view)} {totals['queries']}")
+
+    family("mixology_phase_seconds_total", "counter", "Time spent in database, template, serialization and bcrypt work, per view.")
+    for (view, totals) in sorted(views.items()):
+        for (phase, seconds) in totals["phases"].items():
+            lines.append(f"mixology_phase_seconds_total{labels(view=view, phase=phase)} {seconds:.6f}")
+
+    if hashing is not None:
+        family("mixology_hashing_pending", "gauge", "Password hashes running or queued.")
+        lines.append(f"mixology_hashing_pending {hashing['pending']}")
+        family("mixology_hashing_pending_max", "gauge", "Most password hashes running or queued at once.")
+        lines.append(f"mixology_hashing_pending_max {hashing['max_pending']}")
+        family("mixology_hashing_total", "counter", "Password hashes completed or rejected because the pool was busy.")
+        lines.append(f"mixology_hashing_total{labels(result='completed')} {hashing['completed']}")
+        lines.append(f"mixology_hashing_total{labels(result='rejected')} {hashing['rejected']}")
+
+    if login is not None:
+        family("mixology_login_attempts_total", "counter", "Login attempts allowed or rejected by the rate limiter, per key prefix.")
+        for (prefix, counts) in sorted(login.items()):
+            for (result, count) in sorted(counts.items()):
+                lines.append(f"mixology_login_attempts_total{labels(prefix=prefix, result=result)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """Records timings of app's requests, unless its METRICS setting is off."""
+
+    if not app.config["METRICS"]:
+        return
+
+    def template_started(sender, template, context, **extra):
+        timing = current_timing()
+
+        if timing is not None:
+            timing.marks.append(perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        timing = current_timing()
+
+        if timing is not None and timing.marks:
+            timing.phases["template"] += perf_counter() - timing.marks.pop()
+
+    def start():
+        g.request_timing = RequestTiming()
+
+    def finish(response):
+        timing = g.pop("request_timing", None)
+
+        if timing is None:
+            return response
+
+        registry.record(view_name(), response.status_code, timing)
+
+        if app.config["SERVER_TIMING"]:
+            response.headers["Server-Timing"] = timing.server_timing()
+
+        if timing.elapsed() * 1000 > app.config["SLOW_REQUEST_MS"]:
+            app.logger.warning("Slow request %s %s in %s: %s", request.method, request.path, view_name(), timing.server_timing())
+
+        return response
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+    app.json_encoder = TimedJSONEncoder
+    app.before_request(start)
+    app.after_request(finish)
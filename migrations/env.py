@@ -0,0 +1,68 @@
+"""Alembic environment: migrates the app's database.
+
+The alembic command runs on the database of the app's DATABASE_URL. Code
+calling schema.upgrade or schema.stamp passes its own connection."""
+
+from logging.config import fileConfig
+from alembic import context
+from models import db
+from schema import include_object
+
+config = context.config
+
+target_metadata = db.metadata
+
+
+def configure(**options):
+    """Configures the migration context with the project's comparison options."""
+
+    context.configure(target_metadata=target_metadata, include_object=include_object, **options)
+
+
+def database_url():
+    """Returns DATABASE_URL of the app."""
+
+    from app import app
+
+    return app.config["SQLALCHEMY_DATABASE_URI"]
+
+
+def run_migrations_offline():
+    """Writes the migrations as SQL instead of running them."""
+
+    configure(url=database_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Runs the migrations on the given connection, or on a new one to the app's database."""
+
+    connection = config.attributes.get("connection")
+
+    if connection is not None:
+        configure(connection=connection)
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(database_url())
+
+    with engine.connect() as connection:
+        configure(connection=connection)
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if config.attributes.get("connection") is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,107 @@
+"""Baseline: the schema db.create_all built from the original models.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+A database created by the original seed.py has this schema; record it with
+"alembic stamp 0001", then "alembic upgrade head". (The original schema.sql
+was never run by the app and did not match the models.)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('categories',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('glasses',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('ingredients',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=30), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('languages',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('code', sa.String(length=10), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('drinks',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('image_url', sa.Text(), nullable=True),
+    sa.Column('image_attribution', sa.Text(), nullable=True),
+    sa.Column('video_url', sa.Text(), nullable=True),
+    sa.Column('alcoholic', sa.Boolean(), nullable=False),
+    sa.Column('optional_alc', sa.Boolean(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('glass_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['glass_id'], ['glasses.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('username', sa.String(length=30), nullable=False),
+    sa.Column('password', sa.Text(), nullable=False),
+    sa.Column('language_pref_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['language_pref_id'], ['languages.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('bookmarks',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('drink_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['drink_id'], ['drinks.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('user_id', 'drink_id')
+    )
+    op.create_table('drinks_ingredients',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('drink_id', sa.Integer(), nullable=True),
+    sa.Column('ingredient_id', sa.Integer(), nullable=True),
+    sa.Column('quantity', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['drink_id'], ['drinks.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['ingredient_id'], ['ingredients.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('instructions',
+    sa.Column('drink_id', sa.Integer(), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['drink_id'], ['drinks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['language_id'], ['languages.id'], ),
+    sa.PrimaryKeyConstraint('drink_id', 'language_id')
+    )
+
+
+def downgrade():
+    op.drop_table('instructions')
+    op.drop_table('drinks_ingredients')
+    op.drop_table('bookmarks')
+    op.drop_table('users')
+    op.drop_table('drinks')
+    op.drop_table('languages')
+    op.drop_table('ingredients')
+    op.drop_table('glasses')
+    op.drop_table('categories')
@@ -0,0 +1,34 @@
+"""Per-drink content hashes, soft deletes and the catalog version.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Existing drinks get no content hash, so the next sync rewrites each of
+them once and records one.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('drinks', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('drinks', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('drinks', 'deleted_at')
+    op.drop_column('drinks', 'content_hash')
+    op.drop_table('catalog_state')
@@ -0,0 +1,74 @@
+"""Search documents for ranked full text and fuzzy search.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+drink_search is filled with a document per listed drink, weighted like
+search.rebuild_documents, so search works before the next catalog change.
+The pg_trgm indexes are created when the extension is available.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# pg_trgm indexes for substring and fuzzy search
+TRIGRAM_INDEXES = {
+    "ix_drinks_name_trgm": ("drinks", "name"),
+    "ix_drink_search_name_trgm": ("drink_search", "name"),
+    "ix_drink_search_ingredients_trgm": ("drink_search", "ingredients")
+}
+
+BACKFILL = """
+INSERT INTO drink_search (drink_id, name, ingredients, instructions)
+SELECT drinks.id, drinks.name,
+    coalesce((SELECT string_agg(ingredients.name, ' ' ORDER BY drinks_ingredients.id)
+              FROM drinks_ingredients JOIN ingredients ON ingredients.id = drinks_ingredients.ingredient_id
+              WHERE drinks_ingredients.drink_id = drinks.id), ''),
+    coalesce((SELECT string_agg(instructions.text, ' ' ORDER BY instructions.language_id)
+              FROM instructions
+              WHERE instructions.drink_id = drinks.id), '')
+FROM drinks
+WHERE drinks.deleted_at IS NULL
+"""
+
+VECTORS = """
+UPDATE drink_search SET tsv = setweight(to_tsvector('english', name), 'A')
+    || setweight(to_tsvector('english', ingredients), 'B')
+    || setweight(to_tsvector('english', instructions), 'C')
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('drink_search',
+    sa.Column('drink_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('ingredients', sa.Text(), nullable=False),
+    sa.Column('instructions', sa.Text(), nullable=False),
+    sa.Column('tsv', sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'), nullable=True),
+    sa.ForeignKeyConstraint(['drink_id'], ['drinks.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('drink_id')
+    )
+    op.execute(BACKFILL)
+    op.execute(VECTORS)
+    op.create_index('ix_drink_search_tsv', 'drink_search', ['tsv'], unique=False, postgresql_using='gin')
+
+    if op.get_bind().exec_driver_sql("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'").scalar():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        for (name, (table, column)) in TRIGRAM_INDEXES.items():
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade():
+    for name in TRIGRAM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.drop_index('ix_drink_search_tsv', table_name='drink_search', postgresql_using='gin')
+    op.drop_table('drink_search')
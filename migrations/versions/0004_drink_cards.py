@@ -0,0 +1,89 @@
+"""Display ready drink cards, the read model of the drink listing.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+drink_cards is filled with a card per listed drink, formatted like
+cards.rebuild_cards, so listings show drinks before the next catalog
+change. The pg_trgm name index is created when the extension is installed.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+BATCH_SIZE = 1000
+
+TRIGRAM_INDEX = "ix_drink_cards_sort_name_trgm"
+
+LISTED_DRINKS = """
+SELECT drinks.id, drinks.name, drinks.image_url, drinks.image_attribution,
+    drinks.alcoholic, drinks.optional_alc, drinks.category_id, categories.name,
+    ARRAY(SELECT DISTINCT drinks_ingredients.ingredient_id FROM drinks_ingredients
+          WHERE drinks_ingredients.drink_id = drinks.id AND drinks_ingredients.ingredient_id IS NOT NULL
+          ORDER BY 1)
+FROM drinks JOIN categories ON categories.id = drinks.category_id
+WHERE drinks.deleted_at IS NULL
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def card(id, name, image_url, image_attribution, alcoholic, optional_alc, category_id, category, ingredient_ids):
+    """Returns drink_cards row of a listed drink."""
+
+    return {
+        "drink_id": id,
+        "sort_name": name,
+        "name": name.title(),
+        "image_url": image_url,
+        "image_attribution": image_attribution,
+        "alcoholic": alcoholic,
+        "optional_alc": optional_alc,
+        "category_id": category_id,
+        "category": category.title(),
+        "ingredient_count": len(ingredient_ids),
+        "ingredient_ids": ingredient_ids
+    }
+
+
+def upgrade():
+    cards = op.create_table('drink_cards',
+    sa.Column('drink_id', sa.Integer(), nullable=False),
+    sa.Column('sort_name', sa.String(length=100), nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.Text(), nullable=True),
+    sa.Column('image_attribution', sa.Text(), nullable=True),
+    sa.Column('alcoholic', sa.Boolean(), nullable=False),
+    sa.Column('optional_alc', sa.Boolean(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('category', sa.Text(), nullable=False),
+    sa.Column('ingredient_count', sa.Integer(), nullable=False),
+    sa.Column('ingredient_ids', sa.JSON().with_variant(postgresql.ARRAY(sa.Integer()), 'postgresql'), nullable=False),
+    sa.ForeignKeyConstraint(['drink_id'], ['drinks.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('drink_id')
+    )
+
+    listed = op.get_bind().exec_driver_sql(LISTED_DRINKS)
+
+    for rows in listed.partitions(BATCH_SIZE):
+        op.bulk_insert(cards, [card(*row) for row in rows])
+
+    op.create_index('ix_drink_cards_category_sort', 'drink_cards', ['category_id', 'sort_name', 'drink_id'], unique=False)
+    op.create_index('ix_drink_cards_ingredient_ids', 'drink_cards', ['ingredient_ids'], unique=False, postgresql_using='gin')
+    op.create_index('ix_drink_cards_sort', 'drink_cards', ['sort_name', 'drink_id'], unique=False)
+
+    if op.get_bind().exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").scalar():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON drink_cards USING gin (sort_name gin_trgm_ops)")
+
+
+def downgrade():
+    op.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+    op.drop_index('ix_drink_cards_sort', table_name='drink_cards')
+    op.drop_index('ix_drink_cards_ingredient_ids', table_name='drink_cards', postgresql_using='gin')
+    op.drop_index('ix_drink_cards_category_sort', table_name='drink_cards')
+    op.drop_table('drink_cards')
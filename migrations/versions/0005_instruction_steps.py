@@ -0,0 +1,46 @@
+"""Instructions stored as lists of steps.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Each instruction's text is split into its non-blank lines, stripped, as
+Instruction.split_steps does at ingest. Drink content hashes are left as
+they are: the steps hold the same text, so a sync has nothing to rewrite.
+Downgrading joins the steps back with line breaks.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Lines of text, stripped, in order, without the blank ones
+SPLIT_STEPS = r"""
+UPDATE instructions SET steps = ARRAY(
+    SELECT step FROM (
+        SELECT regexp_replace(line, '^\s+|\s+$', '', 'g') AS step, n
+        FROM regexp_split_to_table(text, '\r\n|[\n\r\v\f]') WITH ORDINALITY AS lines (line, n)
+    ) AS stripped
+    WHERE step <> ''
+    ORDER BY n
+)
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('instructions', sa.Column('steps', sa.JSON().with_variant(postgresql.ARRAY(sa.Text()), 'postgresql'), nullable=True))
+    op.execute(SPLIT_STEPS)
+    op.alter_column('instructions', 'steps', existing_type=postgresql.ARRAY(sa.Text()), nullable=False)
+    op.drop_column('instructions', 'text')
+
+
+def downgrade():
+    op.add_column('instructions', sa.Column('text', sa.Text(), nullable=True))
+    op.execute("UPDATE instructions SET text = array_to_string(steps, E'\\n')")
+    op.alter_column('instructions', 'text', existing_type=sa.Text(), nullable=False)
+    op.drop_column('instructions', 'steps')
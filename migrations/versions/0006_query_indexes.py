@@ -0,0 +1,52 @@
+"""Indexes and constraints for the queries the routes run.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+drinks_ingredients is read by drink (drink pages, syncs, card and search
+rebuilds) and by ingredient (deleting one, ingredient filters off
+PostgreSQL); both composites cover those lookups. The other indexes serve
+foreign keys whose parent rows are deleted or looked up by them. Rows
+without a drink or ingredient were never readable, and are dropped before
+the columns become NOT NULL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_bookmarks_drink_id'), 'bookmarks', ['drink_id'], unique=False)
+    op.create_index(op.f('ix_drinks_category_id'), 'drinks', ['category_id'], unique=False)
+    op.create_index(op.f('ix_drinks_glass_id'), 'drinks', ['glass_id'], unique=False)
+    op.execute("DELETE FROM drinks_ingredients WHERE drink_id IS NULL OR ingredient_id IS NULL")
+    op.alter_column('drinks_ingredients', 'drink_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+    op.alter_column('drinks_ingredients', 'ingredient_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+    op.create_index('ix_drinks_ingredients_drink_ingredient', 'drinks_ingredients', ['drink_id', 'ingredient_id'], unique=False)
+    op.create_index('ix_drinks_ingredients_ingredient_drink', 'drinks_ingredients', ['ingredient_id', 'drink_id'], unique=False)
+    op.create_index(op.f('ix_instructions_language_id'), 'instructions', ['language_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_instructions_language_id'), table_name='instructions')
+    op.drop_index('ix_drinks_ingredients_ingredient_drink', table_name='drinks_ingredients')
+    op.drop_index('ix_drinks_ingredients_drink_ingredient', table_name='drinks_ingredients')
+    op.alter_column('drinks_ingredients', 'ingredient_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+    op.alter_column('drinks_ingredients', 'drink_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+    op.drop_index(op.f('ix_drinks_glass_id'), table_name='drinks')
+    op.drop_index(op.f('ix_drinks_category_id'), table_name='drinks')
+    op.drop_index(op.f('ix_bookmarks_drink_id'), table_name='bookmarks')
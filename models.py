@@ -1,12 +1,22 @@
 """Database SQLAlchemy Models"""
 
+import hashlib, json
+from datetime import datetime
+from blinker import Namespace
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
+from sqlalchemy import delete, event, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import backref
+from passwords import check_password, hash_password, needs_rehash
 
 
 db = SQLAlchemy()
-bcrypt = Bcrypt()
+
+catalog_signals = Namespace()
+
+# Sent with the new catalog version after drinks are inserted, updated or deleted.
+# Receivers get drink_ids, the set of ids that changed.
+catalog_changed = catalog_signals.signal("catalog-changed")
 
 def submit_data(model):
     """Add and commit model to database"""
@@ -14,6 +24,17 @@ def submit_data(model):
     db.session.add(model)
     db.session.commit()
 
+def insert_or_ignore(table, index_elements):
+    """Returns INSERT statement for table that skips rows conflicting on index_elements.
+    Uses INSERT ... ON CONFLICT DO NOTHING on both PostgreSQL and SQLite."""
+
+    if db.engine.dialect.name == "postgresql":
+        dialect = postgresql
+    else:
+        from sqlalchemy.dialects import sqlite as dialect
+
+    return dialect.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
 def connect_db(app):
     """Connect to database"""
     
@@ -50,7 +71,9 @@ class User(db.Model):
 
     bookmarks = db.relationship(
         "Drink",
-        secondary="bookmarks"
+        secondary="bookmarks",
+        secondaryjoin="and_(Bookmark.drink_id == Drink.id, Drink.deleted_at == None)",
+        viewonly=True
     )
 
     def __repr__(self):
@@ -63,8 +86,7 @@ class User(db.Model):
         """Register new user account"""
 
         username = username
-        hashed = bcrypt.generate_password_hash(pwd, rounds=14)
-        hashed_utf8 = hashed.decode("utf8")
+        hashed_utf8 = hash_password(pwd)
 
         user = cls(username=username, password=hashed_utf8, language_pref_id=lang_pref_id)
         submit_data(user)
@@ -76,11 +98,16 @@ class User(db.Model):
         """Authenticate user.
         
         Returns user instance if password matches.
-        Returns False if no user is found or if password hashes do not match"""
+        Returns False if no user is found or if password hashes do not match.
+        A matching password stored at a lower cost is rehashed at the configured one."""
 
         user = cls.query.filter_by(username=username).one_or_none()
 
-        if user and bcrypt.check_password_hash(user.password, pwd):
+        if user and check_password(user.password, pwd):
+            if needs_rehash(user.password):
+                user.password = hash_password(pwd)
+                db.session.commit()
+
             return user
         else:
             return False
@@ -99,12 +126,6 @@ class User(db.Model):
             "username": self.username,
             "language_pref": self.language_pref.code
         }
-    
-    def has_bookmark(self, drink_id):
-        """Finds relevant bookmark for user object by drink id.
-        Returns bookmark object if found, else None."""
-
-        return Bookmark.query.filter_by(drink_id=drink_id, user_id=self.id).one_or_none()            
 
 class Language(db.Model):
     """Model class for languages"""
@@ -134,9 +155,12 @@ class Language(db.Model):
     
     @classmethod
     def get_id(cls, code):
-        """Get id of language code based on array index."""
+        """Get id of language code, from the reference data registry.
+        An empty code is English, as in thecocktaildb's strInstructions key."""
+
+        from reference import reference_data
 
-        return ["", "DE", "ES", "FR", "IT", "ZH-HANS", "ZH-HANT"].index(code) + 1
+        return reference_data.get().languages.id(code or "EN")
 
 class Category(db.Model):
     """Model class for drink categories"""
@@ -181,7 +205,8 @@ class Glass(db.Model):
         return f"<Glass {self.id} {self.name}>"
     
 class Instruction(db.Model):
-    """Model class for drink recipe instructions"""
+    """Model class for drink recipe instructions.
+    Text is split into steps once at ingest, so pages render them without parsing."""
 
     __tablename__ = "instructions"
 
@@ -194,11 +219,12 @@ class Instruction(db.Model):
     language_id = db.Column(
         db.Integer,
         db.ForeignKey("languages.id"),
-        primary_key=True
+        primary_key=True,
+        index=True
     )
 
-    text = db.Column(
-        db.Text,
+    steps = db.Column(
+        db.JSON().with_variant(postgresql.ARRAY(db.Text), "postgresql"),
         nullable=False
     )
 
@@ -209,6 +235,13 @@ class Instruction(db.Model):
 
         return f"<Instruction drink({self.drink_id}) lang({self.language.code})>"
 
+    @staticmethod
+    def split_steps(text):
+        """Returns list of the non-blank lines of instruction text, stripped.
+        thecocktaildb separates steps with line breaks, when it separates them at all."""
+
+        return [step.strip() for step in text.splitlines() if step.strip()]
+
 
 class Ingredient(db.Model):
     """Model class for recipe ingredient"""
@@ -235,13 +268,16 @@ class Ingredient(db.Model):
     def get_ids(cls, ingredient_names):
         """Takes list of ingredient names and returns their ids"""
 
+        from reference import reference_data
+
+        known = reference_data.get().ingredients
         ids = []
 
         for name in ingredient_names:
-            ingredient = cls.query.filter_by(name=name).one_or_none()
+            ingredient = known.id(name) or cls.query.filter_by(name=name).with_entities(cls.id).scalar()
 
             if ingredient:
-                ids.append(ingredient.id)
+                ids.append(ingredient)
             else:
                 cls.create(name)
                 ids.append(cls.query.filter_by(name=name).one().id)
@@ -262,6 +298,12 @@ class DrinkIngredient(db.Model):
 
     __tablename__ = "drinks_ingredients"
 
+    # A drink's recipe, and the drinks containing an ingredient, are both read by index
+    __table_args__ = (
+        db.Index("ix_drinks_ingredients_drink_ingredient", "drink_id", "ingredient_id"),
+        db.Index("ix_drinks_ingredients_ingredient_drink", "ingredient_id", "drink_id"),
+    )
+
     id = db.Column(
         db.Integer,
         primary_key=True,
@@ -271,11 +313,13 @@ class DrinkIngredient(db.Model):
     drink_id = db.Column(
         db.Integer,
         db.ForeignKey("drinks.id", ondelete="cascade"),
+        nullable=False
     )
 
     ingredient_id = db.Column(
         db.Integer,
-        db.ForeignKey("ingredients.id", ondelete="cascade")
+        db.ForeignKey("ingredients.id", ondelete="cascade"),
+        nullable=False
     )
 
     quantity = db.Column(
@@ -338,15 +382,21 @@ class Drink(db.Model):
     category_id = db.Column(
         db.Integer,
         db.ForeignKey("categories.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     glass_id = db.Column(
         db.Integer,
         db.ForeignKey("glasses.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
+    content_hash = db.Column(db.String(64))
+
+    deleted_at = db.Column(db.DateTime)
+
     instructions = db.relationship(
         "Instruction",
         backref="drink"
@@ -386,15 +436,19 @@ class Drink(db.Model):
 
         return self.video_url.split("=")[-1]
     
-    @classmethod
-    def parse_drink_data(cls, data):
-        """Parses JSON data from thecocktaildb API
-        Returns appropriate Drink, Instruction,
-        and DrinkIngredient models into an array
-        """
+    @staticmethod
+    def hash_drink_data(data):
+        """Returns SHA-256 hex digest of a thecocktaildb API drink payload.
+        Equal payloads give equal hashes regardless of key order."""
+
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf8")).hexdigest()
 
-        category_id = Category.query.filter_by(name=data["strCategory"].lower()).one().id
-        glass_id = Glass.query.filter_by(name=data["strGlass"].lower()).one().id
+    @staticmethod
+    def extract_drink_data(data):
+        """Extracts fields from a thecocktaildb API drink payload without touching the database.
+        Returns dict of drink column values, with category and glass names in place of ids,
+        plus "instructions" as (language code, text) pairs
+        and "ingredients" as (ingredient name, quantity) pairs."""
 
         [instr_data, ingr_data, quant_data] = [[], [], []]
 
@@ -407,35 +461,214 @@ class Drink(db.Model):
                 if "Instructions" in key:
                     instr_data.append((key[15:], val))
 
+        return {
+            "id": int(data["idDrink"]),
+            "alcoholic": (True if data["strAlcoholic"].lower() == "alcoholic" else False),
+            "optional_alc": (True if data["strAlcoholic"].lower() == "optional alcohol" else False),
+            "category": data["strCategory"].lower(),
+            "name": data["strDrink"].lower(),
+            "image_url": data["strDrinkThumb"] if data["strDrinkThumb"] else data["strImageSource"],
+            "image_attribution": data["strImageAttribution"],
+            "glass": data["strGlass"].lower(),
+            "video_url": data["strVideo"],
+            "content_hash": Drink.hash_drink_data(data),
+            "instructions": instr_data,
+            "ingredients": list(zip(ingr_data, quant_data))
+        }
+
+    @classmethod
+    def parse_drink_data(cls, data):
+        """Parses JSON data from thecocktaildb API
+        Returns appropriate Drink, Instruction,
+        and DrinkIngredient models into an array
+        """
+
+        fields = cls.extract_drink_data(data)
+        instr_data = fields.pop("instructions")
+        ingr_data = [name for (name, _) in fields["ingredients"]]
+        quant_data = [quantity for (_, quantity) in fields.pop("ingredients")]
+
+        from reference import reference_data
+
+        reference = reference_data.get()
+        category_id = reference.categories.id(fields.pop("category"))
+        glass_id = reference.glasses.id(fields.pop("glass"))
+
         instructions = [
             Instruction(
-                drink_id=data["idDrink"],
+                drink_id=fields["id"],
                 language_id=Language.get_id(lang_code),
-                text=text
+                steps=Instruction.split_steps(text)
             ) for (lang_code, text) in instr_data]
 
         drink_ingredients = DrinkIngredient.generate_models(
-            data["idDrink"],
+            fields["id"],
             Ingredient.get_ids(ingr_data),
             quant_data
         )
 
         return [
-            cls(
-                id=data["idDrink"],
-                alcoholic=(True if data["strAlcoholic"].lower() == "alcoholic" else False),
-                optional_alc=(True if data["strAlcoholic"].lower() == "optional alcohol" else False),
-                category_id=category_id,
-                name=data["strDrink"].lower(),
-                image_url=data["strDrinkThumb"] if data["strDrinkThumb"] else data["strImageSource"],
-                image_attribution=data["strImageAttribution"],
-                glass_id=glass_id,
-                video_url=data["strVideo"]
-            ),
+            cls(category_id=category_id, glass_id=glass_id, **fields),
             instructions,
             drink_ingredients
         ]
 
+class DrinkSearchDocument(db.Model):
+    """Model class for the searchable text of a drink.
+    Rows are rebuilt by search.rebuild_documents whenever the catalog changes."""
+
+    __tablename__ = "drink_search"
+
+    drink_id = db.Column(
+        db.Integer,
+        db.ForeignKey("drinks.id", ondelete="cascade"),
+        primary_key=True
+    )
+
+    name = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    ingredients = db.Column(
+        db.Text,
+        nullable=False,
+        default=""
+    )
+
+    instructions = db.Column(
+        db.Text,
+        nullable=False,
+        default=""
+    )
+
+    # Weighted full-text vector of the columns above, only filled on PostgreSQL.
+    tsv = db.Column(db.Text().with_variant(postgresql.TSVECTOR(), "postgresql"))
+
+    __table_args__ = (
+        db.Index("ix_drink_search_tsv", "tsv", postgresql_using="gin"),
+    )
+
+    def __repr__(self):
+        """Returns string representation of instance"""
+
+        return f"<DrinkSearchDocument drink:{self.drink_id}>"
+
+def enable_trigram(connection):
+    """Installs pg_trgm on connection's database if available. Returns True if it is installed."""
+
+    if connection.dialect.name != "postgresql":
+        return False
+
+    if not connection.exec_driver_sql("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'").scalar():
+        return False
+
+    connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    return True
+
+@event.listens_for(DrinkSearchDocument.__table__, "after_create")
+def create_trigram_indexes(target, connection, **kw):
+    """Creates pg_trgm indexes for substring and fuzzy search when the extension is available."""
+
+    if not enable_trigram(connection):
+        return
+
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_drinks_name_trgm ON drinks USING gin (name gin_trgm_ops)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_drink_search_name_trgm ON drink_search USING gin (name gin_trgm_ops)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_drink_search_ingredients_trgm ON drink_search USING gin (ingredients gin_trgm_ops)")
+
+class DrinkCard(db.Model):
+    """Model class for the display ready listing row of a drink.
+    Rows are rebuilt by cards.rebuild_cards whenever the catalog changes;
+    soft-deleted drinks have none."""
+
+    __tablename__ = "drink_cards"
+
+    drink_id = db.Column(
+        db.Integer,
+        db.ForeignKey("drinks.id", ondelete="cascade"),
+        primary_key=True
+    )
+
+    # Drink.name as stored, lowercase; listings sort and match on it
+    sort_name = db.Column(
+        db.String(100),
+        nullable=False
+    )
+
+    # Title cased for display, as Drink.serialize() returns it
+    name = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    image_url = db.Column(db.Text)
+
+    image_attribution = db.Column(db.Text)
+
+    alcoholic = db.Column(
+        db.Boolean,
+        nullable=False
+    )
+
+    optional_alc = db.Column(
+        db.Boolean,
+        nullable=False
+    )
+
+    category_id = db.Column(
+        db.Integer,
+        nullable=False
+    )
+
+    category = db.Column(
+        db.Text,
+        nullable=False
+    )
+
+    ingredient_count = db.Column(
+        db.Integer,
+        nullable=False
+    )
+
+    # Sorted ingredient ids; an indexed integer array on PostgreSQL, JSON elsewhere.
+    ingredient_ids = db.Column(
+        db.JSON().with_variant(postgresql.ARRAY(db.Integer), "postgresql"),
+        nullable=False
+    )
+
+    __table_args__ = (
+        db.Index("ix_drink_cards_sort", "sort_name", "drink_id"),
+        db.Index("ix_drink_cards_category_sort", "category_id", "sort_name", "drink_id"),
+        db.Index("ix_drink_cards_ingredient_ids", "ingredient_ids", postgresql_using="gin"),
+    )
+
+    def __repr__(self):
+        """Returns string representation of instance"""
+
+        return f"<DrinkCard drink:{self.drink_id}>"
+
+    def serialize(self):
+        """Returns dict object containing drink data, the same as Drink.serialize()"""
+
+        return {
+            "id": self.drink_id,
+            "name": self.name,
+            "image_url": self.image_url,
+            "image_attribution": self.image_attribution,
+            "alcoholic": self.alcoholic,
+            "optional_alc": self.optional_alc,
+            "category": self.category,
+            "category_id": self.category_id
+        }
+
+@event.listens_for(DrinkCard.__table__, "after_create")
+def create_card_trigram_index(target, connection, **kw):
+    """Creates a pg_trgm index for substring name search when the extension is available."""
+
+    if enable_trigram(connection):
+        connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_drink_cards_sort_name_trgm ON drink_cards USING gin (sort_name gin_trgm_ops)")
+
 class Bookmark(db.Model):
     """Model class for user bookmarks"""
 
@@ -447,13 +680,126 @@ class Bookmark(db.Model):
         primary_key=True
     )
 
+    # The primary key serves a user's bookmarks; this serves a drink's, as deleting it does
     drink_id = db.Column(
         db.Integer,
         db.ForeignKey("drinks.id", ondelete="cascade"),
+        primary_key=True,
+        index=True
+    )
+
+    def __repr__(self):
+        """Returns string representation of instance"""
+
+        return f"<Bookmark user:{self.user_id} drink:{self.drink_id}>"
+
+    @classmethod
+    def add_many_statement(cls, user_id, drink_ids):
+        """Returns statement bookmarking drinks of drink_ids for user of user_id,
+        skipping existing bookmarks, unknown and deleted drinks, or None if drink_ids is empty."""
+
+        if not drink_ids:
+            return None
+
+        listed = select(db.literal(user_id), Drink.id).where(Drink.id.in_(drink_ids), Drink.deleted_at == None)
+
+        return insert_or_ignore(cls.__table__, ["user_id", "drink_id"]).from_select(["user_id", "drink_id"], listed)
+
+    @classmethod
+    def remove_many_statement(cls, user_id, drink_ids):
+        """Returns statement deleting bookmarks of drinks of drink_ids for user of user_id,
+        or None if drink_ids is empty."""
+
+        if not drink_ids:
+            return None
+
+        return delete(cls.__table__).where(cls.user_id == user_id, cls.drink_id.in_(drink_ids))
+
+    @classmethod
+    def drink_ids_statement(cls, user_id):
+        """Returns statement selecting ids of drinks bookmarked by user of user_id."""
+
+        return select(cls.drink_id).where(cls.user_id == user_id)
+
+    @classmethod
+    def add_many(cls, user_id, drink_ids):
+        """Bookmarks drinks of drink_ids for user of user_id in one statement.
+        Existing bookmarks, unknown and deleted drinks are skipped. Does not commit."""
+
+        statement = cls.add_many_statement(user_id, drink_ids)
+
+        if statement is not None:
+            db.session.execute(statement)
+
+    @classmethod
+    def remove_many(cls, user_id, drink_ids):
+        """Deletes bookmarks of drinks of drink_ids for user of user_id in one statement. Does not commit."""
+
+        statement = cls.remove_many_statement(user_id, drink_ids)
+
+        if statement is not None:
+            db.session.execute(statement)
+
+    @classmethod
+    def drink_ids_of(cls, user_id):
+        """Returns set of ids of drinks bookmarked by user of user_id, in one query."""
+
+        return set(db.session.execute(cls.drink_ids_statement(user_id)).scalars())
+
+class CatalogState(db.Model):
+    """Model class for the single row holding the catalog version.
+    The version is bumped whenever drinks are inserted, updated or deleted,
+    so other processes can tell when their cached catalog data is stale."""
+
+    __tablename__ = "catalog_state"
+
+    id = db.Column(
+        db.Integer,
         primary_key=True
     )
 
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+
+    updated_at = db.Column(db.DateTime)
+
     def __repr__(self):
         """Returns string representation of instance"""
 
-        return f"<Bookmark user:{self.user_id} drink:{self.drink_id}>"
\ No newline at end of file
+        return f"<CatalogState version:{self.version}>"
+
+    @classmethod
+    def current_version(cls):
+        """Returns current catalog version, 0 if the catalog was never loaded."""
+
+        return db.session.query(cls.version).filter_by(id=1).scalar() or 0
+
+    @classmethod
+    def current(cls):
+        """Returns (version, updated_at) of the catalog, (0, None) if it was never loaded."""
+
+        return db.session.query(cls.version, cls.updated_at).filter_by(id=1).first() or (0, None)
+
+    @classmethod
+    def bump(cls, drink_ids=()):
+        """Increments and commits catalog version, then sends catalog_changed.
+        An empty drink_ids means the whole catalog may have changed.
+        Returns the new version."""
+
+        updated = cls.query.filter_by(id=1).update({
+            "version": cls.version + 1,
+            "updated_at": datetime.utcnow()
+        }, synchronize_session=False)
+
+        if not updated:
+            db.session.add(cls(id=1, version=1, updated_at=datetime.utcnow()))
+
+        db.session.commit()
+
+        version = cls.current_version()
+        catalog_changed.send(version, drink_ids=set(drink_ids))
+
+        return version
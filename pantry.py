@@ -0,0 +1,98 @@
+"""In-memory inverted ingredient index for "what can I make" queries.
+
+Built once per process from drinks_ingredients and rebuilt when the catalog
+changes, so a request never scans drinks_ingredients itself."""
+
+import heapq
+from array import array
+from catalog import CatalogDerived
+from models import db, Drink, DrinkIngredient
+from queries import InvalidParameter, as_id_list, as_int
+
+# Upper bounds on client supplied max_missing and limit
+MAX_MISSING = 5
+MAX_RESULTS = 100
+
+
+class IngredientIndex:
+    """Maps ingredient ids to sorted arrays of the drink ids using them,
+    and drink ids to sorted arrays of their ingredient ids."""
+
+    def __init__(self, pairs):
+        """pairs is an iterable of (drink_id, ingredient_id)."""
+
+        postings = {}
+        recipes = {}
+
+        for (drink_id, ingredient_id) in pairs:
+            postings.setdefault(ingredient_id, set()).add(drink_id)
+            recipes.setdefault(drink_id, set()).add(ingredient_id)
+
+        self.postings = {id: array("l", sorted(ids)) for (id, ids) in postings.items()}
+        self.recipes = {id: array("l", sorted(ids)) for (id, ids) in recipes.items()}
+
+    def makeable(self, ingredient_ids, max_missing=0, limit=50):
+        """Returns up to limit drinks that can be made from ingredient_ids,
+        missing at most max_missing ingredients, ranked by coverage.
+
+        Each result is a dict with "drink_id", "coverage" (fraction of the
+        drink's ingredients available) and "missing" (sorted ingredient ids)."""
+
+        have = set(ingredient_ids)
+        counts = {}
+
+        for ingredient_id in have:
+            for drink_id in self.postings.get(ingredient_id, ()):
+                counts[drink_id] = counts.get(drink_id, 0) + 1
+
+        candidates = [(drink_id, count, len(self.recipes[drink_id]))
+                      for (drink_id, count) in counts.items()
+                      if len(self.recipes[drink_id]) - count <= max_missing]
+
+        best = heapq.nsmallest(limit, candidates, key=lambda c: (-c[1] / c[2], c[2] - c[1], c[0]))
+
+        return [{
+            "drink_id": drink_id,
+            "coverage": count / total,
+            "missing": [id for id in self.recipes[drink_id] if id not in have]
+        } for (drink_id, count, total) in best]
+
+
+def build_ingredient_index():
+    """Returns IngredientIndex of every listed drink."""
+
+    return IngredientIndex(
+        db.session.query(DrinkIngredient.drink_id, DrinkIngredient.ingredient_id)
+        .join(Drink, Drink.id == DrinkIngredient.drink_id)
+        .filter(Drink.deleted_at == None)
+    )
+
+
+ingredient_index = CatalogDerived(build_ingredient_index)
+
+
+def makeable_params(params):
+    """Returns (ingredient ids, max_missing, limit) from request params, within 0 and the upper bounds.
+    Raises InvalidParameter if params is not an object, or for a value that is not an integer."""
+
+    if not isinstance(params, dict):
+        raise InvalidParameter("INVALID_PARAMETER")
+
+    return (
+        as_id_list(params.get("ingredients", [])),
+        max(0, min(as_int(params.get("max_missing", 0)), MAX_MISSING)),
+        max(0, min(as_int(params.get("limit", 20)), MAX_RESULTS))
+    )
+
+
+def makeable_listing(results, cards, ingredients):
+    """Returns JSON ready list of makeable results, in order, for the drinks with DrinkCards among cards,
+    naming missing ingredients from ingredients, a ReferenceTable."""
+
+    cards = {card.drink_id: card for card in cards}
+
+    return [{
+        **cards[result["drink_id"]].serialize(),
+        "coverage": round(result["coverage"], 3),
+        "missing": [ingredients.name(id).title() for id in result["missing"]]
+    } for result in results if result["drink_id"] in cards]
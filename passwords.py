@@ -0,0 +1,112 @@
+"""Password hashing with a configurable cost, run in a bounded worker pool.
+
+bcrypt is deliberately slow, so hashes are computed on a small pool of
+threads (bcrypt releases the GIL) rather than on request threads without
+limit. When every worker is busy and the queue is full, new work is
+rejected with HashingBusy instead of piling up, so a burst of signups or
+logins cannot take every worker away from the read endpoints.
+
+Configured from the app's BCRYPT_LOG_ROUNDS, BCRYPT_WORKERS and
+BCRYPT_QUEUE settings by init_app."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask_bcrypt import Bcrypt
+from metrics import timed
+
+# The cost hashes were always made at; profiles may only lower it for development and tests
+DEFAULT_LOG_ROUNDS = 14
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE = 8
+
+bcrypt = Bcrypt()
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full."""
+
+
+class HashingPool:
+    """Thread pool running at most workers hashes at once, with at most
+    max_queue more waiting. Tracks queue depth for metrics."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_QUEUE):
+
+        self.lock = threading.Lock()
+        self.counts = {"completed": 0, "rejected": 0, "pending": 0, "max_pending": 0}
+        self.configure(workers, max_queue)
+
+    def configure(self, workers, max_queue):
+        """Replaces the pool with one of workers threads and max_queue queue slots."""
+
+        with self.lock:
+            previous = getattr(self, "executor", None)
+            self.workers = workers
+            self.max_queue = max_queue
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def run(self, fn, *args):
+        """Runs fn(*args) on the pool and returns its result.
+        Raises HashingBusy without running fn if the queue is full."""
+
+        with self.lock:
+            if self.counts["pending"] >= self.workers + self.max_queue:
+                self.counts["rejected"] += 1
+                raise HashingBusy()
+
+            self.counts["pending"] += 1
+            self.counts["max_pending"] = max(self.counts["max_pending"], self.counts["pending"])
+            executor = self.executor
+
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self.lock:
+                self.counts["pending"] -= 1
+                self.counts["completed"] += 1
+
+    def stats(self):
+        """Returns dict of workers, queue size, current pending (running plus queued) work,
+        its high-water mark, and completed and rejected counts."""
+
+        with self.lock:
+            return {"workers": self.workers, "max_queue": self.max_queue, **self.counts}
+
+
+hashing_pool = HashingPool()
+
+settings = {"log_rounds": DEFAULT_LOG_ROUNDS}
+
+
+def init_app(app):
+    """Applies app's password hashing configuration."""
+
+    settings["log_rounds"] = int(app.config.get("BCRYPT_LOG_ROUNDS", DEFAULT_LOG_ROUNDS))
+    hashing_pool.configure(
+        int(app.config.get("BCRYPT_WORKERS", DEFAULT_WORKERS)),
+        int(app.config.get("BCRYPT_QUEUE", DEFAULT_QUEUE))
+    )
+
+
+def hash_password(password):
+    """Returns bcrypt hash of password, as text, at the configured cost."""
+
+    with timed("bcrypt"):
+        return hashing_pool.run(bcrypt.generate_password_hash, password, settings["log_rounds"]).decode("utf8")
+
+
+def check_password(hashed, password):
+    """Returns True if password matches bcrypt hash hashed."""
+
+    with timed("bcrypt"):
+        return hashing_pool.run(bcrypt.check_password_hash, hashed, password)
+
+
+def needs_rehash(hashed):
+    """Returns True if hashed was made at a cost below the configured one.
+    Hashes are never rehashed downward, so a lower configured cost cannot weaken stored ones."""
+
+    return int(hashed.split("$")[2]) < settings["log_rounds"]
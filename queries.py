@@ -0,0 +1,320 @@
+"""Drink query builders shared by the Flask views and the async API.
+
+Listings read the drink_cards read model (see cards.py). Every filter
+combination is expressed as criteria on a single statement on it, so a
+filtered listing is always one round trip to the database. Listings are
+paginated by keyset: each page seeks past the sort key of the previous
+page's last row, so deep pages cost the same as the first one."""
+
+import base64, binascii, json
+from sqlalchemy import and_, exists, or_, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Drink, DrinkCard, DrinkIngredient, Instruction, Language
+from search import SEARCH_MODES, apply_search
+
+INGREDIENT_MATCHES = ("all", "any")
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+# Ids are PostgreSQL integer columns; larger values would be sent as bigint
+MAX_ID = 2 ** 31 - 1
+
+# Default listing order, by name with id as tie breaker
+NAME_ORDER = [(DrinkCard.sort_name, False), (DrinkCard.drink_id, False)]
+
+# Loader options per view, so templates never lazy load per row.
+# drink.html walks glass and ingredient names; its instructions come from instruction_steps
+DETAIL_OPTIONS = [
+    joinedload(Drink.category),
+    joinedload(Drink.glass),
+    selectinload(Drink.ingredients).joinedload(DrinkIngredient.ingredient)
+]
+
+# Instructions are shown in the reader's language, else in this one
+FALLBACK_LANGUAGE = "EN"
+
+
+class InvalidCursor(ValueError):
+    """Raised for a malformed cursor, or one issued for a different ordering."""
+
+
+class InvalidParameter(ValueError):
+    """Raised for a request parameter outside its allowed values, with the JSON STATUS to answer."""
+
+
+def as_text(value):
+    """Returns request parameter value if it is a string. Raises InvalidParameter otherwise,
+    e.g. for a parameter repeated in the query string."""
+
+    if not isinstance(value, str):
+        raise InvalidParameter("INVALID_PARAMETER")
+
+    return value
+
+
+def as_int(value):
+    """Returns int of request parameter value. Raises InvalidParameter if it is not an integer."""
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidParameter("INVALID_PARAMETER") from None
+
+
+def as_id_list(value):
+    """Returns list of int ids from a single id or list of ids.
+    "0", 0, "" and None mean no id, as sent by the search form's blank options.
+    Raises InvalidParameter for an id that is not an integer, or is outside the integer column range."""
+
+    values = value if isinstance(value, (list, tuple)) else [value]
+    ids = [as_int(id) for id in values if id not in (None, "", "0", 0)]
+
+    if any(not -MAX_ID - 1 <= id <= MAX_ID for id in ids):
+        raise InvalidParameter("INVALID_PARAMETER")
+
+    return ids
+
+
+def contains_ingredient(ingredient_ids):
+    """Returns EXISTS criterion for cards of drinks using any of ingredient_ids."""
+
+    return exists().where(
+        DrinkIngredient.drink_id == DrinkCard.drink_id,
+        DrinkIngredient.ingredient_id.in_(ingredient_ids)
+    )
+
+
+def ingredient_criteria(ingredient_ids, match):
+    """Returns criteria for cards of drinks containing all (or with match="any", any) of ingredient_ids.
+    On PostgreSQL these are array containment and overlap on the card's indexed ingredient ids."""
+
+    if db.engine.dialect.name == "postgresql":
+        ids = postgresql.array(ingredient_ids, type_=db.Integer)
+        return [DrinkCard.ingredient_ids.op("&&" if match == "any" else "@>")(ids)]
+
+    if match == "any":
+        return [contains_ingredient(ingredient_ids)]
+
+    return [contains_ingredient([id]) for id in ingredient_ids]
+
+
+def drink_filters(category_id="0", ingredient_ids=(), match="all"):
+    """Returns list of criteria selecting cards of drinks in category_id (an id or list of ids),
+    containing all (or with match="any", any) of ingredient_ids."""
+
+    criteria = []
+
+    category_ids = as_id_list(category_id)
+    ingredient_ids = as_id_list(ingredient_ids)
+
+    if category_ids:
+        criteria.append(DrinkCard.category_id.in_(category_ids))
+
+    if ingredient_ids:
+        criteria.extend(ingredient_criteria(ingredient_ids, match))
+
+    return criteria
+
+
+def filter_drinks_by(name, category_id, ingredient_ids, mode="name", match="all"):
+    """Returns DrinkCard query for listed drinks with arguments as filters, and its order.
+    Name is matched using search mode, one of search.SEARCH_MODES.
+    Returns query for all drinks if no filters are needed.
+
+    Order is a list of (expression, descending) pairs: search rank for ranked
+    search modes, else NAME_ORDER."""
+
+    category_ids = as_id_list(category_id)
+    ingredient_ids = as_id_list(ingredient_ids)
+
+    drinks = DrinkCard.query.filter(*drink_filters(category_ids, ingredient_ids, match))
+    order = None
+
+    if name != "":
+        [drinks, order] = apply_search(drinks, name, mode, category_ids, ingredient_ids, match)
+
+    return [drinks, order or NAME_ORDER]
+
+
+def encode_cursor(direction, key, ordering):
+    """Returns opaque cursor for paging in direction ("next" or "prev") from sort key values."""
+
+    state = json.dumps({"d": direction, "k": key, "o": ordering}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(state.encode("utf8")).decode("ascii").rstrip("=")
+
+
+def is_key_value(value, type_):
+    """Returns True if cursor key value, as decoded from JSON, is a value of python type type_."""
+
+    if isinstance(value, bool):
+        return False
+    if type_ is float:
+        return isinstance(value, (int, float))
+
+    return isinstance(value, type_)
+
+
+def decode_cursor(cursor, ordering, key_types):
+    """Returns (direction, key values) of cursor, whose key holds a value of each of key_types.
+    Raises InvalidCursor if it is malformed or was issued for another ordering."""
+
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        [direction, key] = [state["d"], state["k"]]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+    if direction not in ("next", "prev") or state.get("o") != ordering:
+        raise InvalidCursor(cursor)
+
+    if not isinstance(key, list) or len(key) != len(key_types) or not all(map(is_key_value, key, key_types)):
+        raise InvalidCursor(cursor)
+
+    return [direction, key]
+
+
+def seek(order, key, backwards=False):
+    """Returns criterion for rows after key in order, or before it if backwards."""
+
+    forward = [descending == backwards for (_, descending) in order]
+
+    if all(forward) or not any(forward):
+        row, values = tuple_(*[expr for (expr, _) in order]), tuple_(*key)
+        return row > values if all(forward) else row < values
+
+    return or_(*[
+        and_(
+            *[expr == value for ((expr, _), value) in zip(order[:i], key[:i])],
+            order[i][0] > key[i] if forward[i] else order[i][0] < key[i]
+        ) for i in range(len(order))
+    ])
+
+
+def page_query(drinks, order, cursor=None, size=PAGE_SIZE, ordering="name"):
+    """Returns query of the rows of one page of drinks in order, seeking from cursor,
+    and a function turning those rows into (drinks, next cursor, prev cursor).
+
+    Building and running the query are separate so the async API can run the
+    same query on its own session. See paginate."""
+
+    direction = "next"
+    keys = [expr for (expr, _) in order]
+
+    if cursor:
+        [direction, key] = decode_cursor(cursor, ordering, [expr.type.python_type for expr in keys])
+        drinks = drinks.filter(seek(order, key, backwards=(direction == "prev")))
+
+    backwards = direction == "prev"
+    query = (drinks.add_columns(*keys)
+             .order_by(*[expr.desc() if descending != backwards else expr.asc() for (expr, descending) in order])
+             .limit(size + 1))
+
+    def page(rows):
+
+        has_more = len(rows) > size
+        rows = rows[:size][::-1] if backwards else rows[:size]
+
+        if not rows:
+            return [[], False, False]
+
+        [has_next, has_prev] = [True, has_more] if backwards else [has_more, bool(cursor)]
+
+        return [
+            [row[0] for row in rows],
+            has_next and encode_cursor("next", list(rows[-1][1:]), ordering),
+            has_prev and encode_cursor("prev", list(rows[0][1:]), ordering)
+        ]
+
+    return [query, page]
+
+
+def paginate(drinks, order, cursor=None, size=PAGE_SIZE, ordering="name"):
+    """Returns one page of drinks in order, seeking from cursor.
+
+    ordering names the order, so cursors from a differently ordered listing
+    are rejected. Returns (drinks, next cursor, prev cursor), where a cursor
+    is False if there is no page in that direction."""
+
+    [query, page] = page_query(drinks, order, cursor, size, ordering)
+
+    return page(query.all())
+
+
+def listing_params(params):
+    """Returns normalized drink listing parameters from request params:
+    cursor, size, name, ingredient and category id lists, search mode and match.
+    Raises InvalidParameter for params that are not an object, an unknown mode or match,
+    a name, mode, match or cursor that is not a string, or a non-integer size or id."""
+
+    if not isinstance(params, dict):
+        raise InvalidParameter("INVALID_PARAMETER")
+
+    mode = as_text(params.get("mode", "name"))
+    match = as_text(params.get("match", "all"))
+    cursor = params.get("cursor")
+
+    if mode not in SEARCH_MODES:
+        raise InvalidParameter("INVALID_MODE")
+
+    if match not in INGREDIENT_MATCHES:
+        raise InvalidParameter("INVALID_MATCH")
+
+    return {
+        "cursor": cursor if cursor is None else as_text(cursor),
+        "size": max(1, min(as_int(params.get("size", PAGE_SIZE)), MAX_PAGE_SIZE)),
+        "name": as_text(params.get("name", "")).strip().lower(),
+        "ingredient": sorted(as_id_list(params.get("ingredient", "0"))),
+        "category": as_id_list(params.get("category", "0")),
+        "mode": mode,
+        "match": match
+    }
+
+
+def listing_query(cursor, size, name, ingredient, category, mode, match):
+    """Returns query of one page of the drink listing of listing_params,
+    and a function turning its rows into the JSON ready page.
+    Raises InvalidCursor for a bad cursor."""
+
+    [drinks, order] = filter_drinks_by(name, category, ingredient, mode, match)
+    ordering = "name" if order is NAME_ORDER else f"{mode}:{name}"
+
+    [query, page] = page_query(drinks, order, cursor, size, ordering)
+
+    def listing(rows):
+
+        [drinks, next_cursor, prev_cursor] = page(rows)
+
+        return {
+            "drinks": [card.serialize() for card in drinks],
+            "next": next_cursor,
+            "prev": prev_cursor
+        }
+
+    return [query, listing]
+
+
+def list_drinks(**params):
+    """Returns one page of the drink listing of listing_params as a JSON ready dict.
+    Raises InvalidCursor for a bad cursor."""
+
+    [query, listing] = listing_query(**params)
+
+    return listing(query.all())
+
+
+def instruction_steps(drink_id, language=FALLBACK_LANGUAGE):
+    """Returns (language name, steps) of the instructions of drink_id in language code,
+    else in FALLBACK_LANGUAGE, or None if it has neither.
+    Only those two languages are read, however many the drink has."""
+
+    codes = list(dict.fromkeys([language, FALLBACK_LANGUAGE]))
+
+    rows = (db.session.query(Language.code, Language.name, Instruction.steps)
+            .join(Instruction.language)
+            .filter(Instruction.drink_id == drink_id, Language.code.in_(codes)))
+
+    found = {code: (name, steps) for (code, name, steps) in rows}
+
+    return next((found[code] for code in codes if code in found), None)
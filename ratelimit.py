@@ -0,0 +1,151 @@
+"""Token bucket rate limiting for login attempts.
+
+Each key (a username or a client address) has a bucket of capacity tokens
+refilled at rate tokens per second; an attempt takes one token and is
+rejected when the bucket is empty. Rejections happen before any database
+query or bcrypt check, so brute force traffic costs almost nothing.
+
+Buckets live in process memory by default, or in Redis with the app's
+RATE_LIMIT_URL setting at redis://..., so every worker shares them. The
+backend is bound by init_app."""
+
+import math, threading, time
+from collections import OrderedDict
+
+MAX_MEMORY_BUCKETS = 10000
+
+# Atomically refills and takes from the bucket at KEYS[1].
+# ARGV: capacity, rate per second, now. Returns {allowed, seconds to wait}.
+TAKE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HMSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+class MemoryBuckets:
+    """Token buckets of one process, keeping at most maxsize most recently used keys.
+    A dropped bucket starts full again."""
+
+    def __init__(self, maxsize=MAX_MEMORY_BUCKETS):
+
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, capacity, rate):
+        """Takes a token from the bucket of key. Returns (allowed, seconds until a token is available)."""
+
+        now = time.monotonic()
+
+        with self.lock:
+            [tokens, ts] = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - ts) * rate)
+
+            if tokens >= 1:
+                result = (True, 0)
+                tokens -= 1
+            else:
+                result = (False, (1 - tokens) / rate)
+
+            self.buckets[key] = (tokens, now)
+
+            while len(self.buckets) > self.maxsize:
+                self.buckets.popitem(last=False)
+
+        return result
+
+
+class RedisBuckets:
+    """Token buckets shared between processes through Redis."""
+
+    def __init__(self, url, namespace="mixology:ratelimit:"):
+
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TAKE_SCRIPT)
+        self.namespace = namespace
+
+    def take(self, key, capacity, rate):
+        """Takes a token from the bucket of key. Returns (allowed, seconds until a token is available)."""
+
+        [allowed, wait] = self.script(keys=[self.namespace + key], args=[capacity, rate, time.time()])
+
+        return (allowed == 1, float(wait))
+
+
+def make_buckets(url=None):
+    """Returns bucket backend for url, in process memory if url is None."""
+
+    url = url or "memory://"
+
+    if url.startswith("memory://"):
+        return MemoryBuckets()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBuckets(url)
+
+    raise ValueError(f"Unsupported RATE_LIMIT_URL {url}")
+
+
+class RateLimiter:
+    """Token bucket limiter with one policy, capacity and refill rate, per key prefix."""
+
+    def __init__(self, policies, buckets=None):
+        """policies maps a key prefix such as "user" to (capacity, tokens per second)."""
+
+        self.policies = policies
+        self.buckets = buckets or MemoryBuckets()
+        self.lock = threading.Lock()
+        self.counters = {prefix: {"allowed": 0, "rejected": 0} for prefix in policies}
+
+    def hit(self, **keys):
+        """Takes a token for each prefix=value given, in order, e.g. hit(ip="10.0.0.1", user="ann").
+        Returns 0 if every bucket allowed the attempt, else whole seconds to wait.
+        Stops at the first rejecting bucket, so later buckets are only charged
+        for attempts the earlier ones allow."""
+
+        for (prefix, value) in keys.items():
+            [capacity, rate] = self.policies[prefix]
+            [allowed, wait] = self.buckets.take(f"{prefix}:{value}", capacity, rate)
+
+            with self.lock:
+                self.counters[prefix]["allowed" if allowed else "rejected"] += 1
+
+            if not allowed:
+                return max(1, math.ceil(wait))
+
+        return 0
+
+    def stats(self):
+        """Returns allowed and rejected attempt counts of this process, per key prefix."""
+
+        with self.lock:
+            return {prefix: dict(counts) for (prefix, counts) in self.counters.items()}
+
+
+# 5 attempts per username, then one a minute; 20 per client address, then one every 3 seconds
+LOGIN_POLICIES = {"user": (5, 1 / 60), "ip": (20, 1 / 3)}
+
+login_limiter = RateLimiter(LOGIN_POLICIES)
+
+
+def init_app(app):
+    """Binds the login limiter to app's RATE_LIMIT_URL backend."""
+
+    login_limiter.buckets = make_buckets(app.config["RATE_LIMIT_URL"])
@@ -0,0 +1,54 @@
+"""Process-wide registry of the small reference tables: categories, glasses,
+ingredients and languages.
+
+Each table is read once per catalog version and served from memory, so
+forms, routes and drink parsing resolve names and ids without a query."""
+
+from catalog import CatalogDerived
+from models import db, Category, Glass, Ingredient, Language
+
+
+class ReferenceTable:
+    """Two-way name / id lookup over the rows of one reference table."""
+
+    def __init__(self, rows):
+        """rows is an iterable of (id, name)."""
+
+        self.names = dict(rows)
+        self.ids = {name: id for (id, name) in self.names.items()}
+
+    def id(self, name):
+        """Returns id of name, or None if unknown."""
+
+        return self.ids.get(name)
+
+    def name(self, id):
+        """Returns name of id, or None if unknown."""
+
+        return self.names.get(id)
+
+    def choices(self, label=str.title):
+        """Returns (id, label) pairs sorted by name, as form select options."""
+
+        return [(self.ids[name], label(name)) for name in sorted(self.ids)]
+
+
+class ReferenceData:
+    """Snapshot of every reference table."""
+
+    def __init__(self):
+
+        self.categories = ReferenceTable(db.session.query(Category.id, Category.name))
+        self.glasses = ReferenceTable(db.session.query(Glass.id, Glass.name))
+        self.ingredients = ReferenceTable(db.session.query(Ingredient.id, Ingredient.name))
+        languages = db.session.query(Language.id, Language.code, Language.name).all()
+        self.languages = ReferenceTable((id, code) for (id, code, _) in languages)
+        self.language_names = {id: name for (id, _, name) in languages}
+
+    def language_choices(self):
+        """Returns (id, language name) pairs in id order, as form select options."""
+
+        return sorted(self.language_names.items())
+
+
+reference_data = CatalogDerived(ReferenceData)
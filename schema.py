@@ -0,0 +1,60 @@
+"""Schema migrations, managed by Alembic.
+
+The migrations in migrations/versions take a database from empty to the
+schema of models.py. Run "alembic upgrade head" after deploying a change
+to the models, and "alembic revision --autogenerate -m <summary>" to draft
+the migration of one. A database built by db.create_all, as seed.py does,
+already has the latest schema and is stamped with the head revision.
+
+The pg_trgm indexes are created by models.py outside the metadata, when
+the extension is available, so comparisons leave them out."""
+
+import os
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def alembic_config(connection=None):
+    """Returns Alembic config of the project, running on connection if given."""
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    config.attributes["connection"] = connection
+
+    return config
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Returns False for the pg_trgm indexes, which are not in the metadata."""
+
+    return not (type_ == "index" and reflected and compare_to is None and name.endswith("_trgm"))
+
+
+def upgrade(connection, revision="head"):
+    """Migrates the database of connection to revision."""
+
+    command.upgrade(alembic_config(connection), revision)
+
+
+def downgrade(connection, revision):
+    """Migrates the database of connection back to revision, "base" for empty."""
+
+    command.downgrade(alembic_config(connection), revision)
+
+
+def stamp(connection, revision="head"):
+    """Records the database of connection as being at revision, without migrating it."""
+
+    command.stamp(alembic_config(connection), revision)
+
+
+def schema_diff(connection, metadata):
+    """Returns Alembic's list of differences between the database of connection and metadata."""
+
+    context = MigrationContext.configure(connection, opts={"include_object": include_object})
+
+    return compare_metadata(context, metadata)
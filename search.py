@@ -0,0 +1,300 @@
+"""Ranked, typo-tolerant drink search over names, ingredients and instructions.
+
+On PostgreSQL, "fulltext" searches the weighted tsvector stored in
+drink_search, and "fuzzy" adds pg_trgm similarity on names and ingredients
+when the extension is installed. Otherwise an in-process index built from
+drink_search is used. Either way only the SEARCH_LIMIT best matches passing
+the listing's other filters are ranked, so search time stays bounded as the
+catalog grows."""
+
+import heapq, re
+from itertools import islice
+from sqlalchemy import Float, case, cast, false, func, literal, or_
+from catalog import CatalogDerived
+from models import db, Drink, DrinkCard, DrinkIngredient, DrinkSearchDocument, Ingredient, Instruction, catalog_changed
+
+SEARCH_MODES = ("name", "fulltext", "fuzzy")
+
+SEARCH_LIMIT = 200
+
+# pg_trgm's default similarity threshold
+SIMILARITY_THRESHOLD = 0.3
+
+# ts_rank's default weights for the A, B and C labels given to each column
+WEIGHTS = {"name": 1.0, "ingredients": 0.4, "instructions": 0.2}
+
+STOP_WORDS = {"a", "an", "and", "at", "by", "for", "in", "into", "of", "on", "or", "the", "to", "with"}
+
+
+def rebuild_documents(drink_ids=None):
+    """Rebuilds drink_search rows of drink_ids, or of every drink if drink_ids is None.
+    Soft-deleted drinks lose their rows. Commits."""
+
+    drinks = db.session.query(Drink.id, Drink.name).filter(Drink.deleted_at == None)
+    ingredients = db.session.query(DrinkIngredient.drink_id, Ingredient.name).join(Ingredient)
+    instructions = db.session.query(Instruction.drink_id, Instruction.steps)
+    stale = DrinkSearchDocument.query
+
+    if drink_ids is not None:
+        drinks = drinks.filter(Drink.id.in_(drink_ids))
+        ingredients = ingredients.filter(DrinkIngredient.drink_id.in_(drink_ids))
+        instructions = instructions.filter(Instruction.drink_id.in_(drink_ids))
+        stale = stale.filter(DrinkSearchDocument.drink_id.in_(drink_ids))
+
+    docs = {id: {"drink_id": id, "name": name, "ingredients": [], "instructions": []} for (id, name) in drinks}
+
+    for (drink_id, name) in ingredients:
+        if drink_id in docs:
+            docs[drink_id]["ingredients"].append(name)
+
+    for (drink_id, steps) in instructions:
+        if drink_id in docs:
+            docs[drink_id]["instructions"].extend(steps)
+
+    stale.delete(synchronize_session=False)
+
+    rows = [{**doc, "ingredients": " ".join(doc["ingredients"]), "instructions": " ".join(doc["instructions"])}
+            for doc in docs.values()]
+
+    if rows:
+        db.session.execute(DrinkSearchDocument.__table__.insert(), rows)
+
+    if rows and db.engine.dialect.name == "postgresql":
+        vectors = [func.setweight(func.to_tsvector("english", getattr(DrinkSearchDocument, column)), label)
+                   for (column, label) in zip(WEIGHTS, "ABC")]
+
+        DrinkSearchDocument.query.filter(DrinkSearchDocument.drink_id.in_(docs)).update(
+            {"tsv": vectors[0].op("||")(vectors[1]).op("||")(vectors[2])},
+            synchronize_session=False
+        )
+
+    db.session.commit()
+
+
+def tokens(text):
+    """Returns lowercase words of text, without stop words."""
+
+    return [word for word in re.findall(r"\w+", text.lower()) if word not in STOP_WORDS]
+
+
+def trigrams(text):
+    """Returns set of trigrams of the words in text, padded like pg_trgm."""
+
+    grams = set()
+
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+def similarity(grams_a, grams_b):
+    """Returns trigram similarity of two trigram sets, from 0 to 1."""
+
+    return len(grams_a & grams_b) / len(grams_a | grams_b) if grams_a or grams_b else 0
+
+
+class PythonSearchIndex:
+    """In-process inverted index over drink_search documents,
+    used where the database cannot rank or fuzzy match itself."""
+
+    def __init__(self, documents):
+        """documents is an iterable of (drink_id, name, ingredients, instructions)."""
+
+        self.postings = {}
+        self.names = {}
+        self.name_grams = {}
+        self.word_grams = {}
+
+        for (drink_id, *fields) in documents:
+
+            for (text, weight) in zip(fields, WEIGHTS.values()):
+                for word in tokens(text):
+                    posting = self.postings.setdefault(word, {})
+                    posting[drink_id] = posting.get(drink_id, 0) + weight
+
+            self.names[drink_id] = trigrams(fields[0])
+            for gram in self.names[drink_id]:
+                self.name_grams.setdefault(gram, set()).add(drink_id)
+
+        for word in self.postings:
+            for gram in trigrams(word):
+                self.word_grams.setdefault(gram, set()).add(word)
+
+    def expand(self, word, fuzzy):
+        """Returns (indexed word, similarity) pairs matching word.
+        Without fuzzy, only an exact match is returned."""
+
+        if not fuzzy:
+            return [(word, 1)] if word in self.postings else []
+
+        grams = trigrams(word)
+        candidates = set().union(*(self.word_grams.get(gram, ()) for gram in grams))
+        matches = [(other, similarity(grams, trigrams(other))) for other in candidates]
+
+        return [(other, sim) for (other, sim) in matches if sim >= SIMILARITY_THRESHOLD]
+
+    def search(self, text, fuzzy=False, limit=SEARCH_LIMIT):
+        """Returns up to limit (drink_id, score) pairs, or all of them if limit is None, best first.
+
+        Without fuzzy every word must match exactly, like websearch_to_tsquery.
+        With fuzzy any word may match a similar word, and drinks with similar
+        names score higher."""
+
+        words = tokens(text)
+        scores = {}
+        matched = {}
+
+        for word in words:
+            word_scores = {}
+
+            for (other, sim) in self.expand(word, fuzzy):
+                for (drink_id, weight) in self.postings[other].items():
+                    word_scores[drink_id] = max(word_scores.get(drink_id, 0), weight * sim)
+
+            for (drink_id, score) in word_scores.items():
+                scores[drink_id] = scores.get(drink_id, 0) + score
+                matched[drink_id] = matched.get(drink_id, 0) + 1
+
+        if not fuzzy:
+            scores = {drink_id: score for (drink_id, score) in scores.items() if matched[drink_id] == len(words)}
+        else:
+            grams = trigrams(text)
+            for drink_id in set().union(*(self.name_grams.get(gram, ()) for gram in grams)):
+                sim = similarity(grams, self.names[drink_id])
+                if sim >= SIMILARITY_THRESHOLD:
+                    scores[drink_id] = scores.get(drink_id, 0) + sim
+
+        if limit is None:
+            return sorted(scores.items(), key=lambda hit: (-hit[1], hit[0]))
+
+        return heapq.nlargest(limit, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+
+
+def build_python_index():
+    """Returns PythonSearchIndex of all search documents."""
+
+    return PythonSearchIndex(db.session.query(
+        DrinkSearchDocument.drink_id,
+        DrinkSearchDocument.name,
+        DrinkSearchDocument.ingredients,
+        DrinkSearchDocument.instructions
+    ))
+
+
+python_index = CatalogDerived(build_python_index)
+
+
+@catalog_changed.connect
+def refresh_search(version, drink_ids):
+    """Rebuilds search documents of changed drinks and drops the in-process index."""
+
+    rebuild_documents(drink_ids or None)
+    python_index.invalidate()
+
+
+def find_trigram():
+    """Returns True if the database has pg_trgm installed."""
+
+    if db.engine.dialect.name != "postgresql":
+        return False
+
+    return bool(db.session.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").scalar())
+
+
+# Rechecked with the catalog, which changes when seeding or migrating could install the extension
+trigram_support = CatalogDerived(find_trigram)
+
+
+def has_trigram():
+    """Returns True if the database can do trigram matching."""
+
+    return trigram_support.get()
+
+
+def build_card_filters():
+    """Returns dict of (category id, ingredient id set) of each listed drink, from its card."""
+
+    return {drink_id: (category_id, frozenset(ingredient_ids)) for (drink_id, category_id, ingredient_ids)
+            in db.session.query(DrinkCard.drink_id, DrinkCard.category_id, DrinkCard.ingredient_ids)}
+
+
+card_filters = CatalogDerived(build_card_filters)
+
+
+def filtered_hits(hits, category_ids, ingredient_ids, match):
+    """Yields drink ids of hits, in order, that are listed, in one of category_ids if any
+    are given, and contain all (or with match="any", any) of ingredient_ids."""
+
+    filters = card_filters.get()
+    wanted = frozenset(ingredient_ids)
+
+    for drink_id in hits:
+        if drink_id not in filters:
+            continue
+
+        [category_id, ingredients] = filters[drink_id]
+
+        if category_ids and category_id not in category_ids:
+            continue
+
+        if wanted and not (ingredients & wanted if match == "any" else wanted <= ingredients):
+            continue
+
+        yield drink_id
+
+
+def sql_hits(text, mode, cards):
+    """Returns subquery of the best (drink_id, score) matches among the drinks of
+    DrinkCard query cards, ranked by PostgreSQL."""
+
+    doc = DrinkSearchDocument
+    tsquery = func.websearch_to_tsquery("english", text)
+    score = func.ts_rank(doc.tsv, tsquery)
+    match = doc.tsv.op("@@")(tsquery)
+
+    if mode == "fuzzy":
+        score = score + func.similarity(doc.name, text) + func.word_similarity(text, doc.ingredients) * WEIGHTS["ingredients"]
+        match = or_(match, doc.name.op("%")(text), literal(text).op("<%")(doc.ingredients))
+
+    # Double precision, so scores round trip exactly through page cursors
+    score = cast(score, Float)
+
+    return (cards.join(doc, doc.drink_id == DrinkCard.drink_id)
+            .with_entities(doc.drink_id.label("drink_id"), score.label("score"))
+            .filter(match)
+            .order_by(score.desc())
+            .limit(SEARCH_LIMIT)
+            .subquery())
+
+
+def apply_search(cards, text, mode, category_ids=(), ingredient_ids=(), match="all"):
+    """Restricts a DrinkCard query to drinks matching text, using search mode.
+
+    "name" keeps the plain case-insensitive substring match on names.
+    "fulltext" and "fuzzy" keep the SEARCH_LIMIT best matches among the drinks
+    cards already selects, so its filters never crowd out matches. The
+    in-process index applies those filters from category_ids, ingredient_ids
+    and match, against the cards' cached filter values, so at most
+    SEARCH_LIMIT ids reach the database.
+
+    Returns (query, order), where order lists (expression, descending) pairs
+    ranking the matches best first, or is None if matches are unranked."""
+
+    if mode == "name":
+        return [cards.filter(DrinkCard.sort_name.ilike(f"%{text}%")), None]
+
+    if db.engine.dialect.name == "postgresql" and (mode == "fulltext" or has_trigram()):
+        hits = sql_hits(text, mode, cards)
+        return [cards.join(hits, hits.c.drink_id == DrinkCard.drink_id), [(hits.c.score, True), (DrinkCard.drink_id, False)]]
+
+    hits = (drink_id for (drink_id, _) in python_index.get().search(text, fuzzy=(mode == "fuzzy"), limit=None))
+    ids = list(islice(filtered_hits(hits, category_ids, ingredient_ids, match), SEARCH_LIMIT))
+
+    if not ids:
+        return [cards.filter(false()), None]
+
+    position = case({id: position for (position, id) in enumerate(ids)}, value=DrinkCard.drink_id)
+
+    return [cards.filter(DrinkCard.drink_id.in_(ids)), [(position, False), (DrinkCard.drink_id, False)]]
@@ -1,63 +1,105 @@
-import requests
+"""Seed database with drinks from thecocktaildb API.
+
+Usage: python seed.py [--source URL_OR_DIR] [--cache-dir DIR] [--workers N] [--rate N] [--bulk]
+
+Responses are recorded in --cache-dir as they are fetched, so re-running after
+an interrupted seed resumes where it stopped. Pass a recorded directory as
+--source to seed without network access, or synthetic:N to seed a generated
+catalog of N drinks."""
+
+import argparse
 from better_profanity import profanity
-from app import db, app
-from models import Ingredient, Language, Drink, Category, Glass
+from app import app
+from ingest import COCKTAILDB_URL, CatalogFetcher, HTTPSource, make_source
+from loader import BulkLoader
+from models import Ingredient, Language, Drink, Category, Glass, CatalogState, db
+from reference import reference_data
+import schema
 
 profanity.load_censor_words(["sex", "bitch", "asshole", "smut", "ass"])
-db.drop_all()
-db.create_all()
 
-languages = [
-    Language(code="EN", name="English"),
-    Language(code="DE", name="German"),
-    Language(code="ES", name="Spanish"),
-    Language(code="FR", name="French"),
-    Language(code="IT", name="Italian"),
-    Language(code="ZH-HANS", name="Mandarin Chinese, Simplified"),
-    Language(code="ZH-HANT", name="Mandarin Chinese, Traditional")
-]
-db.session.add_all(languages)
 
-cat_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?c=list").json()
-categories = [Category(name=cat["strCategory"].lower()) for cat in cat_data["drinks"]]
+def allowed_drinks(payloads):
+    """Returns drink payloads whose names contain no profanity."""
+
+    return [data for data in payloads if not profanity.contains_profanity(data["strDrink"].lower())]
+
+
+def create_tables(catalog):
+    """Drops and recreates all tables at the latest migration, then loads languages
+    and the categories, glasses and ingredients named by catalog."""
+
+    db.drop_all()
+    db.create_all()
 
-db.session.add_all(categories)
+    with db.engine.begin() as connection:
+        schema.stamp(connection)
 
-glass_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?g=list").json()
-glasses = [Glass(name=glass["strGlass"].lower()) for glass in glass_data["drinks"]]
+    languages = [
+        Language(code="EN", name="English"),
+        Language(code="DE", name="German"),
+        Language(code="ES", name="Spanish"),
+        Language(code="FR", name="French"),
+        Language(code="IT", name="Italian"),
+        Language(code="ZH-HANS", name="Mandarin Chinese, Simplified"),
+        Language(code="ZH-HANT", name="Mandarin Chinese, Traditional")
+    ]
+    db.session.add_all(languages)
 
-db.session.add_all(glasses)
+    db.session.add_all([Category(name=name.lower()) for name in catalog["categories"]])
+    db.session.add_all([Glass(name=name.lower()) for name in catalog["glasses"]])
+    db.session.add_all([Ingredient(name=name.lower()) for name in catalog["ingredients"]])
+    db.session.commit()
+    reference_data.invalidate()
 
-ingr_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?i=list").json()
-ingredients = [Ingredient(name=ingr["strIngredient1"].lower()) for ingr in ingr_data["drinks"]]
 
-db.session.add_all(ingredients)
-db.session.commit()
+def seed(catalog, bulk=False):
+    """Drops and recreates all tables, then loads catalog into them.
+    With bulk, drinks are written by BulkLoader and its LoadStats are returned."""
 
-# gather drink IDS
-drink_ids = []
-for glass in glasses:
-    name_str = glass.name.replace(" ", "_")
-    resp_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/filter.php?g={name_str}").json()
+    create_tables(catalog)
 
-    drink_ids.extend([drink["idDrink"] for drink in resp_data["drinks"]])
+    drinks_data = allowed_drinks(catalog["drinks"])
 
-[drinks, drinks_instructions, drinks_ingredients] = [[], [], []]
+    if bulk:
+        stats = BulkLoader().load(drinks_data)
+        CatalogState.bump()
+        return stats
 
-for id in drink_ids:
-    drink_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/lookup.php?i={id}").json()
+    [drinks, drinks_instructions, drinks_ingredients] = [[], [], []]
 
-    if not profanity.contains_profanity(drink_data["drinks"][0]["strDrink"].lower()):
+    for drink_data in drinks_data:
+
+        [drink_model, instruction_models, drink_ingr_models] = Drink.parse_drink_data(drink_data)
 
-        [drink_model, instruction_models, drink_ingr_models] = Drink.parse_drink_data(drink_data["drinks"][0])
-    
         drinks.append(drink_model)
         drinks_instructions.extend(instruction_models)
         drinks_ingredients.extend(drink_ingr_models)
 
-db.session.add_all(drinks)
-db.session.commit()
+    db.session.add_all(drinks)
+    db.session.commit()
+
+    db.session.add_all(drinks_instructions)
+    db.session.add_all(drinks_ingredients)
+    db.session.commit()
+
+    CatalogState.bump()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed database from thecocktaildb.")
+    parser.add_argument("--source", default=COCKTAILDB_URL, help="API base URL, directory of recorded responses, or synthetic:N")
+    parser.add_argument("--cache-dir", default=".cocktaildb-cache", help="directory responses are recorded to")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=5, help="max requests per second per host")
+    parser.add_argument("--bulk", action="store_true", help="load drinks with set-based batched inserts")
+    args = parser.parse_args()
+
+    source = make_source(args.source, rate=args.rate)
+    # Recorded and synthetic responses need no recording
+    fetcher = CatalogFetcher(source, cache_dir=args.cache_dir if isinstance(source, HTTPSource) else None, workers=args.workers)
 
-db.session.add_all(drinks_instructions)
-db.session.add_all(drinks_ingredients)
-db.session.commit()
\ No newline at end of file
+    stats = seed(fetcher.fetch_catalog(), bulk=args.bulk)
+    if stats:
+        print(stats)
+    print(f"Seeded {Drink.query.count()} drinks ({fetcher.fetched} API requests).")
@@ -1,27 +1,30 @@
 /// Script for drinks.html template
 
-let page = 1;
+/// Cursors for the pages around the current one, from the last /drinks response
+let cursors = {"next": false, "prev": false};
+/// Search form fields the current listing was filtered with
+let filters;
 
 
 $drinksList = $('#drinks-list');
 $searchForm = $('form');
 $nameField = $('#name');
+$modeField = $('#mode');
 $categoryField = $('#category');
-$ingredientField = $('#ingredient')
+$ingredientField = $('#ingredient');
+$matchField = $('#match');
 $clearBtn = $('#clear-btn');
 $prevPageBtns = $('.previous');
 $nextPageBtns = $('.next');
 
-populateDrinks(page);
+populateDrinks();
 
 $prevPageBtns.click(() => {
-    page = page - 1;
-    populateDrinks(page, $searchForm.serializeArray());
+    populateDrinks(cursors["prev"], filters);
 });
 
 $nextPageBtns.click(() => {
-    page = page + 1;
-    populateDrinks(page, $searchForm.serializeArray());
+    populateDrinks(cursors["next"], filters);
 });
 
 $searchForm.on('submit', handleSearchForm);
@@ -29,22 +32,29 @@ $searchForm.on('submit', handleSearchForm);
 /// Clears SearchForm fields upon button click
 $clearBtn.click(() => {
     $nameField.val('');
+    $modeField.val('name');
     $categoryField.val('0');
-    $ingredientField.val('0');
+    $ingredientField.val([]);
+    $matchField.val('all');
 });
 
-async function populateDrinks(page, formData) {
+async function populateDrinks(cursor, formData) {
 
-    const data = {"page": page};
+    const params = new URLSearchParams();
+
+    if (cursor) {
+        params.append("cursor", cursor);
+    }
 
     if (formData) {
         $.each(formData, (index, field) => {
-            data[field.name] = field.value;
+            params.append(field.name, field.value);
         });
-        console.log(data);
     }
 
-    const resp = await axios.post(`/drinks`, data);
+    const resp = await axios.get(`/drinks?${params}`);
+
+    cursors = {"next": resp.data["next"], "prev": resp.data["prev"]};
 
     if (resp.data["next"]) {
         $nextPageBtns.show();
@@ -100,7 +110,7 @@ function handleSearchForm(evt) {
 
     evt.preventDefault();
 
-    page = 1;
+    filters = $searchForm.serializeArray();
 
-    populateDrinks(1, $searchForm.serializeArray());
+    populateDrinks(null, filters);
 }
\ No newline at end of file
@@ -10,11 +10,7 @@ async function handleDeleteForm() {
 
 async function handleDeleteBookmark(evt) {
     if ($(evt.target).attr('class') == 'btn btn-danger') {
-        await axios({
-            method: 'delete',
-            url: `/bookmark`,
-            data: {'id': $(evt.target).attr('id')}
-        });
+        await axios.post(`/bookmarks`, {'remove': [$(evt.target).attr('id')]});
 
         $(evt.target).parent().remove()
     }
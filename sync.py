@@ -0,0 +1,132 @@
+"""Incremental catalog sync.
+
+Usage: python sync.py [--source URL_OR_DIR] [--cache-dir DIR] [--workers N] [--rate N]
+                      [--batch-size N] [--keep-missing]
+
+Unlike seed.py, sync never drops tables. Each upstream drink payload is
+hashed and compared with the content_hash stored on its drink; only new,
+changed and removed drinks are written, in small transactions, so users,
+bookmarks and reads are unaffected while it runs."""
+
+import argparse, time
+from datetime import datetime
+from sqlalchemy import bindparam
+from app import app
+from ingest import COCKTAILDB_URL, CatalogFetcher, make_source
+from loader import BulkLoader, LoadStats
+from models import CatalogState, Drink, DrinkIngredient, Instruction, db
+from seed import allowed_drinks
+
+
+class SyncStats:
+    """Counts of drinks changed by a sync."""
+
+    def __init__(self):
+
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.started = time.perf_counter()
+
+    @property
+    def changed(self):
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self):
+        """Returns one line summary of the sync."""
+
+        return (f"{self.inserted} inserted, {self.updated} updated, {self.deleted} deleted, "
+                f"{self.unchanged} unchanged in {time.perf_counter() - self.started:.2f}s")
+
+
+def batches(items, size):
+    """Yields successive lists of at most size items."""
+
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def update_drinks(loader, payloads):
+    """Replaces stored rows of existing drinks with payloads, in the current transaction.
+    Soft-deleted drinks are restored."""
+
+    [drinks, instructions, drink_ingredients] = loader.prepare(payloads, LoadStats())
+    ids = [drink["id"] for drink in drinks]
+
+    columns = [key for key in drinks[0] if key != "id"]
+    db.session.execute(
+        Drink.__table__.update()
+        .where(Drink.id == bindparam("drink_id"))
+        .values({**{column: bindparam(f"new_{column}") for column in columns}, "deleted_at": None}),
+        [{"drink_id": drink["id"], **{f"new_{column}": drink[column] for column in columns}} for drink in drinks]
+    )
+
+    Instruction.query.filter(Instruction.drink_id.in_(ids)).delete(synchronize_session=False)
+    DrinkIngredient.query.filter(DrinkIngredient.drink_id.in_(ids)).delete(synchronize_session=False)
+
+    loader.insert(Instruction.__table__, instructions, LoadStats())
+    loader.insert(DrinkIngredient.__table__, drink_ingredients, LoadStats())
+
+
+def sync_catalog(payloads, batch_size=100, delete_missing=True):
+    """Applies upstream drink payloads to the stored catalog.
+
+    New drinks are inserted, drinks whose content hash differs are updated,
+    and stored drinks absent from payloads are soft-deleted unless
+    delete_missing is False. Each batch is committed on its own.
+    Bumps the catalog version if anything changed. Returns SyncStats."""
+
+    stats = SyncStats()
+    loader = BulkLoader(batch_size=batch_size)
+
+    stored = {id: (content_hash, deleted_at) for (id, content_hash, deleted_at)
+              in db.session.query(Drink.id, Drink.content_hash, Drink.deleted_at)}
+    incoming = {int(data["idDrink"]): data for data in allowed_drinks(payloads)}
+
+    new = [data for (id, data) in incoming.items() if id not in stored]
+    changed = [data for (id, data) in incoming.items() if id in stored and (
+        stored[id][0] != Drink.hash_drink_data(data) or stored[id][1] is not None
+    )]
+    missing = [id for (id, (_, deleted_at)) in stored.items() if id not in incoming and deleted_at is None]
+
+    if not delete_missing:
+        missing = []
+
+    for batch in batches(new, batch_size):
+        loader.load(batch)
+        stats.inserted += len(batch)
+
+    for batch in batches(changed, batch_size):
+        update_drinks(loader, batch)
+        db.session.commit()
+        stats.updated += len(batch)
+
+    for batch in batches(missing, batch_size):
+        Drink.query.filter(Drink.id.in_(batch)).update({"deleted_at": datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        stats.deleted += len(batch)
+
+    stats.unchanged = len(incoming) - len(new) - len(changed)
+
+    if stats.changed:
+        CatalogState.bump([int(data["idDrink"]) for data in new + changed] + missing)
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply upstream catalog changes without reseeding.")
+    parser.add_argument("--source", default=COCKTAILDB_URL, help="API base URL, directory of recorded responses, or synthetic:N")
+    parser.add_argument("--cache-dir", default=None, help="directory responses are recorded to (reused responses are not refetched)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--rate", type=float, default=5, help="max requests per second per host")
+    parser.add_argument("--batch-size", type=int, default=100, help="drinks written per transaction")
+    parser.add_argument("--keep-missing", action="store_true", help="do not soft-delete drinks missing upstream")
+    args = parser.parse_args()
+
+    fetcher = CatalogFetcher(make_source(args.source, rate=args.rate), cache_dir=args.cache_dir, workers=args.workers)
+    catalog = fetcher.fetch_catalog()
+
+    print(sync_catalog(catalog["drinks"], batch_size=args.batch_size, delete_missing=not args.keep_missing))
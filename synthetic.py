@@ -0,0 +1,159 @@
+"""Synthetic thecocktaildb-style catalogs of any size, for benchmarks and tests.
+
+Drinks have 2 to 12 ingredients, most often 3 to 5, drawn from a vocabulary
+whose popularity follows a Zipf distribution: a few ingredients (gin, lime
+juice, sugar syrup) appear in a large share of drinks and most appear in a
+handful, as in the real catalog. Categories, glasses and instruction
+languages are weighted the same way. Output is deterministic for a seed.
+
+A SyntheticCatalog answers get(endpoint, params) like the API, so it can
+stand in for it as an ingest source, e.g. python seed.py --source synthetic:100000."""
+
+import itertools, random, threading
+
+BASE_INGREDIENTS = [
+    "Gin", "Lime juice", "Sugar syrup", "Vodka", "Lemon juice", "Light rum", "Triple sec", "Orange juice",
+    "Ice", "Angostura bitters", "Tequila", "Dry vermouth", "Sweet vermouth", "Soda water", "Bourbon",
+    "Grenadine", "Pineapple juice", "Cranberry juice", "Amaretto", "Campari", "Mint", "Egg white",
+    "Coffee liqueur", "Cream", "Dark rum", "Champagne", "Ginger beer", "Apricot brandy", "Scotch",
+    "Cointreau", "Tonic water", "Maraschino liqueur", "Brandy", "Honey", "Coconut milk", "Espresso",
+    "Blue curacao", "Peach schnapps", "Absinthe", "Cherry", "Salt", "Nutmeg", "Milk", "Cola"
+]
+
+# (name, weight)
+CATEGORIES = [
+    ("Ordinary Drink", 40), ("Cocktail", 30), ("Shot", 8), ("Punch / Party Drink", 5), ("Coffee / Tea", 4),
+    ("Soft Drink", 4), ("Homemade Liqueur", 3), ("Beer", 3), ("Other / Unknown", 3)
+]
+
+GLASSES = [
+    ("Cocktail glass", 30), ("Highball glass", 20), ("Old-fashioned glass", 15), ("Collins glass", 10),
+    ("Shot glass", 8), ("Champagne flute", 5), ("Coupe glass", 5), ("Wine glass", 4), ("Beer mug", 3)
+]
+
+# Instruction language codes, "" for English, and the chance a drink has them
+LANGUAGES = [("", 1.0), ("DE", 0.5), ("IT", 0.4), ("ES", 0.2), ("FR", 0.15)]
+
+# Number of ingredients per drink, and its weight
+INGREDIENT_COUNTS = [(2, 12), (3, 22), (4, 24), (5, 18), (6, 11), (7, 6), (8, 4), (9, 1), (10, 1), (12, 1)]
+
+ADJECTIVES = ["Golden", "Smoky", "Frozen", "Spiced", "Dirty", "Royal", "Tropical", "Bitter", "Velvet", "Midnight"]
+STYLES = ["Sour", "Fizz", "Collins", "Smash", "Punch", "Martini", "Mule", "Flip", "Julep", "Highball"]
+MEASURES = ["1 oz", "1 1/2 oz", "2 oz", "1/2 oz", "3/4 oz", "1 dash", "2 dashes", "1 tsp", "Top up", None]
+STEPS = ["Shake with ice.", "Stir with ice.", "Strain into a chilled glass.", "Garnish.", "Top up.", "Build over ice."]
+
+ZIPF_EXPONENT = 1.1
+
+
+class SyntheticCatalog:
+    """Catalog of drinks drinks drawn from ingredients ingredient names,
+    by default about one per 20 drinks, between 100 and 5000."""
+
+    def __init__(self, drinks, ingredients=None, seed=0):
+
+        self.drinks = drinks
+        self.seed = seed
+
+        count = ingredients or min(max(100, drinks // 20), 5000)
+        extra = (f"Ingredient {i}" for i in itertools.count(1))
+        self.ingredients = (BASE_INGREDIENTS + list(itertools.islice(extra, max(0, count - len(BASE_INGREDIENTS)))))[:count]
+
+        weights = [1 / rank ** ZIPF_EXPONENT for rank in range(1, count + 1)]
+        self.ingredient_weights = list(itertools.accumulate(weights))
+
+        self.lock = threading.Lock()
+        self.by_glass = None
+
+    def payloads(self, start=1):
+        """Yields raw drink payloads with ids from start to self.drinks."""
+
+        for id in range(start, self.drinks + 1):
+            yield self.payload(id)
+
+    def payload(self, id):
+        """Returns raw drink payload of id, the same for a given seed."""
+
+        rng = random.Random(f"{self.seed}:{id}")
+
+        [count] = rng.choices([count for (count, _) in INGREDIENT_COUNTS], [weight for (_, weight) in INGREDIENT_COUNTS])
+        names = []
+
+        while len(names) < count:
+            [name] = rng.choices(self.ingredients, cum_weights=self.ingredient_weights)
+            if name not in names:
+                names.append(name)
+
+        [category] = rng.choices([name for (name, _) in CATEGORIES], [weight for (_, weight) in CATEGORIES])
+        [glass] = rng.choices([name for (name, _) in GLASSES], [weight for (_, weight) in GLASSES])
+        name = f"{rng.choice(ADJECTIVES)} {names[0]} {rng.choice(STYLES)} {id}"
+        steps = " ".join(rng.sample(STEPS, rng.randint(1, 3)))
+
+        data = {
+            "idDrink": str(id),
+            "strDrink": name,
+            "strVideo": None,
+            "strCategory": category,
+            "strAlcoholic": rng.choice(["Alcoholic", "Alcoholic", "Non alcoholic", "Optional alcohol"]),
+            "strGlass": glass,
+            "strDrinkThumb": f"https://example.com/drinks/{id}.jpg",
+            "strImageSource": None,
+            "strImageAttribution": None,
+            **{f"strInstructions{code}": f"{steps} ({code or 'EN'})" for (code, chance) in LANGUAGES if rng.random() < chance}
+        }
+
+        for i in range(1, 16):
+            data[f"strIngredient{i}"] = names[i - 1] if i <= count else None
+            data[f"strMeasure{i}"] = rng.choice(MEASURES) if i <= count else None
+
+        return data
+
+    def lookups(self):
+        """Returns dict of the "categories", "glasses" and "ingredients" name lists."""
+
+        return {
+            "categories": [name for (name, _) in CATEGORIES],
+            "glasses": [name for (name, _) in GLASSES],
+            "ingredients": list(self.ingredients)
+        }
+
+    def glass_index(self):
+        """Returns dict of glass name to filter.php entries of its drinks, built on first use."""
+
+        with self.lock:
+            if self.by_glass is None:
+                self.by_glass = {}
+
+                for data in self.payloads():
+                    self.by_glass.setdefault(data["strGlass"], []).append(
+                        {"strDrink": data["strDrink"], "strDrinkThumb": data["strDrinkThumb"], "idDrink": data["idDrink"]}
+                    )
+
+            return self.by_glass
+
+    def get(self, endpoint, params):
+        """Returns the response of thecocktaildb API endpoint for params, for the
+        list.php, filter.php by glass and lookup.php endpoints CatalogFetcher uses."""
+
+        if endpoint == "list.php":
+            [kind] = params
+            [key, names] = {
+                "c": ("strCategory", "categories"),
+                "g": ("strGlass", "glasses"),
+                "i": ("strIngredient1", "ingredients")
+            }[kind]
+
+            return {"drinks": [{key: name} for name in self.lookups()[names]]}
+
+        if endpoint == "filter.php":
+            return {"drinks": self.glass_index().get(params["g"].replace("_", " ")) or None}
+
+        if endpoint == "lookup.php":
+            id = int(params["i"])
+            return {"drinks": [self.payload(id)] if 1 <= id <= self.drinks else None}
+
+        raise ValueError(f"Synthetic catalogs do not answer {endpoint} {params}")
+
+    def catalog(self):
+        """Returns the whole catalog in the shape of CatalogFetcher.fetch_catalog."""
+
+        return {**self.lookups(), "drinks": list(self.payloads())}
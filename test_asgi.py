@@ -0,0 +1,155 @@
+"""Async JSON API tests"""
+
+import os
+from unittest import TestCase
+from starlette.testclient import TestClient
+from models import Bookmark, CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from asgi import async_database_url, create_asgi_app
+from cache import response_cache
+from loader import BulkLoader
+from test_loader import make_payload
+
+asgi_app = create_asgi_app(app)
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(3, "Gin Fizz", [["Gin", "2 oz"], ["Soda water", "4 oz"]], {"": "Stir."})
+]
+
+
+class AsgiTestCase(TestCase):
+    """Test cases for the async views, against the Flask views"""
+
+    def setUp(self):
+        """Load test drinks and a user, and start the async app"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        user = User(username="async", password="-", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+
+        self.user_id = user.id
+        self.flask_client = app.test_client()
+        self.client = TestClient(asgi_app).__enter__()
+
+    def tearDown(self):
+        """Stop the async app and release session"""
+
+        self.client.__exit__(None, None, None)
+        db.session.remove()
+        response_cache.clear()
+
+    def log_in(self):
+        """Sets a session cookie of the test user on the async client"""
+
+        cookie = app.session_interface.get_signing_serializer(app).dumps({USER_KEY: self.user_id})
+        self.client.cookies.set(app.session_cookie_name, cookie)
+
+    def test_database_url(self):
+        """Only PostgreSQL URLs have an async driver"""
+
+        self.assertEqual(async_database_url("postgresql:///mixology"), "postgresql+asyncpg:///mixology")
+
+        with self.assertRaises(ValueError):
+            async_database_url("sqlite://")
+
+    def test_listing_matches_flask(self):
+        """Listings, pages and cursors are the same on both paths"""
+
+        for url in ["/drinks?size=2", "/drinks?name=gi&ingredient=3", "/drinks?mode=fulltext&name=gin"]:
+            expected = self.flask_client.get(url).json
+            resp = self.client.get(url)
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json(), expected)
+
+        resp = self.client.post("/drinks", json={"size": 2, "cursor": expected["next"] or ""})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_listing_errors_and_validators(self):
+        """Bad parameters get 400, and a matching If-None-Match gets 304"""
+
+        self.assertEqual(self.client.get("/drinks?mode=regex").json(), {"STATUS": "INVALID_MODE"})
+        self.assertEqual(self.client.get("/drinks?cursor=bad").json(), {"STATUS": "INVALID_CURSOR"})
+        self.assertEqual(self.client.get("/drinks?size=abc").json(), {"STATUS": "INVALID_PARAMETER"})
+        self.assertEqual(self.client.get("/drinks?name=a&name=b").json(), {"STATUS": "INVALID_PARAMETER"})
+        self.assertEqual(self.client.post("/drinks", json=[1]).json(), {"STATUS": "INVALID_PARAMETER"})
+
+        resp = self.client.get("/drinks?name=gin")
+        self.assertEqual(resp.headers["Cache-Control"], "public, max-age=60")
+        self.assertEqual(resp.headers["Vary"], "Cookie")
+
+        resp = self.client.get("/drinks?name=gin", headers={"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_bookmarks_shared_with_flask(self):
+        """Bookmarks changed through the async API show up on both paths"""
+
+        self.log_in()
+
+        resp = self.client.post("/bookmark", json={"id": 2})
+        self.assertEqual(resp.json(), {"STATUS": "OK", "CLASS": "bi bi-bookmark-fill fs-2"})
+
+        resp = self.client.post("/bookmarks", json={"add": [1, 3, 99], "remove": [2]})
+        self.assertEqual(resp.json()["bookmarks"], [1, 3])
+        self.assertEqual(Bookmark.drink_ids_of(self.user_id), {1, 3})
+
+        cookie = resp.cookies[app.session_cookie_name]
+        self.client.cookies.clear()
+        self.client.cookies.set(app.session_cookie_name, cookie)
+
+        listing = self.client.get("/drinks").json()
+        self.assertEqual([drink["id"] for drink in listing["drinks"] if drink["bookmarked"]], [3, 1])
+
+        # The Flask app reads the same session cookie
+        self.flask_client.set_cookie("localhost", app.session_cookie_name, cookie)
+        listing = self.flask_client.get("/drinks").json
+        self.assertEqual([drink["id"] for drink in listing["drinks"] if drink["bookmarked"]], [3, 1])
+
+    def test_makeable(self):
+        """Makeable drinks are ranked like the Flask view"""
+
+        body = {"ingredients": [3], "max_missing": 1}
+
+        self.assertEqual(self.client.post("/drinks/makeable", json=body).json(),
+                         self.flask_client.post("/drinks/makeable", json=body).json)
+
+        resp = self.client.post("/drinks/makeable", content="ingredients=3")
+        self.assertEqual((resp.status_code, resp.json()), (400, {"STATUS": "INVALID_PARAMETER"}))
+
+    def test_delete_user(self):
+        """Deleting the account logs out"""
+
+        self.log_in()
+
+        self.assertEqual(self.client.delete("/user").json(), {"STATUS": "OK"})
+        self.assertIsNone(User.query.get(self.user_id))
+        self.assertEqual(self.client.delete("/user").json(), {"STATUS": "FAIL"})
+
+    def test_pages_served_by_flask(self):
+        """Other routes fall through to the Flask app"""
+
+        resp = self.client.get("/login")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("Login", resp.text)
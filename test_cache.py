@@ -0,0 +1,181 @@
+"""Response cache tests"""
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from models import Bookmark, CatalogState, Category, Drink, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from cache import LRUCache, invalidate_drinks, make_cache, NullCache, response_cache
+from cards import rebuild_cards
+from instrumentation import count_queries
+from loader import BulkLoader
+from sync import sync_catalog
+from test_loader import make_payload
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."})
+]
+
+
+class LRUCacheTestCase(TestCase):
+    """Test cases for LRUCache"""
+
+    def test_eviction(self):
+        """Least recently used entries are evicted first"""
+
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual([cache.get("a"), cache.get("b"), cache.get("c")], [1, None, 3])
+
+    def test_ttl(self):
+        """Entries expire after ttl seconds"""
+
+        cache = LRUCache(ttl=10)
+
+        with patch("cache.time.monotonic", return_value=100):
+            cache.set("a", 1)
+
+        with patch("cache.time.monotonic", return_value=109):
+            self.assertEqual(cache.get("a"), 1)
+
+        with patch("cache.time.monotonic", return_value=110):
+            self.assertIsNone(cache.get("a"))
+
+    def test_clear_prefix(self):
+        """clear removes keys by prefix"""
+
+        cache = LRUCache()
+        cache.set("drink:1", 1)
+        cache.set("drinks:{}", 2)
+        cache.clear("drinks:")
+
+        self.assertEqual([cache.get("drink:1"), cache.get("drinks:{}")], [1, None])
+
+    def test_make_cache(self):
+        """Backends are chosen by URL scheme"""
+
+        self.assertIsInstance(make_cache(), LRUCache)
+        self.assertIsInstance(make_cache("none://"), NullCache)
+        self.assertRaises(ValueError, make_cache, "ftp://cache")
+
+
+class ResponseCacheTestCase(TestCase):
+    """Test cases for cached drink views"""
+
+    def setUp(self):
+        """Load test drinks and a user"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        user = User(username="cache", password="-", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+
+        self.user_id = user.id
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+        response_cache.clear()
+
+    def drink_queries(self, statements):
+        """Returns statements reading drinks"""
+
+        return [statement for statement in statements if "FROM drinks" in statement]
+
+    def test_detail_cached(self):
+        """The drink page is rendered from cache after the first request"""
+
+        self.client.get("/drinks/1")
+
+        with count_queries(db.engine) as statements:
+            resp = self.client.get("/drinks/1")
+
+        self.assertIn("Tequila", resp.get_data(as_text=True))
+        self.assertEqual(self.drink_queries(statements), [])
+
+    def test_bookmark_icon_per_user(self):
+        """The bookmark icon reflects the current user on cached pages"""
+
+        self.assertNotIn("bi-bookmark", self.client.get("/drinks/1").get_data(as_text=True))
+
+        db.session.add(Bookmark(user_id=self.user_id, drink_id=1))
+        db.session.commit()
+
+        with self.client.session_transaction() as sess:
+            sess[USER_KEY] = self.user_id
+
+        self.assertIn("bi-bookmark-fill", self.client.get("/drinks/1").get_data(as_text=True))
+        self.assertNotIn("bi-bookmark-fill", self.client.get("/drinks/2").get_data(as_text=True))
+
+    def test_invalidate_drinks(self):
+        """invalidate_drinks drops cached pages and listings"""
+
+        self.client.get("/drinks/1")
+        self.client.post("/drinks", json={})
+
+        Drink.query.filter_by(id=1).update({"name": "margarita fresca"})
+        db.session.commit()
+        rebuild_cards([1])
+        invalidate_drinks([1])
+
+        self.assertIn("Margarita Fresca", self.client.get("/drinks/1").get_data(as_text=True))
+        self.assertEqual(self.client.post("/drinks", json={}).json["drinks"][1]["name"], "Margarita Fresca")
+
+    def test_sync_invalidates(self):
+        """A catalog sync drops cached responses of removed drinks"""
+
+        self.assertEqual(len(self.client.post("/drinks", json={}).json["drinks"]), 2)
+        self.assertIn("Gimlet", self.client.get("/drinks/2").get_data(as_text=True))
+
+        sync_catalog(payloads[:1])
+
+        self.assertEqual(len(self.client.post("/drinks", json={}).json["drinks"]), 1)
+        self.assertIn("404 Not Found", self.client.get("/drinks/2").get_data(as_text=True))
+
+    def test_listing_key_normalized(self):
+        """Listings differing only in name case or ingredient order share a cache entry"""
+
+        self.client.post("/drinks", json={"name": "Gim", "ingredient": ["2", "1"]})
+
+        with count_queries(db.engine) as statements:
+            resp = self.client.post("/drinks", json={"name": " gim", "ingredient": [1, 2]})
+
+        self.assertEqual([drink["name"] for drink in resp.json["drinks"]], ["Gimlet"])
+        self.assertEqual(self.drink_queries(statements), [])
+
+    def test_version_stamp(self):
+        """Entries built from an older catalog version are not served"""
+
+        self.client.post("/drinks", json={})
+
+        Drink.query.filter_by(id=2).update({"deleted_at": db.func.now()})
+        db.session.commit()
+        rebuild_cards([2])
+
+        with patch("cache.catalog_version", return_value=CatalogState.current_version() + 1):
+            self.assertEqual(len(self.client.post("/drinks", json={}).json["drinks"]), 1)
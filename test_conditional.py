@@ -0,0 +1,137 @@
+"""Conditional request tests for drink resources"""
+
+import os
+from unittest import TestCase
+from models import CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from cache import response_cache
+from instrumentation import count_queries
+from loader import BulkLoader
+from sync import sync_catalog
+from test_loader import make_payload
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."})
+]
+
+
+class ConditionalTestCase(TestCase):
+    """Test cases for ETag, Last-Modified and Cache-Control"""
+
+    def setUp(self):
+        """Load test drinks and a user"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        user = User(username="etag", password="-", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+
+        self.user_id = user.id
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+        response_cache.clear()
+
+    def test_detail_not_modified(self):
+        """A matching If-None-Match gets 304 without reading drinks"""
+
+        resp = self.client.get("/drinks/1")
+        etag = resp.headers["ETag"]
+
+        self.assertEqual(resp.headers["Cache-Control"], "public, max-age=60")
+        self.assertIn("Cookie", resp.headers["Vary"])
+        self.assertIn("Last-Modified", resp.headers)
+
+        with count_queries(db.engine) as statements:
+            resp = self.client.get("/drinks/1", headers={"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_data(), b"")
+        self.assertEqual(resp.headers["ETag"], etag)
+        self.assertEqual([statement for statement in statements if "FROM drinks" in statement], [])
+
+    def test_if_modified_since(self):
+        """An If-Modified-Since no older than the catalog gets 304"""
+
+        resp = self.client.get("/drinks/1")
+        resp = self.client.get("/drinks/1", headers={"If-Modified-Since": resp.headers["Last-Modified"]})
+
+        self.assertEqual(resp.status_code, 304)
+
+    def test_etag_changes_with_catalog(self):
+        """ETags change when the drink or the catalog changes"""
+
+        etags = [self.client.get(f"/drinks/{id}").headers["ETag"] for id in [1, 2]]
+        self.assertNotEqual(etags[0], etags[1])
+
+        sync_catalog([payloads[0], make_payload(2, "Gimlet", [["Gin", "2 oz"]], {"": "Shake."})])
+
+        resp = self.client.get("/drinks/2", headers={"If-None-Match": etags[1]})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.headers["ETag"], etags[1])
+
+    def test_private_for_users(self):
+        """Logged in responses are private and follow bookmark changes"""
+
+        with self.client.session_transaction() as sess:
+            sess[USER_KEY] = self.user_id
+
+        resp = self.client.get("/drinks/1")
+        etag = resp.headers["ETag"]
+
+        self.assertEqual(resp.headers["Cache-Control"], "private, no-cache")
+        self.assertIn("Cookie", resp.headers["Vary"])
+        self.assertNotIn("Last-Modified", resp.headers)
+
+        self.client.post("/bookmark", json={"id": 1})
+
+        resp = self.client.get("/drinks/1", headers={"If-None-Match": etag})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("bi-bookmark-fill", resp.get_data(as_text=True))
+
+    def test_listing_not_modified(self):
+        """GET listings with query parameters support conditional requests"""
+
+        resp = self.client.get("/drinks?name=gim&ingredient=1&ingredient=2")
+        self.assertEqual([drink["name"] for drink in resp.json["drinks"]], ["Gimlet"])
+
+        resp = self.client.get("/drinks?name=gim&ingredient=1&ingredient=2", headers={"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(resp.status_code, 304)
+
+        resp = self.client.get("/drinks?name=mar", headers={"If-None-Match": resp.headers["ETag"]})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_cache_control_config(self):
+        """Cache-Control policies are configurable per endpoint"""
+
+        app.config["CACHE_CONTROL"] = {"main.get_drinks": {"public": "public, max-age=5"}}
+
+        try:
+            self.assertEqual(self.client.get("/drinks").headers["Cache-Control"], "public, max-age=5")
+            self.assertNotIn("Cache-Control", self.client.get("/drinks/1").headers)
+        finally:
+            del app.config["CACHE_CONTROL"]
@@ -0,0 +1,93 @@
+"""App factory and configuration profile tests"""
+
+import os
+from unittest import TestCase
+from flask import Flask
+from models import db
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app, create_app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from config import database_url, load_config
+from cache import LRUCache, NullCache, response_cache
+from ratelimit import MemoryBuckets, login_limiter
+import cache, ratelimit
+
+
+class ConfigTestCase(TestCase):
+    """Test cases for configuration profiles"""
+
+    def tearDown(self):
+        """Rebind the database and backends to the module app and drop environment overrides"""
+
+        db.app = app
+
+        for key in ["DB_POOL_SIZE", "DB_POOL_PRE_PING", "CACHE_URL", "RATE_LIMIT_URL"]:
+            os.environ.pop(key, None)
+
+        cache.init_app(app)
+        ratelimit.init_app(app)
+
+    def test_database_url(self):
+        """Heroku's postgres:// scheme is rewritten, others are kept"""
+
+        self.assertEqual(database_url("postgres://u:p@host:5432/db"), "postgresql://u:p@host:5432/db")
+        self.assertEqual(database_url("postgresql:///mixology"), "postgresql:///mixology")
+
+    def test_profiles(self):
+        """Only development echoes SQL and installs the debug toolbar, and production hides /metrics without a token"""
+
+        development = create_app("development")
+        production = create_app("production")
+
+        self.assertTrue(development.config["SQLALCHEMY_ECHO"])
+        self.assertIn("DEBUG_TB_ENABLED", development.config)
+        self.assertFalse(production.config["SQLALCHEMY_ECHO"])
+        self.assertNotIn("DEBUG_TB_ENABLED", production.config)
+        self.assertTrue(create_app("testing").config["TESTING"])
+        self.assertEqual(production.config["BCRYPT_LOG_ROUNDS"], 14)
+
+        with production.test_client() as c:
+            self.assertEqual(c.get("/metrics").status_code, 404)
+
+    def test_environment_overrides(self):
+        """Pool settings are read from the environment and passed to the engine"""
+
+        os.environ["DB_POOL_SIZE"] = "3"
+        os.environ["DB_POOL_PRE_PING"] = "false"
+
+        test_app = Flask(__name__)
+        load_config(test_app, "production")
+
+        self.assertEqual(test_app.config["SQLALCHEMY_DATABASE_URI"], "postgresql:///mixology-test")
+        self.assertEqual(test_app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_size"], 3)
+        self.assertFalse(test_app.config["SQLALCHEMY_ENGINE_OPTIONS"]["pool_pre_ping"])
+
+    def test_backends(self):
+        """The cache and limiter backends come from the app's settings, in process unless overridden"""
+
+        create_app("testing")
+
+        self.assertIsInstance(response_cache.backend, LRUCache)
+        self.assertIsInstance(login_limiter.buckets, MemoryBuckets)
+
+        os.environ["CACHE_URL"] = "none://"
+        create_app("testing")
+
+        self.assertIsInstance(response_cache.backend, NullCache)
+
+    def test_unknown_profile(self):
+        """Unknown profile names are rejected"""
+
+        with self.assertRaises(ValueError):
+            create_app("staging")
+
+    def test_blueprint_routes(self):
+        """Apps from the factory serve the site's routes"""
+
+        test_app = create_app("testing")
+
+        self.assertIn("main.get_drink", test_app.view_functions)
+        self.assertEqual(test_app.test_client().get("/login").status_code, 200)
@@ -1,6 +1,6 @@
 """Drink model tests"""
 
-import os, requests
+import os
 from unittest import TestCase
 from models import Category, Glass, db, Drink, Ingredient, Language
 
@@ -9,13 +9,17 @@ from app import app
 
 app.config["SQLALCHEMY_ECHO"] = False
 
+from ingest import fixture_fetcher
+
+cocktaildb = fixture_fetcher()
+
 db.drop_all()
 db.create_all()
 
-json_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/lookup.php?i=11007").json()
+json_data = cocktaildb.get("lookup.php", i=11007)
 drink_data = json_data["drinks"][0]
 
-ingr_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?i=list").json()
+ingr_data = cocktaildb.get("list.php", i="list")
 ingredients = [Ingredient(name=ingr["strIngredient1"].lower()) for ingr in ingr_data["drinks"]]
 
 languages = [
@@ -1,20 +1,25 @@
 
-import os, requests, pdb
+import os
 from unittest import TestCase
-from models import Category, Glass, db, Drink, Ingredient, Language, User
+from models import CatalogState, Category, Glass, db, Drink, Ingredient, Language, User
 
 os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
-from app import app, USER_KEY
+from app import app
+from users import USER_KEY
 
 app.config["SQLALCHEMY_ECHO"] = False
 
+from ingest import fixture_fetcher
+
+cocktaildb = fixture_fetcher()
+
 db.drop_all()
 db.create_all()
 
-json_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/lookup.php?i=11007").json()
+json_data = cocktaildb.get("lookup.php", i=11007)
 drink_data = json_data["drinks"][0]
 
-ingr_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?i=list").json()
+ingr_data = cocktaildb.get("list.php", i="list")
 ingredients = [Ingredient(name=ingr["strIngredient1"].lower()) for ingr in ingr_data["drinks"]]
 
 languages = [
@@ -46,6 +51,7 @@ class DrinkViewsTestCase(TestCase):
         db.session.add_all(drink_ingredients)
 
         db.session.commit()
+        CatalogState.bump([11007])
 
         self.drink = Drink.query.get(11007)
 
@@ -76,7 +82,7 @@ class DrinkViewsTestCase(TestCase):
             
             self.assertEqual(resp.status_code, 200)
             self.assertDictEqual(resp.json, {
-                "drinks": [self.drink.serialize()],
+                "drinks": [{**self.drink.serialize(), "bookmarked": False}],
                 "next": False,
                 "prev": False
             })
@@ -90,7 +96,7 @@ class DrinkViewsTestCase(TestCase):
             
             self.assertEqual(resp.status_code, 200)
             self.assertDictEqual(resp.json, {
-                "drinks": [self.drink.serialize()],
+                "drinks": [{**self.drink.serialize(), "bookmarked": False}],
                 "next": False,
                 "prev": False
             })
@@ -122,7 +128,7 @@ class DrinkViewsTestCase(TestCase):
 
             self.assertEqual(resp.status_code, 200)
             self.assertDictEqual(resp.json, {
-                "drinks": [self.drink.serialize()],
+                "drinks": [{**self.drink.serialize(), "bookmarked": False}],
                 "next": False,
                 "prev": False
             })
@@ -154,9 +160,39 @@ class DrinkViewsTestCase(TestCase):
 
             self.assertEqual(resp.status_code, 200)
             self.assertIn(self.drink.name.title(), html)
-            self.assertIn(self.drink.instructions[0].text, html)
+            self.assertIn(drink_data["strInstructions"], html)
+            self.assertNotIn(drink_data["strInstructionsDE"], html)
             self.assertIn(self.drink.category.name.title(), html)
             self.assertIn(self.drink.glass.name.title(), html)
+
+    def test_drink_view_language_pref(self):
+        """Instructions are shown in the user's language, else in English, one step per paragraph"""
+
+        with self.client as c:
+
+            italian = User.register("italian", "test123", 5).id
+            spanish = User.register("spanish", "test123", 3).id
+
+            with c.session_transaction() as sess:
+                sess[USER_KEY] = italian
+
+            html = c.get("/drinks/11007").get_data(as_text=True)
+
+            self.assertIn("<h3>Italian</h3>", html)
+            self.assertIn("<p>Avere cura di inumidire solo il bordo esterno e cospargere di sale.</p>", html)
+            self.assertNotIn(drink_data["strInstructions"], html)
+
+            # No Spanish instructions for this drink
+            with c.session_transaction() as sess:
+                sess[USER_KEY] = spanish
+
+            html = c.get("/drinks/11007").get_data(as_text=True)
+
+            self.assertIn("<h3>English</h3>", html)
+            self.assertIn(drink_data["strInstructions"], html)
+            self.assertNotIn("Italian", html)
+
+            User.query.delete()
     
     def test_drink_view_logged_in(self):
         """Test drink page when logged in. Should have a bookmark icon."""
@@ -0,0 +1,112 @@
+"""Query plan tests"""
+
+import os
+from unittest import TestCase
+from models import Bookmark, CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+app.config["WTF_CSRF_ENABLED"] = False
+app.config["BCRYPT_LOG_ROUNDS"] = 4
+
+import passwords
+from catalog import warm_all
+from explain import route_seq_scans
+from loader import BulkLoader
+from test_loader import make_payload
+
+passwords.init_app(app)
+
+payloads = [
+    make_payload(id, f"Drink {id}", [[f"Ingredient {id % 4}", "1 oz"], ["Lime juice", "1 oz"]], {"": "Shake.", "DE": "Schütteln."})
+    for id in range(1, 21)
+]
+
+# Requests of a guest, covering every listing filter and search mode
+GUEST_REQUESTS = {
+    "listing": lambda c: c.get("/drinks"),
+    "next page": lambda c: c.get("/drinks", query_string={"cursor": c.get("/drinks?size=3").json["next"]}),
+    "name": lambda c: c.get("/drinks", query_string={"name": "rink 1"}),
+    "category": lambda c: c.get("/drinks", query_string={"category": 1}),
+    "ingredients all": lambda c: c.get("/drinks", query_string=[("ingredient", 1), ("ingredient", 2)]),
+    "ingredients any": lambda c: c.get("/drinks", query_string=[("ingredient", 1), ("ingredient", 2), ("match", "any")]),
+    "combined": lambda c: c.get("/drinks", query_string={"name": "drink", "category": 1, "ingredient": 2}),
+    "fulltext": lambda c: c.get("/drinks", query_string={"name": "lime", "mode": "fulltext"}),
+    "fuzzy": lambda c: c.get("/drinks", query_string={"name": "drnik", "mode": "fuzzy"}),
+    "makeable": lambda c: c.post("/drinks/makeable", json={"ingredients": [1, 2], "max_missing": 1}),
+    "drink": lambda c: c.get("/drinks/5"),
+    "login": lambda c: c.post("/login", data={"username": "plans", "password": "plans123"})
+}
+
+# Requests of a logged in user
+USER_REQUESTS = {
+    "drink": lambda c: c.get("/drinks/6"),
+    "profile": lambda c: c.get("/profile"),
+    "bookmark": lambda c: c.post("/bookmark", json={"id": 7}),
+    "unbookmark": lambda c: c.delete("/bookmark", json={"id": 1}),
+    "bookmarks": lambda c: c.post("/bookmarks", json={"add": [8, 9], "remove": [2]})
+}
+
+
+class RoutePlansTestCase(TestCase):
+    """Test cases for the query plans of the routes"""
+
+    def setUp(self):
+        """Load drinks and a user with bookmarks, in a warm process"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Language(code="DE", name="German"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        user = User.register("plans", "plans123", 1)
+        db.session.add_all([Bookmark(user_id=user.id, drink_id=id) for id in range(1, 4)])
+        db.session.commit()
+
+        self.user_id = user.id
+
+        warm_all()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def user_client(self):
+        """Returns test client logged in as the test user."""
+
+        client = app.test_client()
+
+        with client.session_transaction() as session:
+            session[USER_KEY] = self.user_id
+
+        return client
+
+    def test_routes_use_indexes(self):
+        """No statement of a route needs a sequential scan of a catalog or user table"""
+
+        self.assertEqual(route_seq_scans(db.engine, app.test_client(), GUEST_REQUESTS, prefer_indexes=True), {})
+        self.assertEqual(route_seq_scans(db.engine, self.user_client(), USER_REQUESTS, prefer_indexes=True), {})
+
+    def test_missing_index_reported(self):
+        """Without the drinks_ingredients indexes, the drink page scans the table"""
+
+        db.session.execute("DROP INDEX ix_drinks_ingredients_drink_ingredient")
+        db.session.execute("DROP INDEX ix_drinks_ingredients_ingredient_drink")
+        db.session.commit()
+
+        found = route_seq_scans(db.engine, app.test_client(), {"drink": lambda c: c.get("/drinks/10")}, prefer_indexes=True)
+
+        self.assertEqual([table for (table, _) in found["drink"]], ["drinks_ingredients"])
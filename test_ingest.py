@@ -0,0 +1,182 @@
+"""Catalog ingestion tests"""
+
+import gzip, json, os, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+from unittest import TestCase
+from ingest import CatalogFetcher, DirectorySource, FetchError, HTTPSource, RateLimiter, fixture_fetcher, make_source, record_path
+from synthetic import SyntheticCatalog
+
+responses = {
+    ("list.php", (("c", "list"),)): {"drinks": [{"strCategory": "Ordinary Drink"}]},
+    ("list.php", (("g", "list"),)): {"drinks": [{"strGlass": "Cocktail glass"}, {"strGlass": "Margarita/Coupette glass"}]},
+    ("list.php", (("i", "list"),)): {"drinks": [{"strIngredient1": "Tequila"}, {"strIngredient1": "Gin"}]},
+    ("filter.php", (("g", "Cocktail_glass"),)): {"drinks": [{"idDrink": "11007"}, {"idDrink": "11410"}]},
+    ("filter.php", (("g", "Margarita/Coupette_glass"),)): {"drinks": None},
+    ("lookup.php", (("i", "11007"),)): {"drinks": [{"idDrink": "11007", "strDrink": "Margarita"}]},
+    ("lookup.php", (("i", "11410"),)): {"drinks": [{"idDrink": "11410", "strDrink": "Gin Fizz"}]},
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves responses like thecocktaildb API. Fails the first request of each path listed in flaky."""
+
+    flaky = set()
+    hits = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.split("/")[-1]
+        FixtureHandler.hits.append((endpoint, url.query))
+
+        if url.query in FixtureHandler.flaky:
+            FixtureHandler.flaky.discard(url.query)
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps(responses[(endpoint, tuple(parse_qsl(url.query)))]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class IngestTestCase(TestCase):
+    """Test cases for CatalogFetcher against a local fixture server"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start fixture server"""
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/api/json/v1/1"
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop fixture server"""
+
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Create empty cache directory"""
+
+        FixtureHandler.hits = []
+        FixtureHandler.flaky = set()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+
+    def tearDown(self):
+        """Remove cache directory"""
+
+        self.tmp.cleanup()
+
+    def test_fetch_catalog(self):
+        """Fetches lists and every drink found through glass filters"""
+
+        fetcher = CatalogFetcher(HTTPSource(self.base_url, rate=None), workers=4)
+        catalog = fetcher.fetch_catalog()
+
+        self.assertEqual(catalog["categories"], ["Ordinary Drink"])
+        self.assertEqual(catalog["glasses"], ["Cocktail glass", "Margarita/Coupette glass"])
+        self.assertEqual(catalog["ingredients"], ["Tequila", "Gin"])
+        self.assertEqual([drink["strDrink"] for drink in catalog["drinks"]], ["Margarita", "Gin Fizz"])
+
+    def test_retry_with_backoff(self):
+        """Server errors are retried"""
+
+        FixtureHandler.flaky = {"i=11007"}
+        source = HTTPSource(self.base_url, rate=None, backoff=0.01)
+
+        self.assertEqual(source.get("lookup.php", {"i": "11007"})["drinks"][0]["strDrink"], "Margarita")
+        self.assertEqual(FixtureHandler.hits.count(("lookup.php", "i=11007")), 2)
+
+    def test_retries_exhausted(self):
+        """FetchError is raised once retries run out"""
+
+        FixtureHandler.flaky = {"i=11007"}
+        source = HTTPSource(self.base_url, rate=None, retries=0)
+
+        with self.assertRaises(FetchError):
+            source.get("lookup.php", {"i": "11007"})
+
+    def test_resume_from_cache(self):
+        """An interrupted run only fetches what is missing on the next run"""
+
+        FixtureHandler.flaky = {"i=11410"}
+        fetcher = CatalogFetcher(HTTPSource(self.base_url, rate=None, retries=0), cache_dir=self.cache_dir)
+
+        with self.assertRaises(FetchError):
+            fetcher.fetch_catalog()
+
+        self.assertTrue(os.path.exists(record_path(self.cache_dir, "lookup.php", {"i": "11007"})))
+        FixtureHandler.hits = []
+
+        fetcher = CatalogFetcher(HTTPSource(self.base_url, rate=None), cache_dir=self.cache_dir)
+        catalog = fetcher.fetch_catalog()
+
+        self.assertEqual(len(catalog["drinks"]), 2)
+        self.assertEqual(FixtureHandler.hits, [("lookup.php", "i=11410")])
+        self.assertEqual(fetcher.fetched, 1)
+
+    def test_replay_recorded_directory(self):
+        """A recorded cache directory can be used as a source without a server"""
+
+        CatalogFetcher(HTTPSource(self.base_url, rate=None), cache_dir=self.cache_dir).fetch_catalog()
+
+        catalog = CatalogFetcher(DirectorySource(self.cache_dir)).fetch_catalog()
+
+        self.assertEqual(len(catalog["drinks"]), 2)
+
+        with self.assertRaises(FetchError):
+            DirectorySource(self.cache_dir).get("lookup.php", {"i": "1"})
+
+    def test_recordings_gzipped(self):
+        """Responses are recorded as gzipped JSON, and older uncompressed recordings still replay"""
+
+        CatalogFetcher(HTTPSource(self.base_url, rate=None), cache_dir=self.cache_dir).get("lookup.php", i="11007")
+
+        path = record_path(self.cache_dir, "lookup.php", {"i": "11007"})
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(json.load(f)["drinks"][0]["strDrink"], "Margarita")
+
+        os.replace(path, path[:-len(".gz")])
+        with open(path[:-len(".gz")], "w") as f:
+            json.dump({"drinks": [{"idDrink": "11007", "strDrink": "Old Margarita"}]}, f)
+
+        self.assertEqual(DirectorySource(self.cache_dir).get("lookup.php", {"i": "11007"})["drinks"][0]["strDrink"], "Old Margarita")
+
+    def test_fixtures(self):
+        """The recorded fixtures replay a whole catalog without network access"""
+
+        catalog = fixture_fetcher().fetch_catalog()
+
+        self.assertIn("Margarita", [drink["strDrink"] for drink in catalog["drinks"]])
+        self.assertIn("Tequila", catalog["ingredients"])
+
+    def test_make_source(self):
+        """Sources are picked by location"""
+
+        self.assertIsInstance(make_source(self.base_url), HTTPSource)
+        self.assertIsInstance(make_source(self.cache_dir), DirectorySource)
+        self.assertEqual(make_source("synthetic:20").drinks, 20)
+        self.assertIsInstance(make_source("synthetic:20"), SyntheticCatalog)
+
+    def test_rate_limiter(self):
+        """Requests to the same host are spaced out, other hosts are not delayed"""
+
+        limiter = RateLimiter(20)
+        start = time.monotonic()
+
+        for _ in range(3):
+            limiter.wait("a")
+        limiter.wait("b")
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertLess(time.monotonic() - start, 0.5)
@@ -0,0 +1,120 @@
+"""Bulk loader tests"""
+
+import os
+from unittest import TestCase
+from models import Category, Glass, db, Drink, DrinkIngredient, Ingredient, Instruction, Language
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from loader import BulkLoader
+
+
+def make_payload(id, name, ingredients, instructions):
+    """Returns minimal thecocktaildb-style drink payload"""
+
+    data = {
+        "idDrink": str(id),
+        "strDrink": name,
+        "strVideo": None,
+        "strCategory": "Ordinary Drink",
+        "strAlcoholic": "Alcoholic",
+        "strGlass": "Cocktail glass",
+        "strDrinkThumb": f"https://example.com/{id}.jpg",
+        "strImageSource": None,
+        "strImageAttribution": None,
+        **{f"strInstructions{code}": text for (code, text) in instructions.items()}
+    }
+
+    for i in range(1, 16):
+        [ingredient, measure] = ingredients[i - 1] if i <= len(ingredients) else [None, None]
+        data[f"strIngredient{i}"] = ingredient
+        data[f"strMeasure{i}"] = measure
+
+    return data
+
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"], ["Salt", None]],
+                 {"": "Shake with ice.", "DE": "Mit Eis schütteln."}),
+    make_payload(2, "Gin Sour", [["Gin", "2 oz"], ["Lime juice", "1 oz"], ["Egg white", None]],
+                 {"": "Dry shake, then shake with ice."})
+]
+
+
+class BulkLoaderTestCase(TestCase):
+    """Test cases for BulkLoader"""
+
+    def setUp(self):
+        """Reset tables with lookup data"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Language(code="DE", name="German"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass"),
+            Ingredient(name="tequila"),
+            Ingredient(name="lime juice")
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def test_load(self):
+        """Loads drinks, instructions and ingredient associations"""
+
+        stats = BulkLoader().load(payloads)
+
+        self.assertEqual(stats.rows, {
+            "categories": 0,
+            "glasses": 0,
+            "ingredients": 3,
+            "drinks": 2,
+            "instructions": 3,
+            "drinks_ingredients": 6
+        })
+        self.assertGreater(stats.rows_per_second, 0)
+
+        drink = Drink.query.get(1)
+        self.assertEqual(drink.name, "margarita")
+        self.assertEqual(drink.category.name, "ordinary drink")
+        self.assertEqual(drink.glass.name, "cocktail glass")
+        self.assertEqual(sorted(item.ingredient.name for item in drink.ingredients), ["lime juice", "salt", "tequila"])
+        self.assertEqual(sorted(instr.language.code for instr in drink.instructions), ["DE", "EN"])
+        self.assertEqual(Ingredient.query.count(), 5)
+
+    def test_load_matches_parse_drink_data(self):
+        """Bulk loaded rows are the same as rows from Drink.parse_drink_data"""
+
+        BulkLoader().load(payloads[:1])
+
+        [drink, instructions, drink_ingredients] = Drink.parse_drink_data(payloads[0])
+        stored = Drink.query.get(1)
+
+        for column in Drink.__table__.columns.keys():
+            self.assertEqual(getattr(stored, column), getattr(drink, column))
+        self.assertEqual(
+            sorted((instr.language_id, instr.steps) for instr in instructions),
+            sorted((instr.language_id, instr.steps) for instr in Instruction.query.all())
+        )
+        self.assertEqual(
+            sorted((item.ingredient_id, item.quantity) for item in drink_ingredients),
+            sorted((item.ingredient_id, item.quantity) for item in DrinkIngredient.query.all())
+        )
+
+    def test_ensure_ingredients_upsert(self):
+        """Missing ingredients are created once, existing ones are left alone"""
+
+        loader = BulkLoader()
+
+        self.assertEqual(loader.ensure_ingredients(["tequila", "gin", "gin"]), 1)
+        self.assertEqual(loader.ensure_ingredients(["gin"]), 0)
+        self.assertEqual(loader.ingredients["gin"], Ingredient.query.filter_by(name="gin").one().id)
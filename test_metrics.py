@@ -0,0 +1,150 @@
+"""Request metrics tests"""
+
+import os
+from unittest import TestCase
+from models import CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+app.config["WTF_CSRF_ENABLED"] = False
+app.config["BCRYPT_LOG_ROUNDS"] = 4
+
+import passwords
+from cache import response_cache
+from loader import BulkLoader
+from metrics import Registry, RequestTiming, exposition, registry
+from test_loader import make_payload
+
+passwords.init_app(app)
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."})
+]
+
+
+class ExpositionTestCase(TestCase):
+    """Test cases for Registry and its Prometheus exposition"""
+
+    def test_histogram_and_phases(self):
+        """Requests land in every bucket at or above their duration"""
+
+        registry = Registry(buckets=[0.1, 1])
+        timing = RequestTiming()
+        timing.queries = 3
+        timing.phases["db"] = 0.002
+
+        registry.record("main.get_drinks", 200, timing)
+        registry.record("main.get_drinks", 304, timing)
+
+        text = exposition(registry, login={"user": {"allowed": 4, "rejected": 1}})
+
+        self.assertIn('mixology_requests_total{view="main.get_drinks",status="304"} 1', text)
+        self.assertIn('mixology_request_duration_seconds_bucket{view="main.get_drinks",le="0.1"} 2', text)
+        self.assertIn('mixology_request_duration_seconds_bucket{view="main.get_drinks",le="+Inf"} 2', text)
+        self.assertIn('mixology_queries_total{view="main.get_drinks"} 6', text)
+        self.assertIn('mixology_phase_seconds_total{view="main.get_drinks",phase="db"} 0.004000', text)
+        self.assertIn('mixology_login_attempts_total{prefix="user",result="rejected"} 1', text)
+        self.assertNotIn("mixology_hashing", text)
+
+
+class MetricsViewsTestCase(TestCase):
+    """Test cases for request instrumentation of the views"""
+
+    def setUp(self):
+        """Load test drinks and a user"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        User.register("metrics", "metrics123", 1)
+
+        registry.reset()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Restore settings and release session"""
+
+        app.config.update(SERVER_TIMING=True, METRICS_TOKEN="", METRICS_REQUIRE_TOKEN=False, SLOW_QUERY_MS=100, SLOW_REQUEST_MS=500)
+        db.session.remove()
+        response_cache.clear()
+
+    def test_server_timing(self):
+        """Responses carry their phases when SERVER_TIMING is on"""
+
+        app.config["SERVER_TIMING"] = True
+
+        resp = self.client.get("/drinks")
+        self.assertRegex(resp.headers["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+$')
+
+        resp = self.client.get("/drinks/1")
+        self.assertIn("template;dur=", resp.headers["Server-Timing"])
+
+        resp = self.client.post("/login", data={"username": "metrics", "password": "metrics123"})
+        self.assertIn("bcrypt;dur=", resp.headers["Server-Timing"])
+
+        app.config["SERVER_TIMING"] = False
+        self.assertNotIn("Server-Timing", self.client.get("/drinks").headers)
+
+    def test_metrics_per_view(self):
+        """/metrics reports requests, queries and phases per view, and the hashing pool"""
+
+        self.client.get("/drinks")
+        self.client.get("/drinks/1")
+        self.client.get("/drinks/99")
+
+        resp = self.client.get("/metrics")
+        text = resp.get_data(as_text=True)
+
+        self.assertEqual(resp.headers["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn('mixology_requests_total{view="main.get_drinks",status="200"} 1', text)
+        self.assertIn('mixology_requests_total{view="main.get_drink",status="404"} 1', text)
+        self.assertIn('mixology_request_duration_seconds_count{view="main.get_drink"} 2', text)
+        self.assertRegex(text, r'mixology_queries_total\{view="main.get_drinks"\} [1-9]')
+        self.assertIn('mixology_phase_seconds_total{view="main.get_drink",phase="template"}', text)
+        self.assertIn("mixology_hashing_pending 0", text)
+        self.assertIn('mixology_login_attempts_total{prefix="ip",result="allowed"}', text)
+
+    def test_metrics_token(self):
+        """/metrics requires the bearer token when one is set"""
+
+        app.config["METRICS_TOKEN"] = "scrape"
+
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code, 200)
+
+    def test_metrics_token_required(self):
+        """Under METRICS_REQUIRE_TOKEN, /metrics is not served until a token is set"""
+
+        app.config["METRICS_REQUIRE_TOKEN"] = True
+
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+        app.config["METRICS_TOKEN"] = "scrape"
+
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer scrape"}).status_code, 200)
+
+    def test_slow_logs_name_view(self):
+        """Slow statements and requests are logged with their view"""
+
+        app.config.update(SLOW_QUERY_MS=0, SLOW_REQUEST_MS=0)
+
+        with self.assertLogs(app.logger, "WARNING") as logs:
+            self.client.get("/drinks")
+
+        self.assertTrue(any(line.startswith("WARNING:app:Slow query in main.get_drinks:") for line in logs.output))
+        self.assertTrue(any(line.startswith("WARNING:app:Slow request GET /drinks in main.get_drinks:") for line in logs.output))
@@ -0,0 +1,121 @@
+"""Schema migration tests"""
+
+import os
+from unittest import TestCase
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from models import db
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+import schema
+from seed import create_tables
+
+
+# A drink as the original seed.py stored it, before the catalog, search and card tables existed
+BASELINE_ROWS = [
+    "INSERT INTO languages (id, code, name) VALUES (1, 'EN', 'English')",
+    "INSERT INTO categories (id, name) VALUES (1, 'ordinary drink')",
+    "INSERT INTO glasses (id, name) VALUES (1, 'cocktail glass')",
+    "INSERT INTO ingredients (id, name) VALUES (1, 'gin'), (2, 'lime juice')",
+    "INSERT INTO drinks (id, name, alcoholic, optional_alc, category_id, glass_id) VALUES (1, 'gimlet', true, false, 1, 1)",
+    "INSERT INTO drinks_ingredients (drink_id, ingredient_id, quantity) VALUES (1, 1, '2 oz'), (1, 2, '1 oz')",
+    "INSERT INTO instructions (drink_id, language_id, text) VALUES (1, 1, E'  Shake with ice.\\r\\n\\n Strain. ')"
+]
+
+
+def current_revision():
+    """Returns migration revision the test database is at."""
+
+    with db.engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+class MigrationsTestCase(TestCase):
+    """Test cases for the migrations in migrations/versions"""
+
+    def setUp(self):
+        """Empty the test database"""
+
+        db.session.remove()
+        db.drop_all()
+        db.session.execute("DROP TABLE IF EXISTS alembic_version")
+        db.session.commit()
+
+        self.head = ScriptDirectory.from_config(schema.alembic_config()).get_current_head()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def test_upgrade_matches_models(self):
+        """Migrating an empty database gives the schema of the models"""
+
+        with db.engine.begin() as connection:
+            schema.upgrade(connection)
+
+        with db.engine.connect() as connection:
+            self.assertEqual(schema.schema_diff(connection, db.metadata), [])
+
+        self.assertEqual(current_revision(), self.head)
+
+    def test_downgrade(self):
+        """Every migration can be undone"""
+
+        with db.engine.begin() as connection:
+            schema.upgrade(connection)
+            schema.downgrade(connection, "0001")
+
+            self.assertNotIn("ix_drinks_category_id", [index["name"] for index in inspect(connection).get_indexes("drinks")])
+
+            schema.downgrade(connection, "base")
+
+            self.assertEqual(inspect(connection).get_table_names(), ["alembic_version"])
+
+    def upgrade_baseline(self, connection):
+        """Migrates connection's database to the baseline and adds a drink the way the original seed.py did"""
+
+        schema.upgrade(connection, "0001")
+
+        for statement in BASELINE_ROWS:
+            connection.exec_driver_sql(statement)
+
+        schema.upgrade(connection)
+
+    def test_instruction_steps(self):
+        """Instruction text is split into steps, and joined back on downgrade"""
+
+        with db.engine.begin() as connection:
+            self.upgrade_baseline(connection)
+
+            self.assertEqual(connection.exec_driver_sql("SELECT steps FROM instructions").scalar(), ["Shake with ice.", "Strain."])
+
+            schema.downgrade(connection, "0001")
+
+            self.assertEqual(connection.exec_driver_sql("SELECT text FROM instructions").scalar(), "Shake with ice.\nStrain.")
+
+    def test_read_models_backfilled(self):
+        """Search documents and cards of existing drinks are built by the migrations"""
+
+        with db.engine.begin() as connection:
+            self.upgrade_baseline(connection)
+
+            search = connection.exec_driver_sql(
+                "SELECT drink_id, ingredients, tsv @@ websearch_to_tsquery('english', 'strain lime') FROM drink_search"
+            ).all()
+            cards = connection.exec_driver_sql("SELECT drink_id, name, category, ingredient_count, ingredient_ids FROM drink_cards").all()
+
+        self.assertEqual(search, [(1, "gin lime juice", True)])
+        self.assertEqual(cards, [(1, "Gimlet", "Ordinary Drink", 2, [1, 2])])
+
+    def test_seed_stamps_head(self):
+        """Tables created by seed.py are recorded at the latest migration"""
+
+        create_tables({"categories": [], "glasses": [], "ingredients": []})
+
+        self.assertEqual(current_revision(), self.head)
@@ -0,0 +1,123 @@
+"""Ingredient index tests"""
+
+import os
+from unittest import TestCase
+from models import CatalogState, Category, Glass, db, Ingredient, Language
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from loader import BulkLoader
+from pantry import IngredientIndex
+from sync import sync_catalog
+from test_loader import make_payload
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Triple sec", "1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(3, "Martini", [["Gin", "2 oz"], ["Dry vermouth", "1 oz"]], {"": "Stir."})
+]
+
+
+class IngredientIndexTestCase(TestCase):
+    """Test cases for IngredientIndex"""
+
+    def setUp(self):
+        """Index drinks 1: {1, 2, 3}, 2: {4, 3}, 3: {4, 5}"""
+
+        self.index = IngredientIndex([(1, 1), (1, 2), (1, 3), (2, 4), (2, 3), (3, 4), (3, 5), (3, 5)])
+
+    def test_postings(self):
+        """Drink ids are stored sorted and unique per ingredient"""
+
+        self.assertEqual(list(self.index.postings[4]), [2, 3])
+        self.assertEqual(list(self.index.recipes[3]), [4, 5])
+
+    def test_fully_makeable(self):
+        """Only drinks with every ingredient available are returned by default"""
+
+        self.assertEqual(self.index.makeable([3, 4]), [{"drink_id": 2, "coverage": 1.0, "missing": []}])
+        self.assertEqual(self.index.makeable([]), [])
+
+    def test_max_missing(self):
+        """Drinks missing up to max_missing ingredients are ranked by coverage"""
+
+        results = self.index.makeable([1, 3, 4], max_missing=1)
+
+        self.assertEqual([result["drink_id"] for result in results], [2, 1, 3])
+        self.assertEqual(results[1]["missing"], [2])
+
+    def test_limit(self):
+        """At most limit drinks are returned"""
+
+        self.assertEqual(len(self.index.makeable([1, 3, 4], max_missing=1, limit=2)), 2)
+
+
+class MakeableViewTestCase(TestCase):
+    """Test cases for /drinks/makeable"""
+
+    def setUp(self):
+        """Load test drinks"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        self.ingredients = {ingr.name: ingr.id for ingr in Ingredient.query.all()}
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def makeable(self, names, **options):
+        """Posts ingredient ids of names, returns response drinks"""
+
+        resp = self.client.post("/drinks/makeable", json={"ingredients": [self.ingredients[name] for name in names], **options})
+        self.assertEqual(resp.status_code, 200)
+
+        return resp.json["drinks"]
+
+    def test_makeable(self):
+        """Returns drinks with coverage and missing ingredient names"""
+
+        drinks = self.makeable(["gin", "lime juice", "tequila"], max_missing=1)
+
+        self.assertEqual([drink["id"] for drink in drinks], [2, 1, 3])
+        self.assertEqual(drinks[0]["name"], "Gimlet")
+        self.assertEqual(drinks[1]["missing"], ["Triple Sec"])
+        self.assertEqual(drinks[1]["coverage"], 0.667)
+
+    def test_bounds_and_bad_bodies(self):
+        """Negative bounds count as 0, and bodies that are not JSON objects get 400"""
+
+        self.assertEqual(self.makeable(["gin", "lime juice", "tequila"], max_missing=-3),
+                         self.makeable(["gin", "lime juice", "tequila"], max_missing=0))
+        self.assertEqual(self.makeable(["gin", "lime juice"], limit=-1), [])
+
+        for options in [{"data": "ingredients=1"}, {"json": [1]}]:
+            resp = self.client.post("/drinks/makeable", **options)
+
+            self.assertEqual(resp.status_code, 400)
+            self.assertDictEqual(resp.json, {"STATUS": "INVALID_PARAMETER"})
+
+    def test_refreshed_on_catalog_change(self):
+        """Deleted drinks drop out after a sync"""
+
+        self.assertEqual(len(self.makeable(["gin", "lime juice"])), 1)
+
+        sync_catalog(payloads[::2])
+
+        self.assertEqual(self.makeable(["gin", "lime juice"]), [])
@@ -0,0 +1,112 @@
+"""Password hashing tests"""
+
+import os, threading
+from unittest import TestCase
+from models import db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+import passwords
+from passwords import HashingBusy, HashingPool, hashing_pool
+
+
+class HashingPoolTestCase(TestCase):
+    """Test cases for HashingPool"""
+
+    def test_rejects_when_full(self):
+        """Work beyond workers plus queue slots is rejected"""
+
+        pool = HashingPool(workers=1, max_queue=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=pool.run, args=[block])
+        thread.start()
+        started.wait()
+
+        self.assertEqual(pool.stats()["pending"], 1)
+        self.assertRaises(HashingBusy, pool.run, abs, -1)
+
+        release.set()
+        thread.join()
+
+        self.assertEqual(pool.run(abs, -1), 1)
+        self.assertDictEqual(pool.stats(), {
+            "workers": 1, "max_queue": 0, "completed": 2, "rejected": 1, "pending": 0, "max_pending": 1
+        })
+
+
+class PasswordTestCase(TestCase):
+    """Test cases for configurable hashing cost and rehash on login"""
+
+    def setUp(self):
+        """Reset users, hash cheaply"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(Language(code="EN", name="English"))
+        db.session.commit()
+
+        self.log_rounds = app.config["BCRYPT_LOG_ROUNDS"]
+        app.config["BCRYPT_LOG_ROUNDS"] = 4
+        passwords.init_app(app)
+
+    def tearDown(self):
+        """Restore configuration"""
+
+        db.session.remove()
+        app.config["BCRYPT_LOG_ROUNDS"] = self.log_rounds
+        passwords.init_app(app)
+
+    def test_configured_cost(self):
+        """New hashes use BCRYPT_LOG_ROUNDS"""
+
+        user = User.register("cost", "pw123", 1)
+
+        self.assertTrue(user.password.startswith("$2b$04$"))
+        self.assertFalse(passwords.needs_rehash(user.password))
+
+    def test_rehash_on_login(self):
+        """Hashes of a lower cost are replaced on successful login only, and never by cheaper ones"""
+
+        user = User.register("rehash", "pw123", 1)
+
+        app.config["BCRYPT_LOG_ROUNDS"] = 5
+        passwords.init_app(app)
+
+        self.assertFalse(User.authenticate("rehash", "wrong"))
+        self.assertTrue(User.query.get(user.id).password.startswith("$2b$04$"))
+
+        self.assertTrue(User.authenticate("rehash", "pw123"))
+        self.assertTrue(User.query.get(user.id).password.startswith("$2b$05$"))
+        self.assertTrue(User.authenticate("rehash", "pw123"))
+
+        app.config["BCRYPT_LOG_ROUNDS"] = 4
+        passwords.init_app(app)
+
+        self.assertTrue(User.authenticate("rehash", "pw123"))
+        self.assertTrue(User.query.get(user.id).password.startswith("$2b$05$"))
+
+    def test_busy_login(self):
+        """Logins are answered 503 when the hashing queue is full"""
+
+        User.register("busy", "pw123", 1)
+        app.config["WTF_CSRF_ENABLED"] = False
+        hashing_pool.configure(1, -1)
+
+        try:
+            with app.test_client() as c:
+                resp = c.post("/login", data={"username": "busy", "password": "pw123"})
+
+            self.assertEqual(resp.status_code, 503)
+            self.assertIn("The server is busy", resp.get_data(as_text=True))
+        finally:
+            app.config["WTF_CSRF_ENABLED"] = True
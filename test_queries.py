@@ -0,0 +1,283 @@
+"""Drink filter query tests"""
+
+import os
+from unittest import TestCase
+from models import CatalogState, Category, Glass, db, Ingredient, Language
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from instrumentation import count_queries
+from loader import BulkLoader
+from queries import InvalidParameter, as_id_list, encode_cursor, filter_drinks_by
+from test_loader import make_payload
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(2, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake."}),
+    make_payload(3, "Martini", [["Gin", "2 oz"], ["Dry vermouth", "1 oz"]], {"": "Stir."})
+]
+
+
+class FilterQueryTestCase(TestCase):
+    """Test cases for filter_drinks_by"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load test drinks"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Category(name="cocktail"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        cls.ingredients = {ingr.name: ingr.id for ingr in Ingredient.query.all()}
+
+    @classmethod
+    def tearDownClass(cls):
+        """Release session"""
+
+        db.session.remove()
+
+    def ids(self, *args, **kwargs):
+        """Returns sorted ids of drinks matching filter_drinks_by(*args)"""
+
+        (drinks, order) = filter_drinks_by(*args, **kwargs)
+
+        return sorted(card.drink_id for card in drinks.all())
+
+    def test_as_id_list(self):
+        """Blank form values are dropped"""
+
+        self.assertEqual(as_id_list("0"), [])
+        self.assertEqual(as_id_list("21"), [21])
+        self.assertEqual(as_id_list(["1", 2, "0"]), [1, 2])
+        self.assertRaises(InvalidParameter, as_id_list, ["1", "gin"])
+        self.assertRaises(InvalidParameter, as_id_list, str(2 ** 31))
+
+    def test_no_filters(self):
+        """All drinks are returned without filters"""
+
+        self.assertEqual(self.ids("", "0", "0"), [1, 2, 3])
+
+    def test_single_ingredient(self):
+        """A single ingredient id may be given as a string"""
+
+        self.assertEqual(self.ids("", "0", str(self.ingredients["lime juice"])), [1, 2])
+
+    def test_all_ingredients(self):
+        """Drinks must contain every ingredient with match="all" """
+
+        ids = [self.ingredients["gin"], self.ingredients["lime juice"]]
+
+        self.assertEqual(self.ids("", "0", ids), [2])
+        self.assertEqual(self.ids("", "0", ids, match="all"), [2])
+
+    def test_any_ingredient(self):
+        """Drinks may contain any ingredient with match="any" """
+
+        ids = [self.ingredients["tequila"], self.ingredients["dry vermouth"]]
+
+        self.assertEqual(self.ids("", "0", ids, match="any"), [1, 3])
+
+    def test_combined_filters(self):
+        """Name, category and ingredients combine"""
+
+        self.assertEqual(self.ids("gi", "1", [self.ingredients["gin"]]), [2])
+        self.assertEqual(self.ids("gi", "2", [self.ingredients["gin"]]), [])
+
+    def test_single_statement(self):
+        """Every filter combination runs as one statement"""
+
+        with count_queries(db.engine) as statements:
+            filter_drinks_by("i", "1", [self.ingredients["gin"], self.ingredients["lime juice"]])[0].all()
+            filter_drinks_by("", "0", [self.ingredients["gin"], self.ingredients["tequila"]], match="any")[0].all()
+
+        self.assertEqual(len(statements), 2)
+        self.assertIn("drink_cards.ingredient_ids @> ARRAY", statements[0])
+        self.assertIn("drink_cards.ingredient_ids && ARRAY", statements[1])
+
+    def test_drinks_endpoint(self):
+        """The /drinks endpoint takes ingredient lists and a match mode"""
+
+        with app.test_client() as c:
+            resp = c.post("/drinks", json={
+                "ingredient": [str(self.ingredients["gin"]), str(self.ingredients["tequila"])],
+                "match": "any"
+            })
+
+            self.assertEqual(sorted(drink["id"] for drink in resp.json["drinks"]), [1, 2, 3])
+
+            resp = c.post("/drinks", json={"match": "most"})
+
+            self.assertEqual(resp.status_code, 400)
+            self.assertDictEqual(resp.json, {"STATUS": "INVALID_MATCH"})
+
+    def test_non_integer_parameters(self):
+        """Ids and sizes that are not integers, and ids out of range, get 400, not a server error"""
+
+        requests = [
+            ("get", "/drinks?size=abc"),
+            ("get", "/drinks?ingredient=x"),
+            ("get", "/drinks?category=1&category=cocktail"),
+            ("get", "/drinks?ingredient=99999999999999"),
+            ("get", "/drinks?category=-99999999999999"),
+            ("post", "/drinks/makeable", {"ingredients": [1], "max_missing": "one"}),
+            ("post", "/drinks/makeable", {"ingredients": ["gin"]})
+        ]
+
+        with app.test_client() as c:
+            for (method, url, *body) in requests:
+                resp = getattr(c, method)(url, json=body[0] if body else None)
+
+                self.assertEqual(resp.status_code, 400, url)
+                self.assertDictEqual(resp.json, {"STATUS": "INVALID_PARAMETER"})
+
+    def test_malformed_parameters(self):
+        """Repeated text parameters and wrongly typed JSON get 400, not a server error"""
+
+        requests = [
+            {"query_string": [("name", "a"), ("name", "b")]},
+            {"query_string": [("mode", "name"), ("mode", "fuzzy")]},
+            {"json": {"name": 5}},
+            {"json": {"mode": ["name"]}},
+            {"json": {"cursor": 1}},
+            {"json": [1]}
+        ]
+
+        with app.test_client() as c:
+            for options in requests:
+                resp = c.get("/drinks", **options)
+
+                self.assertEqual(resp.status_code, 400, options)
+                self.assertDictEqual(resp.json, {"STATUS": "INVALID_PARAMETER"})
+
+
+class PaginationTestCase(TestCase):
+    """Test cases for keyset pagination of /drinks"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load 25 drinks"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load([
+            make_payload(id, f"Drink {id:02}", [["Gin", "2 oz"]], {"": "Stir with gin." * (id % 5 + 1)})
+            for id in range(1, 26)
+        ])
+        CatalogState.bump()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Release session"""
+
+        db.session.remove()
+
+    def page(self, c, **data):
+        """Posts to /drinks, returns response JSON"""
+
+        resp = c.post("/drinks", json=data)
+        self.assertEqual(resp.status_code, 200)
+
+        return resp.json
+
+    def test_walk_forward_and_back(self):
+        """next and prev cursors walk pages in name order"""
+
+        with app.test_client() as c:
+
+            first = self.page(c)
+            self.assertEqual([drink["id"] for drink in first["drinks"]], list(range(1, 11)))
+            self.assertFalse(first["prev"])
+
+            second = self.page(c, cursor=first["next"])
+            self.assertEqual([drink["id"] for drink in second["drinks"]], list(range(11, 21)))
+
+            third = self.page(c, cursor=second["next"])
+            self.assertEqual([drink["id"] for drink in third["drinks"]], list(range(21, 26)))
+            self.assertFalse(third["next"])
+
+            back = self.page(c, cursor=third["prev"])
+            self.assertEqual(back["drinks"], second["drinks"])
+
+            back = self.page(c, cursor=back["prev"])
+            self.assertEqual(back["drinks"], first["drinks"])
+            self.assertFalse(back["prev"])
+            self.assertEqual(back["next"], first["next"])
+
+    def test_page_size(self):
+        """Page size is client selectable up to MAX_PAGE_SIZE"""
+
+        with app.test_client() as c:
+
+            self.assertEqual(len(self.page(c, size=3)["drinks"]), 3)
+            self.assertEqual(len(self.page(c, size=1000)["drinks"]), 25)
+
+    def test_ranked_pages(self):
+        """Ranked search results page in rank order"""
+
+        with app.test_client() as c:
+
+            ranked = [drink["id"] for drink in self.page(c, name="gin", mode="fulltext", size=50)["drinks"]]
+
+            first = self.page(c, name="gin", mode="fulltext", size=7)
+            second = self.page(c, name="gin", mode="fulltext", size=7, cursor=first["next"])
+
+            self.assertEqual([drink["id"] for drink in first["drinks"] + second["drinks"]], ranked[:14])
+
+    def test_invalid_cursor(self):
+        """Malformed cursors and cursors of another ordering are rejected"""
+
+        with app.test_client() as c:
+
+            cursor = self.page(c)["next"]
+
+            for data in [{"cursor": "nonsense"}, {"cursor": cursor, "name": "gin", "mode": "fulltext"}]:
+                resp = c.post("/drinks", json=data)
+
+                self.assertEqual(resp.status_code, 400)
+                self.assertDictEqual(resp.json, {"STATUS": "INVALID_CURSOR"})
+
+    def test_forged_cursor(self):
+        """Cursors whose key values do not fit the ordering's columns are rejected"""
+
+        ranked = {"name": "gin", "mode": "fulltext"}
+        forged = [
+            (encode_cursor("next", 5, "name"), {}),
+            (encode_cursor("next", ["a", "x"], "name"), {}),
+            (encode_cursor("next", [{"a": 1}, 2], "name"), {}),
+            (encode_cursor("next", ["a", True], "name"), {}),
+            (encode_cursor("next", ["a", 1, 2], "name"), {}),
+            (encode_cursor("next", ["0.5", 1], "fulltext:gin"), ranked)
+        ]
+
+        with app.test_client() as c:
+            for (cursor, params) in forged:
+                resp = c.get("/drinks", query_string={"cursor": cursor, **params})
+
+                self.assertEqual(resp.status_code, 400, cursor)
+                self.assertDictEqual(resp.json, {"STATUS": "INVALID_CURSOR"})
+
+            resp = c.get("/drinks", query_string={"cursor": encode_cursor("next", [0.5, 1], "fulltext:gin"), **ranked})
+
+            self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,113 @@
+"""Query budget tests for views"""
+
+import os
+from unittest import TestCase
+from models import Bookmark, CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+app.config["TESTING"] = True
+
+from catalog import warm_all
+from instrumentation import QueryBudgetExceeded, count_queries, enforce_query_budgets
+from loader import BulkLoader
+from test_loader import make_payload
+
+enforce_query_budgets(app)
+
+# Drinks with many ingredients and languages, so any per-row lazy load shows up
+payloads = [
+    make_payload(id, f"Drink {id}", [[f"Ingredient {id}-{i}", "1 oz"] for i in range(8)],
+                 {"": "Stir.", "DE": "Rühren.", "ES": "Remover."})
+    for id in range(1, 13)
+]
+
+
+class QueryBudgetTestCase(TestCase):
+    """Test cases for view query budgets, in a warm process"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load drinks and a user with bookmarks"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Language(code="DE", name="German"),
+            Language(code="ES", name="Spanish"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        user = User(username="budget", password="-", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+
+        db.session.add_all([Bookmark(user_id=user.id, drink_id=id) for id in range(1, 6)])
+        db.session.commit()
+
+        cls.user_id = user.id
+
+        warm_all()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Release session"""
+
+        db.session.remove()
+
+    def setUp(self):
+        """Log in test user"""
+
+        self.client = app.test_client()
+
+        with self.client.session_transaction() as sess:
+            sess[USER_KEY] = self.user_id
+
+    def test_views_within_budget(self):
+        """Every budgeted view stays within its budget"""
+
+        self.assertEqual(self.client.get("/").status_code, 200)
+        self.assertEqual(self.client.get("/profile").status_code, 200)
+        self.assertEqual(self.client.get("/drinks/1").status_code, 200)
+
+        for data in [{}, {"name": "drink", "mode": "fulltext"}, {"name": "drnik", "mode": "fuzzy"}]:
+            self.assertEqual(self.client.post("/drinks", json=data).status_code, 200)
+
+        resp = self.client.post("/drinks/makeable", json={"ingredients": [1, 2, 3, 4, 5, 6, 7], "max_missing": 1})
+        self.assertEqual(len(resp.json["drinks"]), 1)
+
+    def test_listing_query_count_is_constant(self):
+        """A page of drinks costs the same number of queries whatever its size"""
+
+        counts = []
+
+        for size in [1, 10]:
+            with count_queries(db.engine) as statements:
+                self.client.post("/drinks", json={"size": size})
+
+            counts.append(len(statements))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_budget_exceeded(self):
+        """A view going over its budget fails the request"""
+
+        view = app.view_functions["main.get_drink"]
+        budget = view.query_budget
+        view.query_budget = 1
+
+        try:
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/drinks/1")
+        finally:
+            view.query_budget = budget
@@ -0,0 +1,134 @@
+"""Login rate limiting tests"""
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from models import db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app, create_app
+
+app.config["SQLALCHEMY_ECHO"] = False
+app.config["WTF_CSRF_ENABLED"] = False
+
+import passwords
+from instrumentation import count_queries
+from ratelimit import MemoryBuckets, RateLimiter, login_limiter, make_buckets
+
+
+class RateLimiterTestCase(TestCase):
+    """Test cases for RateLimiter"""
+
+    def test_token_bucket(self):
+        """Buckets allow capacity attempts, then refill over time"""
+
+        limiter = RateLimiter({"user": (2, 0.5)})
+
+        with patch("ratelimit.time.monotonic", return_value=100):
+            self.assertEqual([limiter.hit(user="ann") for _ in range(3)], [0, 0, 2])
+            self.assertEqual(limiter.hit(user="bob"), 0)
+
+        with patch("ratelimit.time.monotonic", return_value=102):
+            self.assertEqual(limiter.hit(user="ann"), 0)
+
+        self.assertDictEqual(limiter.stats(), {"user": {"allowed": 4, "rejected": 1}})
+
+    def test_every_key_checked(self):
+        """An attempt is rejected if any of its buckets is empty"""
+
+        limiter = RateLimiter({"user": (5, 1), "ip": (1, 0.1)})
+
+        self.assertEqual(limiter.hit(user="ann", ip="10.0.0.1"), 0)
+        self.assertEqual(limiter.hit(user="bob", ip="10.0.0.1"), 10)
+
+    def test_memory_bound(self):
+        """Memory buckets keep at most maxsize keys"""
+
+        buckets = MemoryBuckets(maxsize=2)
+
+        for key in ["a", "b", "c"]:
+            buckets.take(key, 1, 1)
+
+        self.assertEqual(list(buckets.buckets), ["b", "c"])
+        self.assertRaises(ValueError, make_buckets, "ftp://limits")
+
+
+class LoginLimitTestCase(TestCase):
+    """Test cases for rate limited /login"""
+
+    def setUp(self):
+        """Create a user with a cheap hash"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(Language(code="EN", name="English"))
+        db.session.commit()
+
+        self.log_rounds = app.config["BCRYPT_LOG_ROUNDS"]
+        app.config["BCRYPT_LOG_ROUNDS"] = 4
+        passwords.init_app(app)
+        User.register("limited", "pw123", 1)
+
+        login_limiter.buckets = MemoryBuckets()
+
+    def tearDown(self):
+        """Restore configuration"""
+
+        db.session.remove()
+        app.config["BCRYPT_LOG_ROUNDS"] = self.log_rounds
+        passwords.init_app(app)
+
+    def test_rejected_without_checking(self):
+        """Attempts beyond the limit get 429 without a query or a hash"""
+
+        with app.test_client() as c:
+            for _ in range(5):
+                c.post("/login", data={"username": "limited", "password": "wrong"})
+
+            with count_queries(db.engine) as statements, patch("models.check_password") as check:
+                resp = c.post("/login", data={"username": "Limited", "password": "pw123"})
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn("Retry-After", resp.headers)
+        self.assertEqual(statements, [])
+        check.assert_not_called()
+
+    def test_keyed_by_username(self):
+        """Other usernames from another address are not limited"""
+
+        with app.test_client() as c:
+            for _ in range(6):
+                c.post("/login", data={"username": "guess", "password": "wrong"})
+
+            resp = c.post("/login", data={"username": "limited", "password": "pw123"}, environ_base={"REMOTE_ADDR": "10.0.0.2"})
+
+        self.assertEqual(resp.status_code, 302)
+
+    def test_blocked_address_spares_users(self):
+        """Attempts from a blocked address do not use up the username's bucket"""
+
+        with app.test_client() as c:
+            for i in range(20):
+                c.post("/login", data={"username": f"guess{i}", "password": "wrong"})
+
+            for _ in range(5):
+                resp = c.post("/login", data={"username": "limited", "password": "wrong"})
+                self.assertEqual(resp.status_code, 429)
+
+            resp = c.post("/login", data={"username": "limited", "password": "pw123"}, environ_base={"REMOTE_ADDR": "10.0.0.2"})
+
+        self.assertEqual(resp.status_code, 302)
+
+    def test_keyed_by_forwarded_address(self):
+        """Behind trusted proxies, the client address comes from X-Forwarded-For"""
+
+        with patch.dict(os.environ, {"TRUSTED_PROXIES": "1"}):
+            proxied = create_app("testing")
+
+        proxied.config["WTF_CSRF_ENABLED"] = False
+
+        with patch.object(login_limiter, "hit", return_value=0) as hit, proxied.test_client() as c:
+            c.post("/login", data={"username": "limited", "password": "wrong"}, headers={"X-Forwarded-For": "203.0.113.7"})
+
+        hit.assert_called_once_with(ip="203.0.113.7", user="limited")
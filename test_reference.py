@@ -0,0 +1,89 @@
+"""Reference data registry tests"""
+
+import os
+from unittest import TestCase
+from models import CatalogState, Category, Drink, Glass, db, Ingredient, Language
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from instrumentation import count_queries
+from reference import ReferenceTable, reference_data
+from test_loader import make_payload
+
+
+class ReferenceTableTestCase(TestCase):
+    """Test cases for ReferenceTable"""
+
+    def test_lookups(self):
+        """Names and ids resolve both ways"""
+
+        table = ReferenceTable([(1, "gin"), (2, "dry vermouth")])
+
+        self.assertEqual(table.id("gin"), 1)
+        self.assertEqual(table.name(2), "dry vermouth")
+        self.assertIsNone(table.id("rum"))
+        self.assertEqual(table.choices(), [(2, "Dry Vermouth"), (1, "Gin")])
+
+
+class ReferenceDataTestCase(TestCase):
+    """Test cases for the reference_data registry"""
+
+    def setUp(self):
+        """Reset tables with lookup data"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Language(code="DE", name="German"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass"),
+            Ingredient(name="gin"),
+            Ingredient(name="lime juice")
+        ])
+        db.session.commit()
+
+        CatalogState.bump()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def test_refreshed_on_bump(self):
+        """New rows appear after a catalog version bump"""
+
+        self.assertIsNone(reference_data.get().ingredients.id("tequila"))
+
+        db.session.add(Ingredient(name="tequila"))
+        db.session.commit()
+        CatalogState.bump()
+
+        self.assertIsNotNone(reference_data.get().ingredients.id("tequila"))
+
+    def test_parse_drink_data(self):
+        """Parsing a drink reads no reference tables from the database"""
+
+        reference_data.get()
+        payload = make_payload(1, "Gimlet", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake.", "DE": "Schütteln."})
+
+        with count_queries(db.engine) as statements:
+            [drink, instructions, drink_ingredients] = Drink.parse_drink_data(payload)
+
+        self.assertEqual(statements, [])
+        self.assertEqual(drink.category_id, 1)
+        self.assertEqual([instr.language_id for instr in instructions], [1, 2])
+        self.assertEqual([ingr.ingredient_id for ingr in drink_ingredients], [1, 2])
+
+    def test_search_form_choices(self):
+        """The search form lists categories and ingredients from the registry"""
+
+        with app.test_client() as c:
+            html = c.get("/").get_data(as_text=True)
+
+        self.assertIn("Ordinary Drink", html)
+        self.assertIn("Lime Juice", html)
@@ -0,0 +1,161 @@
+"""Drink search tests"""
+
+import os
+from unittest import TestCase, mock
+from models import CatalogState, Category, Glass, db, DrinkSearchDocument, Ingredient, Language
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from instrumentation import count_queries
+from loader import BulkLoader
+from search import PythonSearchIndex, has_trigram
+from sync import sync_catalog
+from test_loader import make_payload
+
+payloads = [
+    make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Triple sec", "1/2 oz"], ["Lime juice", "1 oz"]],
+                 {"": "Rub the rim of the glass with lime and salt. Shake the other ingredients with ice."}),
+    make_payload(2, "Tequila Sunrise", [["Tequila", "2 oz"], ["Orange juice", "4 oz"], ["Grenadine", "1 tsp"]],
+                 {"": "Pour tequila and orange juice over ice. Slowly add grenadine."}),
+    make_payload(3, "Gin Fizz", [["Gin", "2 oz"], ["Lemon juice", "1 oz"], ["Carbonated water", None]],
+                 {"": "Shake gin and lemon juice with ice. Top with soda water."})
+]
+
+
+class SearchIndexTestCase(TestCase):
+    """Test cases for the in-process search index"""
+
+    def setUp(self):
+        """Index test documents"""
+
+        self.index = PythonSearchIndex([
+            (1, "margarita", "tequila triple sec lime juice", "Shake with ice and salt."),
+            (2, "tequila sunrise", "tequila orange juice grenadine", "Pour over ice."),
+            (3, "gin fizz", "gin lemon juice carbonated water", "Shake with ice.")
+        ])
+
+    def test_fulltext_ranking(self):
+        """All words must match, name matches rank first"""
+
+        self.assertEqual([id for (id, _) in self.index.search("tequila")], [2, 1])
+        self.assertEqual([id for (id, _) in self.index.search("tequila lime")], [1])
+        self.assertEqual(self.index.search("margrita"), [])
+
+    def test_fuzzy(self):
+        """Misspelled words still match"""
+
+        self.assertEqual(self.index.search("margrita", fuzzy=True)[0][0], 1)
+        self.assertEqual(self.index.search("tequilla sunrse", fuzzy=True)[0][0], 2)
+        self.assertEqual(self.index.search("xyzzy", fuzzy=True), [])
+
+
+class SearchViewsTestCase(TestCase):
+    """Test cases for /drinks search modes"""
+
+    def setUp(self):
+        """Load test drinks and build search documents"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load(payloads)
+        CatalogState.bump()
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def search(self, name, mode):
+        """Returns ids of drinks listed for name searched with mode"""
+
+        resp = self.client.post("/drinks", json={"name": name, "mode": mode})
+        self.assertEqual(resp.status_code, 200)
+
+        return [drink["id"] for drink in resp.json["drinks"]]
+
+    def test_documents_built_on_catalog_change(self):
+        """Search documents are rebuilt when the catalog version is bumped"""
+
+        doc = DrinkSearchDocument.query.get(1)
+
+        self.assertEqual(DrinkSearchDocument.query.count(), 3)
+        self.assertEqual(doc.name, "margarita")
+        self.assertIn("triple sec", doc.ingredients)
+
+    def test_name_mode(self):
+        """Default mode matches substrings of names"""
+
+        self.assertEqual(sorted(self.search("TEQ", "name")), [2])
+
+    def test_fulltext_mode(self):
+        """Full text mode searches ingredients and instructions, ranked"""
+
+        self.assertEqual(self.search("tequila", "fulltext"), [2, 1])
+        self.assertEqual(self.search("soda", "fulltext"), [3])
+        self.assertEqual(self.search("tequila grenadine", "fulltext"), [2])
+
+    def test_fuzzy_mode(self):
+        """Fuzzy mode tolerates typos"""
+
+        self.assertEqual(self.search("margrita", "fuzzy")[0], 1)
+        self.assertEqual(self.search("gin fiz", "fuzzy")[0], 3)
+
+    def test_search_with_filters(self):
+        """Search mode combines with other filters"""
+
+        resp = self.client.post("/drinks", json={"name": "tequila", "mode": "fulltext", "category": "2"})
+
+        self.assertEqual(resp.json["drinks"], [])
+
+    def test_filters_applied_before_limit(self):
+        """Matches passing the filters are found however many better matches fail them"""
+
+        gin = Ingredient.query.filter_by(name="gin").one().id
+
+        with mock.patch("search.SEARCH_LIMIT", 1):
+            for mode in ("fulltext", "fuzzy"):
+                resp = self.client.get("/drinks", query_string={"name": "juice", "mode": mode, "ingredient": gin})
+
+                self.assertEqual([drink["id"] for drink in resp.json["drinks"]], [3], mode)
+
+    def test_fallback_statements_bounded(self):
+        """Without pg_trgm, fuzzy search checks for it once per catalog version and lists at most SEARCH_LIMIT ids"""
+
+        if has_trigram():
+            self.skipTest("pg_trgm is installed")
+
+        self.search("gin", "fuzzy")
+
+        with mock.patch("search.SEARCH_LIMIT", 1), count_queries(db.engine) as statements:
+            self.assertEqual(len(self.search("juice", "fuzzy")), 1)
+
+        self.assertEqual([statement for statement in statements if "pg_extension" in statement], [])
+
+    def test_deleted_drinks_not_found(self):
+        """Soft-deleted drinks disappear from search"""
+
+        sync_catalog(payloads[1:])
+
+        self.assertEqual(self.search("tequila", "fulltext"), [2])
+        self.assertEqual(self.search("margrita", "fuzzy"), [])
+
+    def test_invalid_mode(self):
+        """Unknown modes are rejected"""
+
+        resp = self.client.post("/drinks", json={"name": "gin", "mode": "regex"})
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertDictEqual(resp.json, {"STATUS": "INVALID_MODE"})
@@ -0,0 +1,110 @@
+"""Incremental catalog sync tests"""
+
+import os
+from unittest import TestCase
+from models import Bookmark, CatalogState, Category, Glass, db, Drink, Ingredient, Language, User, catalog_changed
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from loader import BulkLoader
+from sync import sync_catalog
+from test_loader import make_payload
+
+margarita = make_payload(1, "Margarita", [["Tequila", "1 1/2 oz"], ["Lime juice", "1 oz"]], {"": "Shake with ice."})
+gin_sour = make_payload(2, "Gin Sour", [["Gin", "2 oz"], ["Lime juice", "1 oz"]], {"": "Shake with ice."})
+mojito = make_payload(3, "Mojito", [["Light rum", "2 oz"], ["Mint", "6 leaves"]], {"": "Muddle mint, add rum."})
+
+
+class SyncTestCase(TestCase):
+    """Test cases for sync_catalog"""
+
+    def setUp(self):
+        """Load margarita and gin sour, with a user bookmarking the margarita"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load([margarita, gin_sour])
+        CatalogState.bump()
+
+        user = User(username="test", password="x", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Bookmark(user_id=user.id, drink_id=1))
+        db.session.commit()
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+
+    def test_unchanged(self):
+        """Nothing is written and the version stays when upstream is unchanged"""
+
+        stats = sync_catalog([margarita, gin_sour])
+
+        self.assertEqual((stats.inserted, stats.updated, stats.deleted, stats.unchanged), (0, 0, 0, 2))
+        self.assertEqual(CatalogState.current_version(), 1)
+
+    def test_insert_update_delete(self):
+        """New drinks are inserted, changed drinks updated and missing drinks soft-deleted"""
+
+        changed = {**margarita, "strInstructions": "Rim the glass with salt. Shake with ice.", "strIngredient3": "Salt"}
+        received = []
+
+        def receiver(version, drink_ids):
+            received.append((version, drink_ids))
+
+        with catalog_changed.connected_to(receiver):
+            stats = sync_catalog([changed, mojito], batch_size=1)
+
+        self.assertEqual((stats.inserted, stats.updated, stats.deleted, stats.unchanged), (1, 1, 1, 0))
+        self.assertEqual(received, [(2, {1, 2, 3})])
+
+        drink = Drink.query.get(1)
+        self.assertEqual(drink.instructions[0].steps, ["Rim the glass with salt. Shake with ice."])
+        self.assertEqual(sorted(item.ingredient.name for item in drink.ingredients), ["lime juice", "salt", "tequila"])
+        self.assertEqual(drink.content_hash, Drink.hash_drink_data(changed))
+
+        self.assertIsNotNone(Drink.query.get(2).deleted_at)
+        self.assertIsNotNone(Drink.query.get(3))
+        self.assertIsNotNone(Ingredient.query.filter_by(name="mint").one_or_none())
+
+        self.assertEqual(User.query.one().bookmarks[0].id, 1)
+
+    def test_restore_deleted(self):
+        """A soft-deleted drink that reappears upstream is restored"""
+
+        sync_catalog([margarita])
+        stats = sync_catalog([margarita, gin_sour])
+
+        self.assertEqual(stats.updated, 1)
+        self.assertIsNone(Drink.query.get(2).deleted_at)
+
+    def test_keep_missing(self):
+        """Drinks missing upstream are kept with delete_missing=False"""
+
+        stats = sync_catalog([margarita], delete_missing=False)
+
+        self.assertEqual(stats.deleted, 0)
+        self.assertIsNone(Drink.query.get(2).deleted_at)
+
+    def test_deleted_drink_hidden(self):
+        """Soft-deleted drinks are not served or listed"""
+
+        sync_catalog([margarita])
+
+        with app.test_client() as c:
+            self.assertIn("404 Not Found", c.get("/drinks/2").get_data(as_text=True))
+            self.assertIn("Margarita", c.get("/drinks/1").get_data(as_text=True))
+            self.assertEqual([drink["id"] for drink in c.post("/drinks", json={}).json["drinks"]], [1])
@@ -0,0 +1,62 @@
+"""Synthetic catalog tests"""
+
+from collections import Counter
+from unittest import TestCase
+from ingest import CatalogFetcher
+from models import Drink
+from synthetic import BASE_INGREDIENTS, SyntheticCatalog
+
+
+class SyntheticCatalogTestCase(TestCase):
+    """Test cases for SyntheticCatalog"""
+
+    def test_deterministic(self):
+        """The same seed gives the same drinks, another seed different ones"""
+
+        self.assertEqual(SyntheticCatalog(50, seed=1).catalog(), SyntheticCatalog(50, seed=1).catalog())
+        self.assertNotEqual(SyntheticCatalog(50, seed=1).payload(7), SyntheticCatalog(50, seed=2).payload(7))
+
+        # Payloads don't depend on where the stream starts
+        self.assertEqual(list(SyntheticCatalog(50).payloads(start=41)), list(SyntheticCatalog(50).payloads())[40:])
+
+    def test_payloads_parse(self):
+        """Payloads are valid thecocktaildb payloads naming only known lookups"""
+
+        synthetic = SyntheticCatalog(200, ingredients=60)
+        lookups = {key: set(name.lower() for name in names) for (key, names) in synthetic.lookups().items()}
+        names = set()
+
+        self.assertEqual(len(lookups["ingredients"]), 60)
+
+        for data in synthetic.payloads():
+            drink = Drink.extract_drink_data(data)
+
+            self.assertIn(drink["category"], lookups["categories"])
+            self.assertIn(drink["glass"], lookups["glasses"])
+            self.assertTrue(2 <= len(drink["ingredients"]) <= 12)
+            self.assertTrue(set(name for (name, _) in drink["ingredients"]) <= lookups["ingredients"])
+            self.assertIn("", dict(drink["instructions"]))
+
+            names.add(drink["name"])
+
+        self.assertEqual(len(names), 200)
+
+    def test_ingredient_popularity(self):
+        """A few ingredients appear in many drinks and most in few"""
+
+        counts = Counter(data[f"strIngredient{i}"] for data in SyntheticCatalog(2000, ingredients=200).payloads()
+                         for i in range(1, 16) if data[f"strIngredient{i}"])
+
+        [(top, _)] = counts.most_common(1)
+        self.assertEqual(top, BASE_INGREDIENTS[0])
+        self.assertGreater(counts[BASE_INGREDIENTS[0]], 10 * counts["Ingredient 100"])
+
+    def test_answers_like_the_api(self):
+        """Fetching the catalog through the API endpoints gives the generated catalog"""
+
+        synthetic = SyntheticCatalog(120, seed=3)
+        catalog = CatalogFetcher(synthetic, workers=4).fetch_catalog()
+
+        self.assertEqual({key: catalog[key] for key in ["categories", "glasses", "ingredients"]}, synthetic.lookups())
+        self.assertEqual(sorted(catalog["drinks"], key=lambda data: int(data["idDrink"])), list(synthetic.payloads()))
+        self.assertEqual(synthetic.get("lookup.php", {"i": "121"}), {"drinks": None})
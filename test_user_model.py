@@ -1,8 +1,8 @@
 """User model tests"""
 
-import os, requests
+import os
 from unittest import TestCase
-from models import Bookmark, db, Language, User, Glass, Category, Ingredient, Drink
+from models import db, Language, User
 
 os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
 from app import app
@@ -59,42 +59,3 @@ class UserModelTestCase(TestCase):
             "username": self.testuser.username,
             "language_pref": self.testuser.language_pref.code
         })
-    
-    def test_has_bookmark(self):
-        """Test User method has_bookmark instance method"""
-
-        self.assertFalse(self.testuser.has_bookmark(1))
-
-        json_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/lookup.php?i=11007").json()
-        drink_data = json_data["drinks"][0]
-
-        ingr_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?i=list").json()
-        ingredients = [Ingredient(name=ingr["strIngredient1"].lower()) for ingr in ingr_data["drinks"]]
-
-        languages = [
-            Language(code="DE", name="German"),
-            Language(code="ES", name="Spanish"),
-            Language(code="FR", name="French"),
-            Language(code="IT", name="Italian"),
-            Language(code="ZH-HANS", name="Mandarin Chinese, Simplified"),
-            Language(code="ZH-HANT", name="Mandarin Chinese, Traditional")
-        ]
-        glass = Glass(name=drink_data["strGlass"].lower())
-        category = Category(name=drink_data["strCategory"].lower())
-
-        db.session.add_all([*ingredients, glass, *languages, category])
-        db.session.commit()
-
-        [drink, instructions, drink_ingredients] = Drink.parse_drink_data(drink_data)
-
-        db.session.add(drink)
-        db.session.commit()
-
-        db.session.add_all([*instructions, *drink_ingredients])
-        db.session.commit()
-
-        testbookmark = Bookmark(user_id=self.testuser.id, drink_id=drink.id)
-        db.session.add(testbookmark)
-        db.session.commit()
-
-        self.assertTrue(self.testuser.has_bookmark(drink.id))
\ No newline at end of file
@@ -1,22 +1,27 @@
-import os, requests
+import os
 from unittest import TestCase
 from models import db, User, Language, Bookmark, Ingredient, Glass, Category, Drink
 
 os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
 
-from app import app, USER_KEY
+from app import app
+from users import USER_KEY
 
 app.config["SQLALCHEMY_DATABASE_URI"] = "postgresql:///mixology-test"
 app.config["SQLALCHEMY_ECHO"] = False
 app.config["WTF_CSRF_ENABLED"] = False
 
+from ingest import fixture_fetcher
+
+cocktaildb = fixture_fetcher()
+
 db.drop_all()
 db.create_all()
 
-json_data = requests.get(f"https://www.thecocktaildb.com/api/json/v1/1/lookup.php?i=11007").json()
+json_data = cocktaildb.get("lookup.php", i=11007)
 drink_data = json_data["drinks"][0]
 
-ingr_data = requests.get("https://www.thecocktaildb.com/api/json/v1/1/list.php?i=list").json()
+ingr_data = cocktaildb.get("list.php", i="list")
 ingredients = [Ingredient(name=ingr["strIngredient1"].lower()) for ingr in ingr_data["drinks"]]
 
 languages = [
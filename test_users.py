@@ -0,0 +1,184 @@
+"""Lazy user loading tests"""
+
+import os
+from unittest import TestCase
+from models import Bookmark, CatalogState, Category, Glass, db, Language, User
+
+os.environ["DATABASE_URL"] = "postgresql:///mixology-test"
+from app import app
+from users import USER_KEY
+
+app.config["SQLALCHEMY_ECHO"] = False
+
+from instrumentation import count_queries
+from loader import BulkLoader
+from test_loader import make_payload
+from users import bookmark_cache, user_cache
+
+
+class LoggedInTestCase(TestCase):
+    """Base of test cases with a logged in user"""
+
+    def setUp(self):
+        """Load a drink and log in a user"""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add_all([
+            Language(code="EN", name="English"),
+            Category(name="ordinary drink"),
+            Glass(name="cocktail glass")
+        ])
+        db.session.commit()
+
+        BulkLoader().load([
+            make_payload(1, "Gimlet", [["Gin", "2 oz"]], {"": "Shake."}),
+            make_payload(2, "Martini", [["Gin", "2 oz"]], {"": "Stir."})
+        ])
+        CatalogState.bump()
+
+        user = User(username="lazy", password="-", language_pref_id=1)
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Bookmark(user_id=user.id, drink_id=1))
+        db.session.commit()
+
+        self.user_id = user.id
+        self.client = app.test_client()
+
+        with self.client.session_transaction() as sess:
+            sess[USER_KEY] = self.user_id
+
+    def tearDown(self):
+        """Release session"""
+
+        db.session.remove()
+        user_cache.clear()
+        bookmark_cache.clear()
+
+
+class LazyUserTestCase(LoggedInTestCase):
+    """Test cases for the lazily loaded g.user"""
+
+    def user_queries(self, statements):
+        """Returns statements reading users"""
+
+        return [statement for statement in statements if "FROM users" in statement]
+
+    def test_listing_skips_user(self):
+        """Requests that never read g.user do not load the user"""
+
+        with count_queries(db.engine) as statements:
+            self.client.get("/drinks")
+            self.client.get("/static/drinks.js")
+
+        self.assertEqual(self.user_queries(statements), [])
+
+    def test_user_cached(self):
+        """The user is loaded once across requests"""
+
+        with count_queries(db.engine) as statements:
+            self.client.get("/")
+            resp = self.client.get("/profile")
+
+        self.assertEqual(len(self.user_queries(statements)), 1)
+        self.assertIn("English", resp.get_data(as_text=True))
+        self.assertIn("Gimlet", resp.get_data(as_text=True))
+
+    def test_invalidated_on_delete(self):
+        """Deleting the account drops the cached user"""
+
+        self.client.get("/")
+        self.client.delete("/user")
+
+        self.assertIsNone(user_cache.get(self.user_id))
+        self.assertIn("Log In", self.client.get("/").get_data(as_text=True))
+
+
+class BookmarkSetTestCase(LoggedInTestCase):
+    """Test cases for the cached bookmark set"""
+
+    def bookmark_queries(self, statements):
+        """Returns statements reading bookmarks"""
+
+        return [statement for statement in statements if "FROM bookmarks" in statement]
+
+    def test_listing_flags(self):
+        """Listings flag bookmarked drinks from one query"""
+
+        with count_queries(db.engine) as statements:
+            drinks = self.client.get("/drinks").json["drinks"]
+            self.client.get("/drinks/1")
+            self.client.get("/drinks/2")
+
+        self.assertEqual({drink["id"]: drink["bookmarked"] for drink in drinks}, {1: True, 2: False})
+        self.assertEqual(len(self.bookmark_queries(statements)), 1)
+
+    def test_anonymous_listing(self):
+        """Anonymous listings flag nothing and read no bookmarks"""
+
+        with self.client.session_transaction() as sess:
+            del sess[USER_KEY]
+
+        with count_queries(db.engine) as statements:
+            drinks = self.client.get("/drinks").json["drinks"]
+
+        self.assertFalse(any(drink["bookmarked"] for drink in drinks))
+        self.assertEqual(self.bookmark_queries(statements), [])
+
+    def test_bookmark_changes(self):
+        """Adding and removing bookmarks refreshes the set"""
+
+        self.client.get("/drinks")
+        self.client.post("/bookmark", json={"id": 2})
+
+        self.assertEqual([drink["bookmarked"] for drink in self.client.get("/drinks").json["drinks"]], [True, True])
+        self.assertIn("bi-bookmark-fill", self.client.get("/drinks/2").get_data(as_text=True))
+
+        self.client.delete("/bookmark", json={"id": 1})
+
+        self.assertEqual([drink["bookmarked"] for drink in self.client.get("/drinks").json["drinks"]], [False, True])
+
+
+class BatchBookmarkTestCase(LoggedInTestCase):
+    """Test cases for /bookmarks"""
+
+    def test_batch(self):
+        """Adds and removes many bookmarks in one statement each"""
+
+        with count_queries(db.engine) as statements:
+            resp = self.client.post("/bookmarks", json={"add": [1, 2, 2, 99], "remove": [1]})
+
+        self.assertEqual(resp.json, {"STATUS": "OK", "bookmarks": [1, 2]})
+        self.assertEqual(len([statement for statement in statements if statement.startswith("INSERT")]), 1)
+        self.assertEqual(len([statement for statement in statements if statement.startswith("DELETE")]), 1)
+
+        resp = self.client.post("/bookmarks", json={"remove": [1, 2]})
+
+        self.assertEqual(resp.json["bookmarks"], [])
+
+    def test_invalid_ids(self):
+        """Ids that are not integers are rejected before any change"""
+
+        resp = self.client.post("/bookmarks", json={"add": [2, "margarita"], "remove": [1]})
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json, {"STATUS": "INVALID_PARAMETER"})
+        self.assertEqual(Bookmark.drink_ids_of(self.user_id), {1})
+
+    def test_idempotent_bookmark(self):
+        """Bookmarking a drink twice is not an error"""
+
+        resp = self.client.post("/bookmark", json={"id": 1})
+
+        self.assertEqual(resp.json["STATUS"], "OK")
+        self.assertEqual(Bookmark.query.filter_by(user_id=self.user_id).count(), 1)
+
+    def test_requires_user(self):
+        """Anonymous batches are rejected"""
+
+        with self.client.session_transaction() as sess:
+            del sess[USER_KEY]
+
+        self.assertEqual(self.client.post("/bookmarks", json={"add": [1]}).json, {"STATUS": "NO_USER_FOUND"})
@@ -0,0 +1,93 @@
+"""Lazy loading of the logged in user.
+
+g.user is only loaded when a view or template reads it, so requests that
+never look at the user (static files, JSON listings) run no user query.
+Loaded users are kept briefly in a per-process cache keyed by id, and merged
+into each request's session without a query; call invalidate_user after
+changing or deleting a user.
+
+Each user's bookmarked drink ids are loaded as one set and cached the same
+way, keyed by a bookmark revision kept in the session. Changing a bookmark
+bumps the revision, so any worker the session reaches next reloads the set."""
+
+from flask import session
+from flask.ctx import _AppCtxGlobals
+from sqlalchemy.orm import joinedload
+from cache import LRUCache
+from models import db, Bookmark, User
+
+USER_KEY = "curr_user"
+BOOKMARKS_REV_KEY = "bookmarks_rev"
+
+USER_CACHE_TTL = 30
+
+user_cache = LRUCache(maxsize=1024, ttl=USER_CACHE_TTL)
+bookmark_cache = LRUCache(maxsize=1024, ttl=USER_CACHE_TTL)
+
+
+def load_user(user_id):
+    """Returns User of user_id attached to the current session, or None if there is none."""
+
+    cached = user_cache.get(user_id)
+
+    if cached is None:
+        cached = User.query.options(joinedload(User.language_pref)).get(user_id)
+
+        if cached is None:
+            return None
+
+        db.session.expunge(cached)
+        user_cache.set(user_id, cached)
+
+    return db.session.merge(cached, load=False)
+
+
+def invalidate_user(user_id):
+    """Drops user_id from the user cache."""
+
+    user_cache.delete(user_id)
+
+
+def bookmark_key(user_id, state):
+    """Returns bookmark cache key of user_id at the bookmark revision of session data state."""
+
+    return f"{user_id}:{state.get(BOOKMARKS_REV_KEY, 0)}"
+
+
+def bookmark_ids(user_id):
+    """Returns frozenset of drink ids bookmarked by user_id, loaded once per session bookmark revision."""
+
+    key = bookmark_key(user_id, session)
+    ids = bookmark_cache.get(key)
+
+    if ids is None:
+        ids = frozenset(Bookmark.drink_ids_of(user_id))
+        bookmark_cache.set(key, ids)
+
+    return ids
+
+
+def bookmarks_changed(user_id, state=None):
+    """Bumps the bookmark revision of session data state, by default the Flask session,
+    after the bookmarks of user_id change, and drops the sets of user_id cached in this process."""
+
+    state = session if state is None else state
+    state[BOOKMARKS_REV_KEY] = state.get(BOOKMARKS_REV_KEY, 0) + 1
+    bookmark_cache.clear(f"{user_id}:")
+
+
+class AppGlobals(_AppCtxGlobals):
+    """flask.g with a lazily loaded user attribute: the logged in User, or None."""
+
+    @property
+    def user(self):
+
+        if "_user" not in self.__dict__:
+            self._user = load_user(session[USER_KEY]) if USER_KEY in session else None
+
+        return self._user
+
+    @user.setter
+    def user(self, user):
+
+        self._user = user
@@ -0,0 +1,384 @@
+"""Views of the MyMixology site and its JSON endpoints, registered on the app by create_app."""
+
+import hmac
+from flask import Blueprint, current_app, request, redirect, jsonify, flash, session, g, abort, get_template_attribute
+from markupsafe import Markup
+from flask.templating import render_template
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+from models import Bookmark, Drink, db, User
+from cache import cached, drink_key, listing_key
+from cards import cards_statement
+from catalog import catalog_updated_at, catalog_version
+from conditional import conditional, etag_of
+from forms import LoginForm, RegisterForm, SearchForm
+from instrumentation import query_budget
+from metrics import CONTENT_TYPE, exposition, registry, timed
+from pantry import ingredient_index, makeable_listing, makeable_params
+from passwords import HashingBusy, hashing_pool
+from queries import DETAIL_OPTIONS, FALLBACK_LANGUAGE, InvalidCursor, InvalidParameter, as_id_list, instruction_steps, list_drinks, listing_params
+from ratelimit import login_limiter
+from reference import reference_data
+from users import USER_KEY, bookmark_ids, bookmarks_changed, invalidate_user
+
+main = Blueprint("main", __name__)
+
+
+# ------------------------------------------------------------- #
+# ---------------------- User Routes -------------------------- #
+# ------------------------------------------------------------- #
+
+@main.route("/", methods=["GET", "POST"])
+@query_budget(2)
+def root():
+
+    form = SearchForm()
+
+    return render_template("drinks.html",
+                           title="MyMixology",
+                           form=form)
+
+@main.route("/login", methods=["GET", "POST"])
+def login():
+    """User login route"""
+
+    if USER_KEY in session:
+        flash("You must be logged out to view this.", "danger")
+        return redirect("/")
+
+    form = LoginForm()
+
+    if form.validate_on_submit():
+        username = form.username.data
+        password = form.password.data
+
+        # The address is checked first, so a blocked client cannot use up other users' buckets
+        wait = login_limiter.hit(ip=request.remote_addr, user=username.lower())
+
+        if wait:
+            flash("Too many login attempts, please try again later.", "danger")
+            return render_template("form.html", title="Login", form=form, path="/login", btn_name="Enter"), 429, {"Retry-After": str(wait)}
+
+        try:
+            user = User.authenticate(username, password)
+        except HashingBusy:
+            flash("The server is busy, please try again.", "danger")
+            return render_template("form.html", title="Login", form=form, path="/login", btn_name="Enter"), 503
+
+        if user:
+            flash("Successfully logged in.", "success")
+            session[USER_KEY] = user.id
+            return redirect("/")
+        else:
+            flash("Invalid login credentials.", "danger")
+            
+    return render_template(
+        "form.html",
+        title="Login",
+        form=form,
+        path="/login",
+        btn_name="Enter"
+    )
+
+@main.route("/logout", methods=["GET"])
+def logout():
+    """User logout route"""
+
+    if USER_KEY in session:
+        del session[USER_KEY]
+        flash("You are now logged out.", "success")
+        return redirect("/")
+    else:
+        flash("You must be logged in to do this.", "danger")
+        return redirect("/login")
+
+@main.route("/register", methods=["GET", "POST"])
+def register():
+    """User registration route"""
+
+    if USER_KEY in session:
+        flash("You must log out to register.", "danger")
+        return redirect("/")
+
+    form = RegisterForm()
+
+    if form.validate_on_submit():
+        username = form.username.data
+        password = form.password.data
+        lang_pref = form.lang_pref.data
+
+        if form.confirm_password.data != password:
+            flash("Passwords must match.", "danger")
+            return redirect("/register")
+        
+        try:
+            User.register(username, password, lang_pref)
+        except IntegrityError as e:
+            flash("Username already exists.", "danger")
+            return redirect("/register")
+        except HashingBusy:
+            flash("The server is busy, please try again.", "danger")
+            return render_template("form.html", title="Register", form=form, path="/register", btn_name="Create"), 503
+
+        flash("Successfully created account. Please log in with your credentials.", "success")
+
+        return redirect("/login")
+
+    else:
+        return render_template(
+            "form.html",
+            title="Register",
+            form=form,
+            path="/register",
+            btn_name="Create"
+        )
+
+@main.route("/profile", methods=["GET"])
+@query_budget(2)
+def profile():
+    """Renders logged in user's profile"""
+
+    if USER_KEY not in session:
+        flash("You must be logged in to view this", "danger")
+        return redirect("/login")
+    
+    return render_template("user.html",
+                           title="Profile",
+                           user=g.user)
+
+@main.route("/user", methods=["PUT", "PATCH"])
+def update_user():
+
+    if USER_KEY not in session:
+        return jsonify({"STATUS": "FAIL"})
+    
+    user = User.query.filter_by(id=session[USER_KEY]).update(request.json())
+    db.session.add(user)
+    db.session.commit()
+    invalidate_user(session[USER_KEY])
+
+    return jsonify(user.serialize())
+
+@main.route("/user", methods=["DELETE"])
+def delete_user():
+    """Delete user account"""
+
+    if USER_KEY not in session:
+        flash("You must be logged in to do this.", "danger")
+        return jsonify({"STATUS": "FAIL"})
+    
+    User.query.filter_by(id=session[USER_KEY]).delete()
+    db.session.commit()
+    invalidate_user(session[USER_KEY])
+
+    del session[USER_KEY]
+    flash("Account successfully deleted.", "success")
+
+    return jsonify({"STATUS": "OK"})
+
+# ------------------------------------------------------------- #
+# ------------------ Drink Resource Routes -------------------- #
+# ------------------------------------------------------------- #
+
+@main.route("/drinks", methods=["GET", "POST"])
+@query_budget(4)
+def get_drinks():
+    """Renders list of drinks, optionally with filters, from a JSON body or the query string.
+    Pages are selected by the opaque "next" / "prev" cursors of the previous response.
+    Each drink is flagged "bookmarked" for the logged in user.
+    GET responses carry validators, so an unchanged listing is answered 304."""
+
+    try:
+        listing = listing_params(request_params())
+    except InvalidParameter as e:
+        return jsonify({"STATUS": e.args[0]}), 400
+
+    key = listing_key(**listing)
+
+    user_id = session.get(USER_KEY)
+    bookmarks = bookmark_ids(user_id) if user_id else frozenset()
+
+    def build():
+        page = cached(key, lambda: list_drinks(**listing))
+
+        return jsonify({
+            **page,
+            "drinks": [{**drink, "bookmarked": drink["id"] in bookmarks} for drink in page["drinks"]]
+        })
+
+    try:
+        return conditional(
+            build,
+            etag_of(catalog_version(), key, user_id, sorted(bookmarks)),
+            catalog_updated_at(),
+            private=user_id is not None
+        )
+    except InvalidCursor:
+        return jsonify({"STATUS": "INVALID_CURSOR"}), 400
+
+def request_params():
+    """Returns request parameters from the JSON body, or else from the query string,
+    where repeated parameters become lists."""
+
+    if request.is_json:
+        return request.json
+
+    return {key: values if len(values) > 1 else values[0] for (key, values) in request.args.lists()}
+
+@main.route("/drinks/makeable", methods=["POST"])
+@query_budget(2)
+def get_makeable_drinks():
+    """Returns drinks that can be made from a list of ingredient ids,
+    missing at most max_missing of their ingredients, best coverage first."""
+
+    try:
+        results = ingredient_index.get().makeable(*makeable_params(request.json))
+    except InvalidParameter as e:
+        return jsonify({"STATUS": e.args[0]}), 400
+
+    if not results:
+        return jsonify({"drinks": []})
+
+    cards = db.session.execute(cards_statement([result["drink_id"] for result in results])).scalars()
+
+    return jsonify({"drinks": makeable_listing(results, cards, reference_data.get().ingredients)})
+
+@main.route("/drinks/<int:id>", methods=["GET"])
+@query_budget(6)
+def get_drink(id):
+    """Get drink of id.
+    The page body is cached per instruction language; only the bookmark icon is rendered per user.
+    A request whose validators match is answered 304 without rendering."""
+
+    language = g.user.language_pref.code if g.user else FALLBACK_LANGUAGE
+    detail = cached(drink_key(id, language), lambda: render_drink_detail(id, language))
+
+    if detail is None:
+        abort(404)
+
+    bookmarked = USER_KEY in session and id in bookmark_ids(session[USER_KEY])
+
+    return conditional(
+        lambda: render_template("drink.html",
+                                title=detail["title"],
+                                detail={part: Markup(html) for (part, html) in detail["fragments"].items()},
+                                bookmarked=bookmarked),
+        etag_of(catalog_version(), id, language, detail["content_hash"], g.user and g.user.id, bookmarked),
+        catalog_updated_at(),
+        private=g.user is not None
+    )
+
+def render_drink_detail(id, language):
+    """Returns title, content hash and rendered fragments of the page of drink of id,
+    with its instructions in language code (or English), or None if not listed."""
+
+    drink = Drink.query.options(*DETAIL_OPTIONS).filter_by(id=id, deleted_at=None).first()
+
+    if drink is None:
+        return None
+
+    instruction = instruction_steps(id, language)
+
+    with timed("template"):
+        fragments = {part: str(get_template_attribute("drink_detail.html", part)(drink)) for part in ["header", "recipe"]}
+        fragments["instructions"] = str(get_template_attribute("drink_detail.html", "instructions")(drink, instruction))
+
+    return {
+        "title": drink.name.title(),
+        "content_hash": drink.content_hash,
+        "fragments": fragments
+    }
+
+@main.route("/bookmark", methods = ["POST", "DELETE"])
+def bookmark_drink():
+    """Create / Deletes bookmark for drink of id for logged in user.
+    Both are idempotent."""
+
+    if USER_KEY not in session:
+        return jsonify({"STATUS": "NO_USER_FOUND"})
+    
+    id = int(request.json["id"])
+
+    if request.method == "POST":
+
+        Bookmark.add_many(session[USER_KEY], [id])
+        db.session.commit()
+        bookmarks_changed(session[USER_KEY])
+
+        return jsonify({
+            "STATUS": "OK",
+            "CLASS": "bi bi-bookmark-fill fs-2"
+        })
+
+    else:
+        Bookmark.remove_many(session[USER_KEY], [id])
+        db.session.commit()
+        bookmarks_changed(session[USER_KEY])
+        return jsonify({
+            "STATUS": "OK",
+            "CLASS": "bi bi-bookmark fs-2"
+        })
+
+@main.route("/bookmarks", methods=["POST"])
+def update_bookmarks():
+    """Adds and removes bookmarks of logged in user in one transaction.
+    Takes JSON lists of drink ids "add" and "remove"; removals are applied first.
+    Returns the user's resulting bookmarked drink ids."""
+
+    if USER_KEY not in session:
+        return jsonify({"STATUS": "NO_USER_FOUND"})
+
+    user_id = session[USER_KEY]
+
+    try:
+        remove = as_id_list(request.json.get("remove", []))
+        add = as_id_list(request.json.get("add", []))
+    except InvalidParameter as e:
+        return jsonify({"STATUS": e.args[0]}), 400
+
+    Bookmark.remove_many(user_id, remove)
+    Bookmark.add_many(user_id, add)
+    db.session.commit()
+    bookmarks_changed(user_id)
+
+    return jsonify({
+        "STATUS": "OK",
+        "bookmarks": sorted(bookmark_ids(user_id))
+    })
+
+# ------------------------------------------------------------- #
+# ---------------------- Metrics Route ------------------------ #
+# ------------------------------------------------------------- #
+
+@main.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus metrics of this worker process: requests, timings and queries per view,
+    password hashing pool and login limiter counts.
+    Requires the METRICS_TOKEN bearer token when one is set, and is not
+    served without one under METRICS_REQUIRE_TOKEN."""
+
+    token = current_app.config["METRICS_TOKEN"]
+
+    if not current_app.config["METRICS"] or (current_app.config["METRICS_REQUIRE_TOKEN"] and not token):
+        abort(404)
+
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+
+    return exposition(registry, hashing_pool.stats(), login_limiter.stats()), 200, {
+        "Content-Type": CONTENT_TYPE,
+        "Cache-Control": "no-store"
+    }
+
+# ------------------------------------------------------------- #
+# ----------------------- Error Route ------------------------- #
+# ------------------------------------------------------------- #
+
+@main.app_errorhandler(HTTPException)
+def handle_exception(e):
+    """Renders error page if URL not found, or if there is a server error."""
+
+    if isinstance(e, HTTPException):
+        return render_template("error.html", error=e, title="Something went wrong."), e.code
+    else:
+        return render_template("error.html", error=e, title="Something went wrong."), 500
\ No newline at end of file